@@ -4,29 +4,32 @@ import glob
 import chromadb
 from pypdf import PdfReader
 
-# Add src to path to import backend modules
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+# Add project root to path to import backend modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from backend.llm_client import LLMClient
+from src.backend.embeddings import get_embedding_provider
+from src.backend.lexical_index import BM25Index, index_path_for
+from src.backend.retrieval_cache import bump_collection_version
 
 # Configuration
 KNOWLEDGE_DIR = "knowledge"
 DB_PATH = "data/chroma_db"
-COLLECTION_NAME = "design_patterns"
 
 def ingest_pdfs():
-    # Initialize LLM Client for embeddings
-    print("Initializing LLM Client...")
-    llm_client = LLMClient()
+    # Initialize the embedding provider configured in settings.yaml
+    print("Initializing embedding provider...")
+    provider = get_embedding_provider()
+    collection_name = provider.collection_name
+    print(f"Using '{provider.name}' embeddings -> collection '{collection_name}'")
 
     # Initialize ChromaDB
     print(f"Initializing ChromaDB at {DB_PATH}...")
     client = chromadb.PersistentClient(path=DB_PATH)
     
-    # We will manually compute embeddings using LLMClient, so we don't pass an embedding_function here
+    # We compute embeddings with the provider ourselves, so we don't pass an embedding_function here
     # content is stored as 'documents', embeddings as 'embeddings'
     collection = client.get_or_create_collection(
-        name=COLLECTION_NAME
+        name=collection_name
     )
 
     pdf_files = glob.glob(os.path.join(KNOWLEDGE_DIR, "*.pdf"))
@@ -39,7 +42,6 @@ def ingest_pdfs():
     documents = []
     metadatas = []
     ids = []
-    embeddings = []
 
     for file_path in pdf_files:
         filename = os.path.basename(file_path)
@@ -67,11 +69,6 @@ def ingest_pdfs():
                 documents.append(chunk)
                 metadatas.append({"source": filename, "chunk": chunk_idx})
                 ids.append(f"{filename}_{chunk_idx}")
-                
-                # Generate embedding using LLMClient
-                # Method defined as get_embedding(text: str) -> list[float]
-                emb = llm_client.get_embedding(chunk)
-                embeddings.append(emb)
 
                 start += (chunk_size - overlap)
                 chunk_idx += 1
@@ -80,6 +77,14 @@ def ingest_pdfs():
             print(f"Error processing {filename}: {e}")
 
     if documents:
+        # Local vectorizers learn corpus statistics (IDF) before embedding
+        if hasattr(provider, "fit"):
+            provider.fit(documents)
+
+        # Embed all chunks in batched requests (document task type)
+        print(f"Embedding {len(documents)} chunks...")
+        embeddings = provider.embed(documents, task_type="retrieval_document").tolist()
+
         print(f"Upserting {len(documents)} chunks to ChromaDB...")
         collection.upsert(
             documents=documents,
@@ -87,6 +92,15 @@ def ingest_pdfs():
             metadatas=metadatas,
             ids=ids
         )
+
+        # Lexical side of hybrid retrieval, over exactly the same chunks
+        index_path = index_path_for(DB_PATH, collection_name)
+        BM25Index().build(ids, documents, metadatas).save(index_path)
+        print(f"BM25 index written to {index_path}.")
+
+        # Invalidate cached retrieval results everywhere
+        version = bump_collection_version(DB_PATH, collection_name)
+        print(f"Collection '{collection_name}' is now at version {version}.")
         print("Ingestion complete.")
     else:
         print("No text extracted from PDFs.")
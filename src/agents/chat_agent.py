@@ -3,10 +3,14 @@ Chat Agent for SpecOps.
 Provides conversational interface to answer questions about generated projects.
 """
 import json
+import threading
 from src.backend.llm_client import LLMClient
+from src.backend.config import load_settings
+from src.backend.code_index import load_code_index, indexed_files, retrieve_code_context
+from src.backend.conversation_memory import ConversationMemory
 
 class ChatAgent:
-    def __init__(self, project_context: dict = None):
+    def __init__(self, project_context: dict = None, llm_client: LLMClient = None):
         """
         Initialize chat agent with project context.
         
@@ -16,10 +20,30 @@ class ChatAgent:
                 - files: Generated code files (dict of filename: content)
                 - patterns: Selected design patterns
                 - project_path: Path to generated project
+            llm_client: Client to use; pooled sessions share one
+                (see ChatSessionManager). Created if omitted.
         """
-        self.llm_client = LLMClient()
+        self.llm_client = llm_client or LLMClient()
         self.project_context = project_context or {}
-        self.conversation_history = []
+        # Project context prefix, cached with the LLM for the session (created on first chat)
+        self._context_cache = None
+        # Pooled agents are shared across browser sessions: one turn at a time, so
+        # concurrent first turns can't each create (and leak) a context cache
+        self._turn_lock = threading.RLock()
+        chat_conf = load_settings().get("chat") or {}
+        self.code_context_tokens = chat_conf.get("code_context_tokens", 1500)
+        self.code_top_k = chat_conf.get("code_top_k", 8)
+        # Recent turns verbatim within a budget, older ones folded into a summary
+        self.memory = ConversationMemory(
+            self.llm_client,
+            recent_budget_tokens=chat_conf.get("history_budget_tokens", 1500),
+            summary_budget_tokens=chat_conf.get("summary_budget_tokens", 300),
+        )
+        # Called with the agent after every completed exchange (transcript persistence)
+        self.on_turn = None
+        # BM25 index over the project's files, loaded on first use
+        self._code_index = None
+        self._code_index_loaded = False
     
     def chat(self, user_message: str) -> str:
         """
@@ -31,29 +55,66 @@ class ChatAgent:
         Returns:
             Assistant's response
         """
-        # Build context-aware prompt
-        context_prompt = self._build_context_prompt()
+        with self._turn_lock:
+            response = self.llm_client.generate_content(self._turn_prompt(user_message),
+                                                        context_cache=self._context_cache)
+            self._remember(user_message, response)
+        return response
+
+    def chat_stream(self, user_message: str):
+        """
+        Like chat(), but yields the response in chunks as the model produces
+        them. The exchange is added to the history once the stream completes.
+        The turn lock is held until the stream is exhausted or closed.
+        """
+        with self._turn_lock:
+            parts = []
+            for chunk in self.llm_client.generate_content_stream(self._turn_prompt(user_message),
+                                                                 context_cache=self._context_cache):
+                parts.append(chunk)
+                yield chunk
+            self._remember(user_message, "".join(parts))
+
+    def _turn_prompt(self, user_message: str) -> str:
+        # Context-aware prefix, shared by every turn of the session
+        if self._context_cache is None:
+            ttl = ((load_settings().get("llm") or {}).get("context_cache") or {}).get("chat_ttl_seconds", 1800)
+            self._context_cache = self.llm_client.create_context_cache(self._build_context_prompt(), ttl_seconds=ttl)
         
         # Add conversation history
         history_prompt = self._format_history()
-        
-        # Generate response
-        full_prompt = f"""{context_prompt}
 
-{history_prompt}
+        # Only the snippets relevant to this question, not the whole project
+        code_prompt = ""
+        index = self._project_index()
+        if index is not None and self.code_context_tokens > 0:
+            snippets = retrieve_code_context(index, user_message, self.code_context_tokens, top_k=self.code_top_k)
+            if snippets["entries"]:
+                code_prompt = f"Relevant project code:\n{snippets['text']}\n\n"
+        
+        return f"""{history_prompt}
 
-User: {user_message}
+{code_prompt}User: {user_message}
 Assistant:"""
-        
-        response = self.llm_client.generate_content(full_prompt)
-        
-        # Update history
-        self.conversation_history.append({
-            "user": user_message,
-            "assistant": response
-        })
-        
-        return response
+
+    def _project_index(self):
+        if not self._code_index_loaded:
+            self._code_index_loaded = True
+            try:
+                self._code_index = load_code_index(self.project_context.get('project_path'))
+            except Exception as e:
+                print(f"Warning: Could not load project code index: {e}")
+        return self._code_index
+
+    @property
+    def conversation_history(self) -> list:
+        """All exchanges of the session, oldest first."""
+        return self.memory.turns
+
+    def _remember(self, user_message: str, response: str):
+        self.memory.add(user_message, response)
+        if self.on_turn is not None:
+            self.on_turn(self)
     
     def _build_context_prompt(self) -> str:
         """Build prompt with project context."""
@@ -64,8 +125,10 @@ Assistant:"""
         files = self.project_context.get('files', {})
         patterns = self.project_context.get('patterns', [])
         
-        # Build file list (just names, not full content to save tokens)
+        # Build file list (just names, not full content to save tokens; snippets are retrieved per turn)
         file_list = list(files.keys()) if files else []
+        if not file_list and self._project_index() is not None:
+            file_list = indexed_files(self._project_index())
         
         context = f"""You are an expert coding assistant helping with a generated software project.
 
@@ -88,20 +151,16 @@ Answer questions about this project accurately and helpfully. You can explain:
         return context
     
     def _format_history(self) -> str:
-        """Format conversation history for prompt."""
-        if not self.conversation_history:
-            return ""
-        
-        # Limit to last 5 exchanges to manage token count
-        recent_history = self.conversation_history[-5:]
-        
-        formatted = "Previous conversation:\\n"
-        for exchange in recent_history:
-            formatted += f"User: {exchange['user']}\\n"
-            formatted += f"Assistant: {exchange['assistant']}\\n\\n"
-        
-        return formatted
+        """Format conversation history for prompt (summary + recent turns, token-budgeted)."""
+        return self.memory.render()
     
     def clear_history(self):
         """Clear conversation history."""
-        self.conversation_history = []
+        self.memory.clear()
+
+    def close(self):
+        """Release the session's LLM context cache."""
+        with self._turn_lock:
+            if self._context_cache is not None:
+                self._context_cache.close()
+                self._context_cache = None
@@ -3,15 +3,18 @@ CodeFixer Agent.
 Uses the LLM to fix code based on error logs (pylint, syntax errors).
 """
 import json
-from src.backend.llm_client import LLMClient
+from src.backend.llm_client import LLMClient, ContextCache
 
 class CodeFixer:
     def __init__(self):
         self.llm_client = LLMClient()
 
-    def fix_code(self, file_path: str, file_content: str, error_log: str) -> dict:
+    def fix_code(self, file_path: str, file_content: str, error_log: str,
+                 context_cache: ContextCache = None) -> dict:
         """
         Attempts to fix the code given specific errors.
+        With the run's `context_cache`, the fix is grounded in the project's
+        SRS and patterns at no extra input cost.
         Returns: {"success": bool, "fixed_content": str, "error": str}
         """
         prompt = f"""
@@ -36,7 +39,7 @@ class CodeFixer:
         """
 
         try:
-            response = self.llm_client.generate_content(prompt)
+            response = self.llm_client.generate_content(prompt, context_cache=context_cache)
             
             # Extract code from markdown if present
             fixed_content = response
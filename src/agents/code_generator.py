@@ -5,7 +5,9 @@ Generates full project structure and code based on SRS, Patterns, and Templates.
 import json
 import os
 import yaml
-from src.backend.llm_client import LLMClient
+from src.backend.llm_client import LLMClient, ContextCache
+from src.backend.llm_backends import join_prefix
+from src.backend.prompt_builder import PromptContext
 
 class CodeGenerator:
     def __init__(self):
@@ -16,10 +18,14 @@ class CodeGenerator:
         # Templates removed as we switched to Vector DB and LLM knowledge
 
 
-    def generate_code(self, srs: dict, selected_patterns: list) -> dict:
+    def generate_code(self, srs: dict, selected_patterns: list, prompt_context: PromptContext = None,
+                      context_cache: ContextCache = None) -> dict:
         """
         Generates code structure. Returns a dict: { "filename": "content" }
+        `context_cache` holds the project prefix (SRS + patterns) for this run.
         """
+        prompt_context = prompt_context or PromptContext()
+        project_prefix = prompt_context.project_prefix(srs, selected_patterns)
         # 1. Get Structural Rules from Templates
         rules = []
         for pattern in selected_patterns:
@@ -30,13 +36,7 @@ class CodeGenerator:
 
         # 2. Construct Prompt
         prompt = f"""
-        You are an Expert Software Developer. Generate a complete, runnable codebase for the following project.
-        
-        SRS:
-        {json.dumps(srs, indent=2)}
-
-        SELECTED PATTERNS:
-        {selected_patterns}
+        You are an Expert Software Developer. Generate a complete, runnable codebase for the project above.
 
         STRUCTURAL RULES (You MUST follow these):
         {rules_str}
@@ -58,61 +58,22 @@ class CodeGenerator:
 
         Do NOT wrap in markdown code blocks.
         """
+        prompt_context.record("code_generation", join_prefix(project_prefix, prompt),
+                              project_prefix=project_prefix, rules=rules_str)
 
 
         try:
-            response_text = self.llm_client.generate_content(prompt)
-            
-            # Enhanced cleanup
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "")
-            
-            # Remove any leading/trailing whitespace
-            response_text = response_text.strip()
+            if context_cache is None:
+                prompt = join_prefix(project_prefix, prompt)
+            response_text = self.llm_client.generate_content(prompt, context_cache=context_cache)
             
-            # Try parsing with strict=False first
-            try:
-                project_files = json.loads(response_text, strict=False)
-            except json.JSONDecodeError as json_err:
-                # More aggressive fix: use regex to properly escape newlines in JSON strings
-                import re
-                
-                # This regex finds string values and escapes newlines within them
-                def escape_newlines_in_strings(match):
-                    string_content = match.group(1)
-                    # Escape newlines, tabs, and carriage returns
-                    string_content = string_content.replace('\\', '\\\\')
-                    string_content = string_content.replace('\n', '\\n')
-                    string_content = string_content.replace('\r', '\\r')
-                    string_content = string_content.replace('\t', '\\t')
-                    string_content = string_content.replace('"', '\\"')
-                    return f'"{string_content}"'
-                
-                # Try to fix the JSON by escaping content within quotes
-                # This is a simplified approach - find content between quotes and escape it
-                try:
-                    # Split by quotes and process alternating segments
-                    parts = response_text.split('"')
-                    fixed_parts = []
-                    for i, part in enumerate(parts):
-                        if i % 2 == 1:  # Inside quotes (string content)
-                            # Escape special characters
-                            part = part.replace('\\', '\\\\')
-                            part = part.replace('\n', '\\n')
-                            part = part.replace('\r', '\\r')
-                            part = part.replace('\t', '\\t')
-                        fixed_parts.append(part)
-                    
-                    fixed_text = '"'.join(fixed_parts)
-                    project_files = json.loads(fixed_text, strict=False)
-                    
-                except (json.JSONDecodeError, Exception) as e2:
-                    # Last resort: return error
-                    return {
-                        "success": False, 
-                        "error": f"JSON parsing failed: {str(json_err)}", 
-                        "raw_response": response_text[:500]
-                    }
+            project_files, parse_error = self._parse_project_files(response_text)
+            if project_files is None:
+                return {
+                    "success": False, 
+                    "error": f"JSON parsing failed: {parse_error}", 
+                    "raw_response": response_text[:500]
+                }
             
             # Simple Validation
             validation_errors = self._validate_structure(project_files, selected_patterns)
@@ -126,6 +87,49 @@ class CodeGenerator:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def _parse_project_files(self, response_text: str):
+        """
+        Parses the LLM's file map, repairing unescaped control characters and
+        stray backslashes inside JSON strings if the strict parse fails.
+        Returns (files, None), or (None, original decode error) when unrecoverable.
+        """
+        # Enhanced cleanup
+        if response_text.startswith("```json"):
+            response_text = response_text.replace("```json", "").replace("```", "")
+        
+        # Remove any leading/trailing whitespace
+        response_text = response_text.strip()
+        
+        # Try parsing with strict=False first
+        try:
+            return json.loads(response_text, strict=False), None
+        except json.JSONDecodeError as json_err:
+            parse_error = str(json_err)
+        
+        try:
+            return json.loads(self._escape_string_contents(response_text), strict=False), None
+        except Exception:
+            # Last resort: give up
+            return None, parse_error
+
+    @staticmethod
+    def _escape_string_contents(response_text: str) -> str:
+        """
+        More aggressive fix: escape content within quotes.
+        Splits by quotes and escapes the alternating (string) segments.
+        """
+        parts = response_text.split('"')
+        fixed_parts = []
+        for i, part in enumerate(parts):
+            if i % 2 == 1:  # Inside quotes (string content)
+                # Escape special characters
+                part = part.replace('\\', '\\\\')
+                part = part.replace('\n', '\\n')
+                part = part.replace('\r', '\\r')
+                part = part.replace('\t', '\\t')
+            fixed_parts.append(part)
+        return '"'.join(fixed_parts)
+
     def _validate_structure(self, files: dict, patterns: list) -> list:
         errors = []
         for pattern in patterns:
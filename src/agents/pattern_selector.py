@@ -4,11 +4,19 @@ Selects design patterns based on SRS and RAG knowledge (Vector DB).
 """
 import json
 import chromadb
+import numpy as np
 # Add src to path if needed, usually handled by runtime
 import sys
 import os
 
 from src.backend.llm_client import LLMClient
+from src.backend.embeddings import get_embedding_provider
+from src.backend.config import load_settings
+from src.backend.lexical_index import BM25Index, index_path_for, reciprocal_rank_fusion
+from src.backend.retrieval_cache import collection_scope, get_shared_retrieval_cache, read_collection_version
+from src.backend.vector_index import get_vector_index
+from src.backend.context_packer import pack_context
+from src.backend.prompt_builder import PromptContext
 
 class PatternSelector:
     def __init__(self, db_path=None):
@@ -18,48 +26,63 @@ class PatternSelector:
         else:
             self.db_path = db_path
         self.llm_client = LLMClient()
+        # Query embeddings come from the configured provider (remote Gemini or a local CPU model)
+        self.embedder = get_embedding_provider(self.llm_client)
         try:
             self.client = chromadb.PersistentClient(path=self.db_path)
-            self.collection = self.client.get_collection(name="design_patterns")
+            self.collection = self.client.get_collection(name=self.embedder.collection_name)
             print("PatternSelector: Connected to ChromaDB.")
         except Exception as e:
             print(f"PatternSelector Warning: Connection failed: {e}")
             self.collection = None
 
-    def select_patterns(self, srs: dict) -> dict:
+        rag_settings = load_settings().get("rag") or {}
+        hybrid_settings = rag_settings.get("hybrid") or {}
+        self.top_k = rag_settings.get("top_k", 3)
+        self.fusion_depth = hybrid_settings.get("fusion_depth", 10)
+        self.rrf_k = hybrid_settings.get("rrf_k", 60)
+        # "chroma" queries the persistent client; "memory" searches a warm in-process copy
+        self.index_mode = rag_settings.get("index_mode", "chroma")
+        self.ann_threshold = rag_settings.get("ann_threshold", 20000)
+        # One extra query per SRS requirement, embedded and searched as a batch
+        multi_settings = rag_settings.get("multi_query") or {}
+        self.multi_query = multi_settings.get("enabled", True)
+        self.max_queries = multi_settings.get("max_queries", 16)
+        self.multi_top_k = multi_settings.get("top_k", 6)
+        # Token budget for retrieved knowledge in the selection prompt
+        self.context_budget = rag_settings.get("context_budget_tokens", 1200)
+        # Vector query results, invalidated when ingestion bumps the collection version
+        self.retrieval_cache = get_shared_retrieval_cache(rag_settings.get("query_cache_entries", 256)) \
+            if rag_settings.get("query_cache", True) else None
+        # BM25 index written by scripts/ingest_knowledge.py; optional
+        self.lexical_index = None
+        lexical_path = index_path_for(self.db_path, self.embedder.collection_name)
+        if hybrid_settings.get("enabled", True) and os.path.exists(lexical_path):
+            try:
+                self.lexical_index = BM25Index.load(lexical_path)
+            except Exception as e:
+                print(f"PatternSelector Warning: Could not load lexical index: {e}")
+
+    def select_patterns(self, srs: dict, prompt_context: PromptContext = None) -> dict:
         """
         Selects patterns for the given SRS dictionary using Vector DB.
         Returns format: {"success": bool, "selected_patterns": list[str], "justification": str}
         """
+        prompt_context = prompt_context or PromptContext()
         if not self.collection:
              return {"success": False, "error": "ChromaDB (Vector DB) is not connected. Cannot retrieve patterns."}
 
-        # 1. Construct Query from SRS
+        # 1. Construct Queries from SRS
         project_name = srs.get('project_name', 'Unnamed Project')
-        description = srs.get('description', '')
-        tech_stack = srs.get('tech_stack', [])
-        
-        query_text = f"Project: {project_name}. Description: {description}. Tech Stack: {tech_stack}"
-        print(f"Selecting patterns for: {project_name}")
+        queries = self._build_queries(srs)
+        print(f"Selecting patterns for: {project_name} ({len(queries)} queries)")
 
-        # 2. Retrieve Context from ChromaDB
-        retrieved_contexts = []
+        # 2. Retrieve Context from ChromaDB, packed into the token budget
         try:
-            # Get embedding for the query using LLMClient
-            query_embedding = self.llm_client.get_embedding(query_text)
-            
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=3 # Get top 3 relevant chunks
-            )
-            
-            if results['documents'] and results['metadatas']:
-                for i, doc in enumerate(results['documents'][0]):
-                    meta = results['metadatas'][0][i]
-                    source = meta.get('source', 'Unknown')
-                    retrieved_contexts.append(f"- Source: {source}\n  Content: {doc[:500]}...")
+            packed = pack_context(self._retrieve_chunks(queries), self.context_budget)
         except Exception as e:
             return {"success": False, "error": f"Vector DB Retrieval Error: {str(e)}"}
+        retrieved_contexts = packed["entries"]
         
         if not retrieved_contexts:
              # Strict mode: If nothing found, warn or return empty? 
@@ -70,11 +93,12 @@ class PatternSelector:
         context_str = "\n".join(retrieved_contexts) if retrieved_contexts else "No relevant patterns found in knowledge base."
 
         # 3. Ask LLM to Formulate Selection from Retrieved Context
+        srs_text = prompt_context.render("srs", srs)
         prompt = f"""
         You are a Senior Software Architect. We have retrieved the following relevant Design Pattern documentation from our Vector Knowledge Base based on the Project SRS.
 
         PROJECT SRS:
-        {json.dumps(srs, indent=2)}
+        {srs_text}
 
         RETRIEVED KNOWLEDGE (CONTEXT):
         {context_str}
@@ -91,6 +115,7 @@ class PatternSelector:
             "justification": "Detailed explanation of why..."
         }}
         """
+        prompt_context.record("pattern_selection", prompt, srs=srs_text, retrieved_context=context_str)
 
         try:
             response_text = self.llm_client.generate_content(prompt)
@@ -108,7 +133,105 @@ class PatternSelector:
                 "success": True, 
                 "selected_patterns": selection_result.get("selected_patterns", []),
                 "justification": selection_result.get("justification", ""),
-                "retrieved_patterns_count": len(retrieved_contexts)
+                "retrieved_patterns_count": len(retrieved_contexts),
+                "context_tokens": packed["tokens"]
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    def _build_queries(self, srs: dict) -> list:
+        """
+        The project-level query first, then one query per functional and
+        non-functional requirement (deduplicated, capped at max_queries).
+        """
+        project_name = srs.get('project_name', 'Unnamed Project')
+        description = srs.get('description', '')
+        tech_stack = srs.get('tech_stack', [])
+        queries = [f"Project: {project_name}. Description: {description}. Tech Stack: {tech_stack}"]
+        if not self.multi_query:
+            return queries
+
+        seen = set()
+        for key in ("functional_requirements", "non_functional_requirements"):
+            for requirement in srs.get(key) or []:
+                requirement = str(requirement).strip()
+                if requirement and requirement.lower() not in seen:
+                    seen.add(requirement.lower())
+                    queries.append(requirement)
+        return queries[:self.max_queries]
+
+    def _search(self, query_embeddings, n_results: int) -> dict:
+        if self.index_mode == "memory":
+            index = get_vector_index(self.collection, self.db_path, self.embedder.collection_name,
+                                     ann_threshold=self.ann_threshold)
+            return index.query(query_embeddings, n_results=n_results)
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results)
+
+    def _query_collection(self, query_embeddings, n_results: int) -> list:
+        """
+        Vector search for every query row in a single call. Returns one
+        {ids, documents, metadatas, distances} dict per query; rows seen
+        before are served from the retrieval cache.
+        """
+        scope = collection_scope(self.db_path, self.embedder.collection_name)
+        version = read_collection_version(self.db_path, self.embedder.collection_name) \
+            if self.retrieval_cache is not None else None
+        rows = [self.retrieval_cache.get(scope, e, n_results, version) if self.retrieval_cache is not None else None
+                for e in query_embeddings]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            results = self._search(np.asarray([query_embeddings[i] for i in missing]), n_results)
+            for j, i in enumerate(missing):
+                row = {key: (results.get(key) or [[]] * len(missing))[j]
+                       for key in ("ids", "documents", "metadatas", "distances")}
+                rows[i] = row
+                if self.retrieval_cache is not None:
+                    self.retrieval_cache.put(scope, query_embeddings[i], n_results, version, row)
+        return rows
+
+    def _retrieve_chunks(self, queries) -> list:
+        """
+        Returns the best chunks for one query string or a list of queries as
+        dicts with id, document and metadata. All queries are embedded in
+        one batch and searched in one vectorized call. Chunks are deduplicated
+        and ordered by their best rank in any query, then best distance, so
+        every requirement contributes its top hits before any query's
+        runners-up (raw distances are not comparable across queries). With a
+        lexical index present, vector and BM25 rankings (fusion_depth each)
+        are combined by reciprocal rank fusion, so explicit pattern names in
+        the prompt surface without widening the vector search.
+        """
+        queries = [queries] if isinstance(queries, str) else list(queries)
+        top_k = self.top_k if len(queries) == 1 else self.multi_top_k
+        # Get embeddings for all queries using the embedding provider
+        query_embeddings = np.asarray(self.embedder.embed(queries, task_type="retrieval_query"), dtype=np.float32)
+        
+        n_results = self.fusion_depth if self.lexical_index else top_k
+        rows = self._query_collection(query_embeddings, n_results)
+        
+        chunks = {}
+        best = {}
+        for row in rows:
+            distances = row.get('distances') or [0.0] * len(row['ids'])
+            for rank, (chunk_id, doc, metadata, distance) in enumerate(
+                    zip(row['ids'], row['documents'], row['metadatas'], distances)):
+                chunks.setdefault(chunk_id, {"id": chunk_id, "document": doc, "metadata": metadata})
+                best[chunk_id] = min((rank, distance), best.get(chunk_id, (rank, distance)))
+        vector_ranking = sorted(best, key=best.get)
+
+        if not self.lexical_index:
+            return [chunks[chunk_id] for chunk_id in vector_ranking[:top_k]]
+
+        lexical_best = {}
+        for query in queries:
+            for rank, (chunk_id, score) in enumerate(self.lexical_index.search(query, self.fusion_depth)):
+                lexical_best[chunk_id] = min((rank, -score), lexical_best.get(chunk_id, (rank, -score)))
+        lexical_ranking = sorted(lexical_best, key=lexical_best.get)
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], k=self.rrf_k)
+
+        selected = []
+        for chunk_id, score in fused[:top_k]:
+            chunk = chunks.get(chunk_id) or self.lexical_index.get(chunk_id)
+            if chunk:
+                selected.append({**chunk, "score": score})
+        return selected
@@ -2,7 +2,7 @@
 Requirements Gatherer Agent.
 Generates clarifying questions based on initial prompt and enhances requirements.
 """
-from src.backend.llm_client import LLMClient
+from src.backend.llm_client import LLMClient, QuotaExhaustedError
 
 class RequirementsGatherer:
     def __init__(self):
@@ -17,6 +17,9 @@ class RequirementsGatherer:
             
         Returns:
             List of 5 clarifying questions
+
+        Raises:
+            QuotaExhaustedError: The request stayed rate limited past the client's queueing limit
         """
         prompt = f"""You are a software requirements analyst. A user wants to build a project with this description:
 
@@ -53,10 +56,10 @@ Return ONLY a JSON array of 5 questions, nothing else. Format:
                 # Fallback questions
                 return self._get_fallback_questions()
                 
+        except QuotaExhaustedError:
+            # The client already queued through the rate limit; let the caller report it
+            raise
         except Exception as e:
-            # Re-raise rate limit errors so frontend can handle them
-            if "429" in str(e) or "ResourceExhausted" in str(e):
-                raise e
             print(f"Error generating questions: {e}")
             return self._get_fallback_questions()
     
@@ -6,6 +6,7 @@ import json
 import os
 import jsonschema
 from src.backend.llm_client import LLMClient
+from src.backend.prompt_builder import PromptContext
 
 class SpecParser:
     def __init__(self):
@@ -16,20 +17,24 @@ class SpecParser:
         with open(self.schema_path, 'r', encoding='utf-8') as f:
             self.schema = json.load(f)
 
-    def parse_input(self, prompt: str) -> dict:
+    def parse_input(self, prompt: str, prompt_context: PromptContext = None) -> dict:
         """
         Parses input prompt to SRS using LLM and validates against schema.
+        `prompt_context` shares compact serializations and token stats across a pipeline run.
         """
+        prompt_context = prompt_context or PromptContext()
+        schema_text = prompt_context.render("schema", self.schema)
         system_prompt = f"""
         You are an expert Software Architect. Convert the following user request into a detailed Software Requirements Specification (SRS) JSON object.
         
         The JSON must strictly follow this schema:
-        {json.dumps(self.schema, indent=2)}
+        {schema_text}
 
         User Request: {prompt}
 
         Return ONLY the raw JSON. No markdown formatting.
         """
+        prompt_context.record("srs_parsing", system_prompt, schema=schema_text, user_request=prompt)
 
         try:
             response_text = self.llm_client.generate_content(system_prompt)
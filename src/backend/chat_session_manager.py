@@ -0,0 +1,129 @@
+"""
+Chat Session Manager Module.
+Pools ChatAgent sessions per generated project (history entry) behind one
+shared LLMClient.
+Idle sessions are evicted (LRU beyond max_sessions, or after idle_ttl_seconds),
+releasing their context caches; transcripts are persisted to disk so an
+evicted or restarted session resumes its conversation.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from src.agents.chat_agent import ChatAgent
+from src.backend.config import load_settings
+from src.backend.llm_client import LLMClient
+
+DEFAULT_TRANSCRIPT_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../data/chat_sessions')
+)
+
+
+def session_key(project_context: dict) -> str:
+    """
+    One session per generation: its history entry. Project folders are named
+    after the project and rewritten by later runs, so the folder (or name) is
+    only a fallback for contexts without a history id.
+    """
+    history_id = (project_context or {}).get("history_id")
+    if history_id is not None:
+        return f"history:{history_id}"
+    project_path = (project_context or {}).get("project_path")
+    if project_path:
+        return os.path.normcase(os.path.abspath(project_path))
+    srs = (project_context or {}).get("srs") or {}
+    return f"name:{srs.get('project_name', 'Unknown')}"
+
+
+class ChatSessionManager:
+    def __init__(self, max_sessions: int = None, idle_ttl_seconds: float = None,
+                 transcript_dir: str = DEFAULT_TRANSCRIPT_DIR, llm_client: LLMClient = None):
+        """
+        Args:
+            max_sessions: Live agents kept before the least recently used is evicted.
+            idle_ttl_seconds: Idle time after which a session is evicted.
+            transcript_dir: Where transcripts are written (one JSON per project).
+            llm_client: Client shared by every session; created once if omitted.
+        """
+        conf = (load_settings().get("chat") or {}).get("sessions") or {}
+        self.max_sessions = max_sessions or conf.get("max_sessions", 32)
+        self.idle_ttl_seconds = idle_ttl_seconds or conf.get("idle_ttl_seconds", 1800)
+        self.transcript_dir = transcript_dir
+        self.llm_client = llm_client or LLMClient()
+        # key -> [agent, last_used]
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_agent(self, project_context: dict) -> ChatAgent:
+        """The pooled agent for this project, created (with its saved transcript) if needed."""
+        key = session_key(project_context)
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._pop_expired(now)
+            session = self._sessions.get(key)
+            if session is not None:
+                session[1] = now
+                self._sessions.move_to_end(key)
+                agent = session[0]
+            else:
+                agent = ChatAgent(project_context=project_context, llm_client=self.llm_client)
+                self._restore(key, agent)
+                agent.on_turn = lambda a, key=key: self._save_transcript(key, a)
+                self._sessions[key] = [agent, now]
+                while len(self._sessions) > self.max_sessions:
+                    evicted.append(self._sessions.popitem(last=False)[1][0])
+        for old in evicted:
+            old.close()
+        return agent
+
+    def close_session(self, project_context: dict):
+        with self._lock:
+            session = self._sessions.pop(session_key(project_context), None)
+        if session is not None:
+            session[0].close()
+
+    def close_all(self):
+        with self._lock:
+            agents = [session[0] for session in self._sessions.values()]
+            self._sessions.clear()
+        for agent in agents:
+            agent.close()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _pop_expired(self, now: float) -> list:
+        expired = [key for key, (_, last_used) in self._sessions.items()
+                   if now - last_used > self.idle_ttl_seconds]
+        return [self._sessions.pop(key)[0] for key in expired]
+
+    def transcript_path(self, key: str) -> str:
+        return os.path.join(self.transcript_dir, f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.json")
+
+    def _restore(self, key: str, agent: ChatAgent):
+        path = self.transcript_path(key)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                agent.memory.restore(json.load(f))
+        except Exception as e:
+            print(f"Warning: Could not restore chat transcript {path}: {e}")
+
+    def _save_transcript(self, key: str, agent: ChatAgent):
+        # Written after every turn, so a crash loses at most the turn in flight
+        os.makedirs(self.transcript_dir, exist_ok=True)
+        path = self.transcript_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.transcript_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"session": key, **agent.memory.snapshot()}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"Warning: Could not save chat transcript {path}: {e}")
@@ -0,0 +1,121 @@
+"""
+Code Index Module.
+BM25 index over a generated project's source files, built at generation time
+and stored in the project under .specops/, so chat turns can retrieve only
+the few snippets relevant to a question instead of the whole codebase.
+"""
+import os
+import re
+
+from src.backend.context_packer import pack_context
+from src.backend.lexical_index import BM25Index
+
+INDEX_DIR = ".specops"
+INDEX_FILE = "code_index.json"
+
+# Directories that never hold project source
+SKIP_DIRS = frozenset({".git", INDEX_DIR, "__pycache__", ".pytest_cache", ".venv", "venv", "node_modules"})
+MAX_FILE_BYTES = 200_000
+
+# Top-level definitions start a new chunk once the current one has some body
+_BOUNDARY_RE = re.compile(r"(async def |def |class |@)")
+
+
+def code_index_path(project_path: str) -> str:
+    return os.path.join(project_path, INDEX_DIR, INDEX_FILE)
+
+
+def chunk_file(content: str, max_lines: int = 40, min_lines: int = 8) -> list:
+    """
+    Splits a file into non-overlapping line ranges, preferring top-level
+    def/class boundaries. Returns [(start_line, end_line, text), ...], 1-based.
+    """
+    lines = content.splitlines()
+    chunks = []
+    start = 0
+    for i, line in enumerate(lines):
+        size = i - start
+        if size >= max_lines or (size >= min_lines and _BOUNDARY_RE.match(line)):
+            chunks.append((start, i))
+            start = i
+    if start < len(lines):
+        chunks.append((start, len(lines)))
+    result = []
+    for a, b in chunks:
+        text = "\n".join(lines[a:b])
+        if text.strip():
+            result.append((a + 1, b, text))
+    return result
+
+
+def _read_project_files(project_path: str) -> dict:
+    files = {}
+    for root, dirs, names in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(names):
+            full_path = os.path.join(root, name)
+            if os.path.getsize(full_path) > MAX_FILE_BYTES:
+                continue
+            try:
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except (UnicodeDecodeError, OSError):
+                continue  # Binary or unreadable
+            files[os.path.relpath(full_path, project_path).replace(os.sep, "/")] = content
+    return files
+
+
+def build_code_index(project_path: str, max_lines: int = 40) -> BM25Index:
+    """Indexes the project's text files as found on disk and saves the index in the project."""
+    ids, documents, metadatas = [], [], []
+    for rel_path, content in _read_project_files(project_path).items():
+        for start, end, text in chunk_file(content, max_lines=max_lines):
+            ids.append(f"{rel_path}:{start}")
+            # The path is indexed too, so "user model" finds models/user.py
+            documents.append(f"{rel_path}\n{text}")
+            metadatas.append({"path": rel_path, "start_line": start, "end_line": end})
+
+    index = BM25Index().build(ids, documents, metadatas)
+    path = code_index_path(project_path)
+    index.save(path)
+    # Keep the index out of the generated project's own git repository
+    with open(os.path.join(os.path.dirname(path), ".gitignore"), 'w', encoding='utf-8') as f:
+        f.write("*\n")
+    return index
+
+
+def load_code_index(project_path: str) -> BM25Index:
+    """
+    The project's saved index; built on demand for projects generated before
+    indexing existed. None when the project folder is gone.
+    """
+    if not project_path or not os.path.isdir(project_path):
+        return None
+    path = code_index_path(project_path)
+    if os.path.exists(path):
+        try:
+            return BM25Index.load(path)
+        except Exception as e:
+            print(f"Warning: Could not load code index ({e}); rebuilding.")
+    return build_code_index(project_path)
+
+
+def indexed_files(index: BM25Index) -> list:
+    return list(dict.fromkeys(meta["path"] for meta in index.metadatas))
+
+
+def retrieve_code_context(index: BM25Index, query: str, budget_tokens: int, top_k: int = 8) -> dict:
+    """
+    Best-matching snippets for `query`, packed into `budget_tokens`.
+    Returns pack_context's {"entries", "text", "tokens", "dropped"}.
+    """
+    chunks = []
+    for doc_id, _ in index.search(query, top_k=top_k):
+        hit = index.get(doc_id)
+        meta = hit["metadata"]
+        chunks.append({
+            "document": hit["document"].split("\n", 1)[-1],
+            "metadata": {"source": f"{meta['path']} (lines {meta['start_line']}-{meta['end_line']})"},
+        })
+    # Chunks never overlap, so there is nothing to trim
+    return pack_context(chunks, budget_tokens, overlap_window=0)
@@ -0,0 +1,23 @@
+"""
+Config Module.
+Loads config/settings.yaml once and exposes it as a plain dict.
+"""
+import os
+from functools import lru_cache
+import yaml
+
+SETTINGS_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../config/settings.yaml')
+)
+
+@lru_cache(maxsize=None)
+def load_settings(path: str = SETTINGS_PATH) -> dict:
+    """Returns the parsed settings (empty dict if the file is missing)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+def get_setting(section: str, key: str, default=None):
+    """Convenience accessor for settings[section][key]."""
+    return (load_settings().get(section) or {}).get(key, default)
@@ -0,0 +1,76 @@
+"""
+Context Packer Module.
+Fits retrieved knowledge-base chunks into a token budget for prompting:
+drops duplicates, trims the 100-character overlap that ingestion leaves
+between neighbouring chunks, and fills the budget greedily in rank order.
+"""
+import hashlib
+import json
+
+# Same heuristic as LLMBackend.count_tokens
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def compact_json(data) -> str:
+    """JSON without indentation or padding; the model reads it just as well."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _trim_overlap(text: str, packed: list, window: int) -> str:
+    """Removes a leading/trailing `window` that repeats an already packed chunk's edge."""
+    if window <= 0:
+        return text
+    for other in packed:
+        if len(text) > window and text[:window] == other[-window:]:
+            text = text[window:]
+        if len(text) > window and text[-window:] == other[:window]:
+            text = text[:-window]
+    return text
+
+
+def pack_context(chunks: list, budget_tokens: int, overlap_window: int = 100,
+                 min_chunk_tokens: int = 50) -> dict:
+    """
+    Args:
+        chunks: Ranked dicts with `document` and `metadata` (best first).
+        budget_tokens: Token budget for the rendered context.
+        overlap_window: Length of the chunk overlap written at ingestion.
+        min_chunk_tokens: Smallest truncated tail worth including.
+
+    Returns:
+        {"entries": [str], "text": str, "tokens": int, "dropped": int}
+    """
+    entries = []
+    packed = []
+    seen = set()
+    used = 0
+    dropped = 0
+    for chunk in chunks:
+        document = (chunk.get("document") or "").strip()
+        digest = hashlib.sha1(" ".join(document.split()).encode("utf-8")).hexdigest()
+        if not document or digest in seen or any(document in other for other in packed):
+            dropped += 1
+            continue
+        seen.add(digest)
+
+        content = _trim_overlap(document, packed, overlap_window)
+        source = (chunk.get("metadata") or {}).get("source", "Unknown")
+        entry = f"- Source: {source}\n  Content: {content}"
+        cost = estimate_tokens(entry)
+        remaining = budget_tokens - used
+        if cost > remaining:
+            if remaining < min_chunk_tokens:
+                dropped += 1
+                continue
+            # Greedy fill: the first chunk that doesn't fit takes what is left
+            entry = entry[:remaining * CHARS_PER_TOKEN - 3] + "..."
+            cost = estimate_tokens(entry)
+        entries.append(entry)
+        packed.append(document)
+        used += cost
+
+    return {"entries": entries, "text": "\n".join(entries), "tokens": used, "dropped": dropped}
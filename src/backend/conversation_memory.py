@@ -0,0 +1,177 @@
+"""
+Conversation Memory Module.
+Chat history for ChatAgent with a constant prompt footprint: the newest turns
+are kept verbatim within a token budget, and turns that fall out of it are
+folded into a running summary by a background thread, off the response path.
+"""
+import threading
+import time
+
+from src.backend.context_packer import CHARS_PER_TOKEN, estimate_tokens
+
+# A failed summary update is retried with exponential backoff, then left for the next turn
+SUMMARY_ATTEMPTS = 3
+SUMMARY_BACKOFF_SECONDS = 2.0
+
+SUMMARY_PROMPT = """Update the running summary of a conversation about a generated software project.
+Keep facts, decisions, file names and open questions. Stay under {words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{exchanges}
+
+Return ONLY the updated summary."""
+
+
+def format_turn(turn: dict) -> str:
+    return f"User: {turn['user']}\nAssistant: {turn['assistant']}"
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max(0, max_chars - 3)] + "..."
+
+
+class ConversationMemory:
+    def __init__(self, llm_client, recent_budget_tokens: int = 1500, summary_budget_tokens: int = 300,
+                 background: bool = True):
+        """
+        Args:
+            llm_client: Client used to update the summary.
+            recent_budget_tokens: Budget for the verbatim recent turns.
+            summary_budget_tokens: Target size of the running summary.
+            background: Summarize in a worker thread (inline when False).
+        """
+        self.llm_client = llm_client
+        self.recent_budget_tokens = recent_budget_tokens
+        self.summary_budget_tokens = summary_budget_tokens
+        self.background = background
+        self.turns = []
+        self.summary = ""
+        # turns[:_summarized] are covered by the summary
+        self._summarized = 0
+        # Bumped by clear() so an in-flight summary of old turns is discarded
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def add(self, user_message: str, response: str):
+        with self._lock:
+            self.turns.append({"user": user_message, "assistant": response})
+        self._schedule_summary()
+
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.summary = ""
+            self._summarized = 0
+            self._generation += 1
+
+    def snapshot(self) -> dict:
+        """JSON-serializable state, for persisting the transcript."""
+        with self._lock:
+            return {"turns": list(self.turns), "summary": self.summary, "summarized": self._summarized}
+
+    def restore(self, data: dict):
+        with self._lock:
+            self.turns = list(data.get("turns") or [])
+            self.summary = data.get("summary") or ""
+            self._summarized = min(data.get("summarized", 0), len(self.turns))
+            self._generation += 1
+
+    def render(self) -> str:
+        """
+        History section of the next prompt: the summary, turns that left the
+        window but are not summarized yet (update running or failed; shortened
+        to the summary budget), then the newest turns that fit the budget.
+        """
+        with self._lock:
+            summary = self.summary
+            start = self._window_start()
+            pending = self.turns[self._summarized:start]
+            recent = self.turns[start:]
+        if not summary and not pending and not recent:
+            return ""
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+        if pending:
+            share = self.summary_budget_tokens * CHARS_PER_TOKEN // len(pending)
+            body = "\n\n".join(_shorten(format_turn(t), share) for t in pending)
+            sections.append(f"Earlier exchanges (not yet summarized):\n{body}")
+        if recent:
+            # A single newest turn can be larger than the whole budget
+            body = _shorten("\n\n".join(format_turn(t) for t in recent), self.recent_budget_tokens * CHARS_PER_TOKEN)
+            sections.append(f"Previous conversation:\n{body}")
+        return "\n\n".join(sections)
+
+    def wait(self, timeout: float = None):
+        """Blocks until a pending summary update finishes."""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def _window_start(self) -> int:
+        # Newest-first until the budget is spent; always keeps the newest turn
+        start = len(self.turns)
+        used = 0
+        while start > self._summarized:
+            cost = estimate_tokens(format_turn(self.turns[start - 1]))
+            if used + cost > self.recent_budget_tokens and start < len(self.turns):
+                break
+            used += cost
+            start -= 1
+        return start
+
+    def _schedule_summary(self):
+        with self._lock:
+            if self._window_start() <= self._summarized:
+                return
+            if self._worker is not None:
+                # The running worker re-checks for new overflow before it exits
+                return
+            if self.background:
+                self._worker = threading.Thread(target=self._summarize_overflow, daemon=True)
+                self._worker.start()
+                return
+        self._summarize_overflow()
+
+    def _summarize_overflow(self):
+        failures = 0
+        while True:
+            with self._lock:
+                end = self._window_start()
+                if end <= self._summarized:
+                    # Cleared under the lock, so a turn added after this check starts a new worker
+                    self._worker = None
+                    return
+                generation = self._generation
+                summary = self.summary
+                exchanges = "\n\n".join(format_turn(t) for t in self.turns[self._summarized:end])
+
+            prompt = SUMMARY_PROMPT.format(
+                words=int(self.summary_budget_tokens * 0.75),
+                summary=summary or "(none yet)",
+                exchanges=exchanges,
+            )
+            try:
+                updated = self.llm_client.generate_content(prompt).strip()
+            except Exception as e:
+                failures += 1
+                print(f"Warning: Chat history summarization failed ({failures}/{SUMMARY_ATTEMPTS}): {e}")
+                # Inline mode never sleeps on the caller's thread; the turns stay in render() meanwhile
+                if not self.background or failures >= SUMMARY_ATTEMPTS:
+                    with self._lock:
+                        self._worker = None
+                    return
+                time.sleep(SUMMARY_BACKOFF_SECONDS * 2 ** (failures - 1))
+                continue
+
+            failures = 0
+            with self._lock:
+                # After clear()/restore() the summary describes turns that are gone
+                if generation == self._generation:
+                    self.summary = updated
+                    self._summarized = end
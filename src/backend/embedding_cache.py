@@ -0,0 +1,114 @@
+"""
+Embedding Cache Module.
+Two-tier cache for embeddings keyed by (model, task_type, text hash):
+an in-memory LRU in front of an on-disk store of packed float32 vectors.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.backend.config import load_settings
+
+DEFAULT_CACHE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../data/cache/embeddings')
+)
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_memory_entries: int = 1024,
+                 persist: bool = True):
+        """
+        Args:
+            cache_dir: Root of the on-disk tier (one .f32 file per entry).
+            max_memory_entries: LRU capacity of the in-memory tier.
+            persist: Disable to keep the cache purely in memory.
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.persist = persist
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, task_type: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{task_type}\x00{text}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # Shard by prefix so no directory grows unbounded
+        return os.path.join(self.cache_dir, key[:2], f"{key}.f32")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, task_type: str, text: str):
+        """Returns the cached embedding as a float32 array, or None."""
+        key = self.make_key(model, task_type, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        path = self._path(key)
+        if self.persist and os.path.exists(path):
+            try:
+                vector = np.fromfile(path, dtype=np.float32)
+            except OSError:
+                vector = None
+            if vector is not None and vector.size:
+                with self._lock:
+                    self._remember(key, vector)
+                    self.hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model: str, task_type: str, text: str, embedding):
+        key = self.make_key(model, task_type, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+
+        if self.persist:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write-then-rename so concurrent readers never see a partial vector
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                vector.tofile(tmp_path)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Failed to persist embedding cache entry: {e}")
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache configured from llm.embedding_cache in settings.yaml."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            conf = (load_settings().get("llm") or {}).get("embedding_cache") or {}
+            _shared_cache = EmbeddingCache(
+                cache_dir=conf.get("dir") or DEFAULT_CACHE_DIR,
+                max_memory_entries=conf.get("memory_entries", 1024),
+                persist=conf.get("persist", True),
+            )
+        return _shared_cache
@@ -0,0 +1,136 @@
+"""
+Embedding Providers Module.
+Pluggable embedding backends for retrieval, selected by rag.embedding_provider
+in config/settings.yaml:
+  - gemini                 remote text-embedding-004 via LLMClient (default)
+  - hashing                local hashed TF-IDF vectorizer, pure NumPy, no network
+  - sentence_transformers  local CPU transformer model (optional dependency)
+Each provider gets its own ChromaDB collection because vectors from different
+models are not comparable.
+"""
+import os
+import re
+import zlib
+
+import numpy as np
+
+from src.backend.config import load_settings
+
+BASE_COLLECTION = "design_patterns"
+DEFAULT_IDF_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/chroma_db'))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class EmbeddingProvider:
+    """Interface: embed(str) -> vector, embed(list[str]) -> (n, dim) float32 matrix."""
+    name = "base"
+
+    def embed(self, text, task_type: str = "retrieval_query") -> np.ndarray:
+        raise NotImplementedError
+
+    @property
+    def collection_name(self) -> str:
+        return BASE_COLLECTION if self.name == "gemini" else f"{BASE_COLLECTION}_{self.name}"
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini"
+
+    def __init__(self, llm_client=None):
+        if llm_client is None:
+            from src.backend.llm_client import LLMClient
+            llm_client = LLMClient()
+        self.llm_client = llm_client
+
+    def embed(self, text, task_type: str = "retrieval_query") -> np.ndarray:
+        return self.llm_client.get_embedding(text, task_type=task_type)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Feature-hashed TF-IDF over word unigrams and bigrams.
+    Sublinear term frequency, signed hashing to reduce collision bias and
+    L2 normalization, so cosine similarity is a plain dot product. IDF
+    weights are fitted at ingestion time (fit) and stored next to the
+    vector DB; without them every bucket is weighted equally.
+    """
+    name = "hashing"
+
+    def __init__(self, dimension: int = 1024, idf_path: str = None):
+        self.dimension = dimension
+        self.idf_path = idf_path or os.path.join(DEFAULT_IDF_DIR, f"hashing_idf_{dimension}.npy")
+        self.idf = None
+        if os.path.exists(self.idf_path):
+            self.idf = np.load(self.idf_path).astype(np.float32)
+
+    @staticmethod
+    def _features(text: str) -> list:
+        tokens = _TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def _term_counts(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dimension, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            vec[h % self.dimension] += 1.0 if (h >> 31) & 1 else -1.0
+        return vec
+
+    def fit(self, corpus: list):
+        """Computes smoothed IDF per hash bucket over `corpus` and saves it."""
+        doc_freq = np.zeros(self.dimension, dtype=np.float32)
+        for text in corpus:
+            doc_freq += self._term_counts(text) != 0
+        n_docs = max(len(corpus), 1)
+        self.idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1.0).astype(np.float32)
+        os.makedirs(os.path.dirname(self.idf_path), exist_ok=True)
+        np.save(self.idf_path, self.idf)
+
+    def embed(self, text, task_type: str = "retrieval_query") -> np.ndarray:
+        texts = [text] if isinstance(text, str) else list(text)
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, t in enumerate(texts):
+            counts = self._term_counts(t)
+            # Sublinear tf, keeping the hash sign
+            matrix[i] = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        return matrix[0] if isinstance(text, str) else matrix
+
+
+class SentenceTransformerProvider(EmbeddingProvider):
+    """Small local transformer (e.g. all-MiniLM-L6-v2) on CPU. Needs `sentence-transformers`."""
+    name = "sentence_transformers"
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "rag.embedding_provider 'sentence_transformers' requires `pip install sentence-transformers`."
+            ) from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text, task_type: str = "retrieval_query") -> np.ndarray:
+        result = self.model.encode(text, normalize_embeddings=True, convert_to_numpy=True)
+        return np.ascontiguousarray(result, dtype=np.float32)
+
+
+def get_embedding_provider(llm_client=None, name: str = None) -> EmbeddingProvider:
+    """
+    Builds the provider named by `name` or rag.embedding_provider (default gemini).
+    `llm_client` is reused by the Gemini provider so agents keep sharing one client.
+    """
+    rag_settings = load_settings().get("rag") or {}
+    name = name or rag_settings.get("embedding_provider", "gemini")
+    local_settings = rag_settings.get("local_embedding") or {}
+
+    if name == "gemini":
+        return GeminiEmbeddingProvider(llm_client)
+    if name == "hashing":
+        return HashingEmbeddingProvider(dimension=local_settings.get("dimension", 1024))
+    if name == "sentence_transformers":
+        return SentenceTransformerProvider(local_settings.get("model", "all-MiniLM-L6-v2"))
+    raise ValueError(f"Unknown embedding provider '{name}'. Use gemini, hashing or sentence_transformers.")
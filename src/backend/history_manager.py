@@ -1,86 +1,430 @@
 """
 History Manager Module.
-Handles persistence of generated projects to a JSON file.
+Handles persistence of generated projects to a SQLite database (WAL mode).
+Entries from the legacy data/history.json are imported once on first use.
+Writes run in BEGIN IMMEDIATE transactions so concurrent sessions and
+workers serialize instead of losing entries; entries whose project
+directory disappeared are pruned by a background job, never during reads.
+Full pipeline results are stored zlib-compressed in a side table and only
+loaded when a single entry is opened.
 """
+import hashlib
 import json
 import os
+import sqlite3
+import threading
 import time
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
 
+from src.backend.config import load_settings
+
+# Columns stored natively; any other keys of an entry go to `extra` as JSON
+_COLUMNS = ("project_name", "timestamp", "path", "prompt", "srs", "fingerprint")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    path TEXT,
+    prompt TEXT,
+    srs TEXT,
+    extra TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_projects_timestamp ON projects (timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (project_name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('change_counter', 0);
+CREATE TRIGGER IF NOT EXISTS projects_after_insert AFTER INSERT ON projects BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'change_counter';
+END;
+CREATE TRIGGER IF NOT EXISTS projects_after_delete AFTER DELETE ON projects BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'change_counter';
+END;
+CREATE TABLE IF NOT EXISTS project_results (
+    project_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS projects_delete_results AFTER DELETE ON projects BEGIN
+    DELETE FROM project_results WHERE project_id = OLD.id;
+END;
+"""
+
+# Result keys not worth persisting (kept elsewhere or only meaningful live)
+_TRANSIENT_RESULT_KEYS = ("srs", "project_path", "details")
+
+# How long a project directory's existence check stays valid for listings
+PATH_CHECK_TTL_SECONDS = 30.0
+
+# Writers wait this long for the database lock before failing
+BUSY_TIMEOUT_SECONDS = 30.0
+
+# Process-wide caches shared by every HistoryManager instance (Streamlit builds
+# a new one per rerun): initialized databases, listing pages keyed by
+# (db_file, limit, offset) -> (change_counter, rows), and path checks.
+_initialized = set()
+_summary_cache = {}
+_path_checks = {}
+_cache_lock = threading.Lock()
+# db_file -> (thread, stop event) of the background pruning job
+_pruners = {}
+
+
+def build_file_manifest(files: dict) -> list:
+    """[{path, size, sha256}] for a generated file map, sorted by path."""
+    manifest = []
+    for rel_path, content in sorted(files.items()):
+        data = content.encode('utf-8') if isinstance(content, str) else bytes(content)
+        manifest.append({"path": rel_path, "size": len(data), "sha256": hashlib.sha256(data).hexdigest()})
+    return manifest
+
+
+def manifest_matches(project_path: str, manifest: list) -> bool:
+    """
+    True when every file in `manifest` is on disk under `project_path` with
+    the recorded size and sha256. Extra files (.git, caches) are ignored.
+    """
+    if not manifest:
+        return False
+    for item in manifest:
+        full_path = os.path.join(project_path, item["path"].lstrip('/\\'))
+        try:
+            if os.path.getsize(full_path) != item["size"]:
+                return False
+            with open(full_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != item["sha256"]:
+                    return False
+        except OSError:
+            return False
+    return True
+
+
+def _compress(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":"), default=str).encode('utf-8'), 6)
+
+
+def _decompress(blob: bytes) -> dict:
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
 class HistoryManager:
-    def __init__(self, history_file: str = "data/history.json"):
+    def __init__(self, history_file: str = "data/history.json", db_file: str = "data/history.db"):
+        """
+        Args:
+            history_file: Legacy JSON history, migrated into the database once.
+            db_file: SQLite database holding the history.
+        """
         # Resolve path relative to project root (assuming this file is in src/backend)
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))
         self.history_file = os.path.join(base_dir, history_file)
-        self._ensure_history_file()
+        self.db_file = os.path.join(base_dir, db_file)
+        self._ensure_database()
+
+    @contextmanager
+    def _connect(self, write: bool = False):
+        """
+        Autocommit connection for reads. With `write`, the block runs in a
+        BEGIN IMMEDIATE transaction: the write lock is taken up front, so
+        read-then-write sequences cannot interleave with another writer.
+        """
+        conn = sqlite3.connect(self.db_file, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_SECONDS * 1000)}")
+            if write:
+                conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _ensure_database(self):
+        """Creates the schema if needed and imports the legacy JSON history once."""
+        if self.db_file in _initialized and os.path.exists(self.db_file):
+            return
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Databases created before fingerprints were stored
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(projects)")}
+            if "fingerprint" not in columns:
+                conn.execute("ALTER TABLE projects ADD COLUMN fingerprint TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_fingerprint ON projects (fingerprint)")
+        # Check-and-migrate under the write lock so racing processes import only once
+        with self._connect(write=True) as conn:
+            migrated = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if migrated is None:
+                self._migrate_json(conn)
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                             (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        with _cache_lock:
+            _initialized.add(self.db_file)
 
-    def _ensure_history_file(self):
-        """Creates the history file if it doesn't exist."""
+    def _migrate_json(self, conn):
         if not os.path.exists(self.history_file):
-            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+            return
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Failed to read legacy history for migration: {e}")
+            return
+        # The JSON file is newest first; insert oldest first so ids follow time
+        for entry in reversed(history):
+            self._insert(conn, dict(entry))
+        if history:
+            print(f"Migrated {len(history)} history entries from {self.history_file}.")
+
+    @staticmethod
+    def _insert(conn, project_data: dict) -> int:
+        extra = {k: v for k, v in project_data.items() if k not in _COLUMNS and k != "id"}
+        srs = project_data.get("srs")
+        cursor = conn.execute(
+            "INSERT INTO projects (project_name, timestamp, path, prompt, srs, extra, fingerprint) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                project_data.get("project_name") or "Untitled",
+                project_data.get("timestamp") or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                project_data.get("path"),
+                project_data.get("prompt"),
+                json.dumps(srs, separators=(",", ":")) if srs is not None else None,
+                json.dumps(extra, separators=(",", ":")) if extra else None,
+                project_data.get("fingerprint"),
+            ),
+        )
+        return cursor.lastrowid
 
-    def save_project_entry(self, project_data: dict):
+    @staticmethod
+    def _row_to_entry(row) -> dict:
+        entry = {"id": row["id"], "project_name": row["project_name"], "timestamp": row["timestamp"],
+                 "path": row["path"], "prompt": row["prompt"]}
+        if row["fingerprint"]:
+            entry["fingerprint"] = row["fingerprint"]
+        if row["srs"] is not None:
+            entry["srs"] = json.loads(row["srs"])
+        if row["extra"]:
+            entry.update(json.loads(row["extra"]))
+        return entry
+
+    def save_project_entry(self, project_data: dict, result: dict = None):
         """
-        Saves a new project entry to the history file.
-        
+        Saves a new project entry to the history database.
+
         Args:
             project_data: Dict containing 'project_name', 'prompt', 'path', 'srs', 'timestamp'
+            result: Full pipeline result (patterns, quality report, explanation,
+                    metrics, file manifest), stored compressed for get_project_result.
         """
         try:
-            # Load existing
-            history = self.get_all_projects()
-            
             # Add timestamp if missing
             if 'timestamp' not in project_data:
                 project_data['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-            # Prepend to list (newest first)
-            history.insert(0, project_data)
-            
-            # Save
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2)
-                
+
+            with self._connect(write=True) as conn:
+                project_data['id'] = self._insert(conn, project_data)
+                if result is not None:
+                    stored = {k: v for k, v in result.items() if k not in _TRANSIENT_RESULT_KEYS}
+                    conn.execute("INSERT OR REPLACE INTO project_results (project_id, data) VALUES (?, ?)",
+                                 (project_data['id'], _compress(stored)))
             return True
         except Exception as e:
             print(f"Failed to save history: {e}")
             return False
 
+    def list_projects(self, limit: int = 50, offset: int = 0, project_name: str = None) -> list:
+        """Newest-first page of history entries, optionally filtered by exact project name."""
+        query = "SELECT * FROM projects"
+        params = []
+        if project_name is not None:
+            query += " WHERE project_name = ?"
+            params.append(project_name)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        try:
+            with self._connect() as conn:
+                return [self._row_to_entry(row) for row in conn.execute(query, params)]
+        except sqlite3.Error as e:
+            print(f"Failed to read history: {e}")
+            return []
+
+    def change_counter(self) -> int:
+        """Increments on every insert/delete; cheap to poll for cache invalidation."""
+        with self._connect() as conn:
+            return int(conn.execute("SELECT value FROM meta WHERE key = 'change_counter'").fetchone()[0])
+
+    def list_summaries(self, limit: int = 20, offset: int = 0) -> list:
+        """
+        Lightweight newest-first listing for the UI: id, project_name,
+        timestamp and path only. Pages are cached until the change counter
+        moves, and only the returned page's paths are checked on disk (at
+        most every PATH_CHECK_TTL_SECONDS), so a rerun costs one indexed
+        lookup instead of a full history scan.
+        """
+        try:
+            rows = self._summary_rows(limit, offset)[:limit]
+            return [dict(row) for row in rows if self._path_exists(row["path"])]
+        except sqlite3.Error as e:
+            print(f"Failed to read history: {e}")
+            return []
+
+    def has_more_summaries(self, limit: int = 20, offset: int = 0) -> bool:
+        """
+        Whether entries exist beyond this page. list_summaries can return a
+        short page (folders deleted but not yet pruned), so its length can't tell.
+        """
+        try:
+            return len(self._summary_rows(limit, offset)) > limit
+        except sqlite3.Error as e:
+            print(f"Failed to read history: {e}")
+            return False
+
+    def _summary_rows(self, limit: int, offset: int) -> list:
+        # One extra row tells whether a next page exists
+        counter = self.change_counter()
+        key = (self.db_file, limit, offset)
+        with _cache_lock:
+            cached = _summary_cache.get(key)
+        if cached is not None and cached[0] == counter:
+            return cached[1]
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(
+                "SELECT id, project_name, timestamp, path FROM projects "
+                "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?", (limit + 1, offset))]
+        with _cache_lock:
+            _summary_cache[key] = (counter, rows)
+        return rows
+
+    @staticmethod
+    def _path_exists(path: str) -> bool:
+        if not path:
+            return False
+        now = time.monotonic()
+        with _cache_lock:
+            checked = _path_checks.get(path)
+        if checked is not None and now - checked[0] < PATH_CHECK_TTL_SECONDS:
+            return checked[1]
+        exists = os.path.exists(path)
+        with _cache_lock:
+            _path_checks[path] = (now, exists)
+        return exists
+
+    def count_projects(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def get_project(self, entry_id: int) -> dict:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM projects WHERE id = ?", (entry_id,)).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_project_result(self, entry_id: int) -> dict:
+        """
+        The stored pipeline result for an entry, merged with its SRS and
+        path, or None for entries saved without one.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT r.data, p.srs, p.path FROM project_results r JOIN projects p ON p.id = r.project_id "
+                "WHERE r.project_id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        result = _decompress(row["data"])
+        result["srs"] = json.loads(row["srs"]) if row["srs"] else {}
+        result["project_path"] = row["path"]
+        return result
+
+    def find_result_by_fingerprint(self, fingerprint: str) -> dict:
+        """
+        Newest stored result for a run fingerprint whose project files are
+        still on disk unchanged (with its history id under "history_id"), or
+        None. Project folders are named after the project and reused by later
+        runs, so the stored file manifest is checked, not just the folder.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT p.id, p.path FROM projects p JOIN project_results r ON r.project_id = p.id "
+                "WHERE p.fingerprint = ? ORDER BY p.timestamp DESC, p.id DESC", (fingerprint,)).fetchall()
+        for row in rows:
+            if row["path"] and os.path.isdir(row["path"]):
+                result = self.get_project_result(row["id"])
+                if result is not None and manifest_matches(row["path"], result.get("file_manifest")):
+                    result["history_id"] = row["id"]
+                    return result
+        return None
+
     def get_all_projects(self) -> list:
         """
         Returns list of all projects that actually exist on disk.
-        Removes missing projects from the history file.
+        Read-only: missing projects are removed by prune_missing_projects.
         """
         try:
-            if not os.path.exists(self.history_file):
-                return []
-            
-            with open(self.history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-            
-            # Filter valid projects
-            valid_history = []
-            changes_made = False
-            
-            for proj in history:
-                path = proj.get('path')
-                if path and os.path.exists(path):
-                    valid_history.append(proj)
-                else:
-                    changes_made = True
-            
-            # Update file if we pruned anything
-            if changes_made:
-                with open(self.history_file, 'w', encoding='utf-8') as f:
-                    json.dump(valid_history, f, indent=2)
-                    
-            return valid_history
+            with self._connect() as conn:
+                rows = conn.execute("SELECT * FROM projects ORDER BY timestamp DESC, id DESC").fetchall()
+            return [self._row_to_entry(row) for row in rows if row["path"] and os.path.exists(row["path"])]
         except Exception:
             return []
 
+    def prune_missing_projects(self) -> int:
+        """Deletes entries whose project directory no longer exists. Returns how many."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, path FROM projects").fetchall()
+        # Filesystem checks happen outside the write lock
+        missing_ids = [(row["id"],) for row in rows if not (row["path"] and os.path.exists(row["path"]))]
+        if missing_ids:
+            with self._connect(write=True) as conn:
+                conn.executemany("DELETE FROM projects WHERE id = ?", missing_ids)
+        return len(missing_ids)
+
+    def start_background_pruning(self, interval_seconds: float = None) -> bool:
+        """
+        Runs prune_missing_projects every `interval_seconds` (history.prune_interval_seconds)
+        on a daemon thread; one job per database per process. Returns True if started now.
+        """
+        if interval_seconds is None:
+            interval_seconds = (load_settings().get("history") or {}).get("prune_interval_seconds", 300)
+        with _cache_lock:
+            running = _pruners.get(self.db_file)
+            if running is not None and running[0].is_alive():
+                return False
+            stop = threading.Event()
+
+            def prune_loop():
+                while True:
+                    try:
+                        removed = self.prune_missing_projects()
+                        if removed:
+                            print(f"History: pruned {removed} missing projects.")
+                    except Exception as e:
+                        print(f"History pruning failed: {e}")
+                    if stop.wait(interval_seconds):
+                        return
+
+            thread = threading.Thread(target=prune_loop, name="history-pruner", daemon=True)
+            _pruners[self.db_file] = (thread, stop)
+            thread.start()
+            return True
+
+    def stop_background_pruning(self):
+        with _cache_lock:
+            running = _pruners.pop(self.db_file, None)
+        if running is not None:
+            running[1].set()
+            running[0].join(timeout=5)
+
     def clear_history(self):
-        """Clears the history file."""
-        with open(self.history_file, 'w', encoding='utf-8') as f:
-            json.dump([], f)
+        """Clears the history database."""
+        with self._connect(write=True) as conn:
+            conn.execute("DELETE FROM projects")
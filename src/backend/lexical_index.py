@@ -0,0 +1,121 @@
+"""
+Lexical Index Module.
+BM25 inverted index over the ingested pattern chunks, built at ingestion
+time and stored as JSON next to the vector DB, plus reciprocal rank fusion
+for combining lexical and vector rankings.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def index_path_for(db_path: str, collection_name: str) -> str:
+    """Where the BM25 index for a ChromaDB collection lives."""
+    return os.path.join(db_path, f"{collection_name}_bm25.json")
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.doc_lengths = []
+        self.avg_doc_length = 0.0
+        # term -> [[doc_index, term_frequency], ...]
+        self.postings = {}
+        self._positions = {}
+
+    def build(self, ids: list, documents: list, metadatas: list = None):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas else [{} for _ in ids]
+        self.doc_lengths = []
+        self.postings = {}
+        for doc_index, doc in enumerate(self.documents):
+            tokens = tokenize(doc)
+            self.doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append([doc_index, tf])
+        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        self._positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        return self
+
+    def _idf(self, term: str) -> float:
+        n = len(self.ids)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """Returns [(id, score), ...] best first; documents sharing no term are omitted."""
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_index, tf in postings:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_doc_length or 1.0)
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.ids[i], score) for i, score in ranked]
+
+    def get(self, doc_id: str) -> dict:
+        i = self._positions.get(doc_id)
+        if i is None:
+            return None
+        return {"id": doc_id, "document": self.documents[i], "metadata": self.metadatas[i]}
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        index.ids = data["ids"]
+        index.documents = data["documents"]
+        index.metadatas = data["metadatas"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index.avg_doc_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        index._positions = {doc_id: i for i, doc_id in enumerate(index.ids)}
+        return index
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuses several ranked id lists: score(d) = sum over lists of 1 / (k + rank).
+    Returns [(id, fused_score), ...] best first.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,342 @@
+"""
+LLM Backends Module.
+Pluggable transports behind LLMClient: the live Gemini API and a
+record/replay backend that serves captured responses without network access.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import google.api_core.exceptions
+import google.generativeai as genai
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_EMBED_MODEL = "models/text-embedding-004"
+
+DEFAULT_CASSETTE = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../data/replay/cassette.json')
+)
+
+
+def prompt_hash(text: str) -> str:
+    """Stable key for a prompt or embedding input."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def join_prefix(prefix: str, prompt: str) -> str:
+    """How a cached prefix and a prompt read when sent inline as one prompt."""
+    return f"{prefix}\n\n{prompt}"
+
+
+class LLMBackend:
+    """
+    Interface every backend implements. LLMClient adds retries and token
+    tracking on top, so backends only move text in and out.
+    """
+    name = "base"
+    model_name = ""
+    embed_model_name = ""
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def embed(self, texts: list, task_type: str) -> list:
+        """Embeds a batch of texts; returns one vector per text, in order."""
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> int:
+        # Approx 4 chars per token
+        return len(text) // 4
+
+    async def agenerate(self, prompt: str) -> str:
+        # Backends without a native async API run the blocking call in a worker thread
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def aembed(self, texts: list, task_type: str) -> list:
+        return await asyncio.to_thread(self.embed, texts, task_type)
+
+    def generate_stream(self, prompt: str):
+        """Yields the response in text chunks as they arrive (one chunk if the backend cannot stream)."""
+        yield self.generate(prompt)
+
+    # Explicit context caching: a prompt prefix stored server-side once and
+    # referenced by name. Backends without it leave supports_context_cache off
+    # and LLMClient sends the prefix inline instead.
+    supports_context_cache = False
+
+    def create_context_cache(self, prefix: str, ttl_seconds: int) -> str:
+        """Stores `prefix` and returns the cache name."""
+        raise NotImplementedError
+
+    def generate_cached(self, cache_name: str, prompt: str) -> str:
+        """Generates as if the cached prefix preceded `prompt`."""
+        raise NotImplementedError
+
+    def delete_context_cache(self, cache_name: str):
+        raise NotImplementedError
+
+    async def agenerate_cached(self, cache_name: str, prompt: str) -> str:
+        return await asyncio.to_thread(self.generate_cached, cache_name, prompt)
+
+    def generate_cached_stream(self, cache_name: str, prompt: str):
+        yield self.generate_cached(cache_name, prompt)
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+    model_name = GEMINI_MODEL
+    embed_model_name = GEMINI_EMBED_MODEL
+
+    def __init__(self):
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable not set.")
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(GEMINI_MODEL)
+        # cache name -> model bound to that cached content
+        self._cached_models = {}
+
+    def generate(self, prompt: str) -> str:
+        response = self.model.generate_content(prompt)
+        return getattr(response, "text", None)
+
+    def generate_stream(self, prompt: str):
+        yield from self._stream_text(self.model.generate_content(prompt, stream=True))
+
+    @staticmethod
+    def _stream_text(response):
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. a trailing finish-reason chunk)
+                continue
+            if text:
+                yield text
+
+    def embed(self, texts: list, task_type: str) -> list:
+        # A list `content` is sent as a single batchEmbedContents request
+        result = genai.embed_content(
+            model=GEMINI_EMBED_MODEL,
+            content=list(texts),
+            task_type=task_type,
+        )
+        return result.get("embedding")
+
+    def count_tokens(self, text: str) -> int:
+        # Gemini API has count_tokens
+        return self.model.count_tokens(text).total_tokens
+
+    async def agenerate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return getattr(response, "text", None)
+
+    async def aembed(self, texts: list, task_type: str) -> list:
+        result = await genai.embed_content_async(
+            model=GEMINI_EMBED_MODEL,
+            content=list(texts),
+            task_type=task_type,
+        )
+        return result.get("embedding")
+
+    supports_context_cache = True
+
+    def create_context_cache(self, prefix: str, ttl_seconds: int) -> str:
+        cached = genai.caching.CachedContent.create(
+            model=f"models/{GEMINI_MODEL}",
+            contents=[prefix],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        self._cached_models[cached.name] = genai.GenerativeModel.from_cached_content(cached)
+        return cached.name
+
+    def _cached_model(self, cache_name: str):
+        model = self._cached_models.get(cache_name)
+        if model is None:
+            # Cache created by another client instance; looked up by name
+            model = genai.GenerativeModel.from_cached_content(cache_name)
+            self._cached_models[cache_name] = model
+        return model
+
+    def generate_cached(self, cache_name: str, prompt: str) -> str:
+        response = self._cached_model(cache_name).generate_content(prompt)
+        return getattr(response, "text", None)
+
+    async def agenerate_cached(self, cache_name: str, prompt: str) -> str:
+        response = await self._cached_model(cache_name).generate_content_async(prompt)
+        return getattr(response, "text", None)
+
+    def generate_cached_stream(self, cache_name: str, prompt: str):
+        yield from self._stream_text(self._cached_model(cache_name).generate_content(prompt, stream=True))
+
+    def delete_context_cache(self, cache_name: str):
+        self._cached_models.pop(cache_name, None)
+        genai.caching.CachedContent.get(cache_name).delete()
+
+
+class ReplayBackend(LLMBackend):
+    """
+    Serves previously captured responses keyed by prompt hash.
+
+    When constructed with `record_from`, cache misses are forwarded to that
+    backend and the answer is written to the cassette (record mode).
+    Without it, a miss raises. Embeddings that were never recorded are
+    synthesized deterministically from the text hash, so retrieval keeps
+    working offline. `latency` / `embed_latency` add a fixed synthetic delay
+    (plus up to `jitter` seconds) so benchmarks can model network time.
+    Streamed responses are split into `stream_chunk_chars` pieces.
+    """
+    name = "replay"
+    supports_context_cache = True
+    # Simulated server-side context caches (name -> prefix), shared like the real service
+    _context_caches = {}
+    _context_lock = threading.Lock()
+
+    def __init__(self, cassette_path: str = DEFAULT_CASSETTE, latency: float = 0.0,
+                 embed_latency: float = 0.0, jitter: float = 0.0,
+                 record_from: LLMBackend = None, embedding_dim: int = 768,
+                 stream_chunk_chars: int = 64):
+        self.cassette_path = cassette_path
+        self.stream_chunk_chars = stream_chunk_chars
+        self.latency = latency
+        self.embed_latency = embed_latency
+        self.jitter = jitter
+        self.record_from = record_from
+        self.embedding_dim = embedding_dim
+        # Synthetic embeddings must never share cache keys with real ones
+        self.model_name = record_from.model_name if record_from else f"replay:{GEMINI_MODEL}"
+        self.embed_model_name = record_from.embed_model_name if record_from else f"replay:{GEMINI_EMBED_MODEL}"
+        self._lock = threading.Lock()
+        self._cassette = {"responses": {}, "embeddings": {}}
+        if os.path.exists(cassette_path):
+            with open(cassette_path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            self._cassette["responses"].update(loaded.get("responses", {}))
+            self._cassette["embeddings"].update(loaded.get("embeddings", {}))
+
+    def _delay(self, base: float) -> float:
+        return base + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _sleep(self, base: float):
+        delay = self._delay(base)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cassette_path), exist_ok=True)
+        tmp_path = f"{self.cassette_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._cassette, f)
+        os.replace(tmp_path, self.cassette_path)
+
+    def generate(self, prompt: str) -> str:
+        key = prompt_hash(prompt)
+        response = self._cassette["responses"].get(key)
+        if response is None:
+            if not self.record_from:
+                raise RuntimeError(f"No recorded response for prompt {key[:12]} in {self.cassette_path}")
+            response = self.record_from.generate(prompt)
+            if response:
+                with self._lock:
+                    self._cassette["responses"][key] = response
+                    self._save()
+            return response
+
+        self._sleep(self.latency)
+        return response
+
+    def embed(self, texts: list, task_type: str) -> list:
+        keys = [prompt_hash(f"{task_type}:{text}") for text in texts]
+        found = [self._cassette["embeddings"].get(key) for key in keys]
+        missing = [i for i, emb in enumerate(found) if emb is None]
+
+        if missing and self.record_from:
+            recorded = self.record_from.embed([texts[i] for i in missing], task_type)
+            with self._lock:
+                for i, emb in zip(missing, recorded):
+                    found[i] = emb
+                    self._cassette["embeddings"][keys[i]] = emb
+                self._save()
+            return found
+
+        self._sleep(self.embed_latency)
+        return [emb if emb is not None else self._fake_embedding(text) for text, emb in zip(texts, found)]
+
+    async def agenerate(self, prompt: str) -> str:
+        if self.record_from or prompt_hash(prompt) not in self._cassette["responses"]:
+            return await super().agenerate(prompt)
+        await asyncio.sleep(self._delay(self.latency))
+        return self._cassette["responses"][prompt_hash(prompt)]
+
+    async def aembed(self, texts: list, task_type: str) -> list:
+        if self.record_from:
+            return await super().aembed(texts, task_type)
+        await asyncio.sleep(self._delay(self.embed_latency))
+        embeddings = self._cassette["embeddings"]
+        return [
+            embeddings.get(prompt_hash(f"{task_type}:{text}")) or self._fake_embedding(text)
+            for text in texts
+        ]
+
+    def create_context_cache(self, prefix: str, ttl_seconds: int) -> str:
+        name = f"cachedContents/replay-{prompt_hash(prefix)[:16]}"
+        with self._context_lock:
+            self._context_caches[name] = prefix
+        return name
+
+    def generate_cached(self, cache_name: str, prompt: str) -> str:
+        # Keyed like the inline fallback, so one cassette serves both paths
+        prefix = self._context_caches.get(cache_name)
+        if prefix is None:
+            raise google.api_core.exceptions.NotFound(f"Context cache {cache_name} not found")
+        return self.generate(join_prefix(prefix, prompt))
+
+    def generate_stream(self, prompt: str):
+        yield from self._chunked(self.generate(prompt))
+
+    def generate_cached_stream(self, cache_name: str, prompt: str):
+        yield from self._chunked(self.generate_cached(cache_name, prompt))
+
+    def _chunked(self, text: str):
+        # Latency is paid before the first chunk, like time-to-first-token
+        text = text or ""
+        for start in range(0, len(text), self.stream_chunk_chars):
+            yield text[start:start + self.stream_chunk_chars]
+
+    def delete_context_cache(self, cache_name: str):
+        with self._context_lock:
+            self._context_caches.pop(cache_name, None)
+
+    def _fake_embedding(self, text: str) -> list:
+        # Deterministic unit vector seeded by the text hash
+        rng = random.Random(int(prompt_hash(text)[:16], 16))
+        vec = [rng.gauss(0.0, 1.0) for _ in range(self.embedding_dim)]
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+
+def create_backend_from_env() -> LLMBackend:
+    """
+    Picks a backend from the environment:
+      SPECOPS_LLM_BACKEND   gemini (default) | replay | record
+      SPECOPS_REPLAY_FILE   cassette path (default data/replay/cassette.json)
+      SPECOPS_REPLAY_LATENCY / SPECOPS_REPLAY_EMBED_LATENCY  synthetic delay in seconds
+    """
+    mode = os.environ.get("SPECOPS_LLM_BACKEND", "gemini").lower()
+    if mode == "gemini":
+        return GeminiBackend()
+
+    cassette = os.environ.get("SPECOPS_REPLAY_FILE", DEFAULT_CASSETTE)
+    latency = float(os.environ.get("SPECOPS_REPLAY_LATENCY", "0"))
+    embed_latency = float(os.environ.get("SPECOPS_REPLAY_EMBED_LATENCY", "0"))
+    if mode == "replay":
+        return ReplayBackend(cassette, latency=latency, embed_latency=embed_latency)
+    if mode == "record":
+        return ReplayBackend(cassette, record_from=GeminiBackend())
+    raise ValueError(f"Unknown SPECOPS_LLM_BACKEND '{mode}'. Use gemini, replay or record.")
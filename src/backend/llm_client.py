@@ -1,14 +1,15 @@
 """
 LLM Client Module.
 Handles interaction with Google Generative AI (Gemini).
+The transport is pluggable (see llm_backends.py) so the pipeline can run
+against recorded responses without network access.
 """
 
-import os
-import google.generativeai as genai
+import asyncio
+import numpy as np
 from dotenv import load_dotenv
 from tenacity import (
     retry,
-    stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
     before_sleep_log,
@@ -16,10 +17,16 @@ from tenacity import (
 import google.api_core.exceptions
 import logging
 
-load_dotenv()
+from src.backend.llm_backends import (
+    LLMBackend,
+    create_backend_from_env,
+    join_prefix,
+)
+from src.backend.config import load_settings
+from src.backend.embedding_cache import EmbeddingCache, get_shared_embedding_cache
+from src.backend.rate_limiter import RateLimiter, get_shared_limiter, parse_retry_after
 
-GEMINI_MODEL = "gemini-2.5-flash"
-GEMINI_EMBED_MODEL = "models/text-embedding-004"
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
@@ -31,31 +38,264 @@ RETRYABLE_EXCEPTIONS = (
     google.api_core.exceptions.InternalServerError,  # 500
 )
 
+# Non-quota errors still fail fast; quota errors keep queueing up to this long
+MAX_TRANSIENT_ATTEMPTS = 3
+MAX_QUEUE_SECONDS = ((load_settings().get("llm") or {}).get("rate_limit") or {}).get("max_queue_seconds", 300)
+
+
+class QuotaExhaustedError(google.api_core.exceptions.ResourceExhausted):
+    """Raised when a request stayed rate limited for longer than MAX_QUEUE_SECONDS."""
+
+
+def _is_quota_error(exc) -> bool:
+    return isinstance(exc, google.api_core.exceptions.ResourceExhausted)
+
+
+_backoff = wait_exponential(multiplier=2, min=2, max=30)  # prevent huge waits
+
+
+def _wait_policy(retry_state) -> float:
+    """Honor the server's retry-after hint when present, else back off exponentially."""
+    hint = parse_retry_after(retry_state.outcome.exception())
+    return hint if hint is not None else _backoff(retry_state)
+
+
+def _stop_policy(retry_state) -> bool:
+    if _is_quota_error(retry_state.outcome.exception()):
+        return retry_state.seconds_since_start >= MAX_QUEUE_SECONDS
+    return retry_state.attempt_number >= MAX_TRANSIENT_ATTEMPTS
+
+
+def _give_up(retry_state):
+    exc = retry_state.outcome.exception()
+    if _is_quota_error(exc):
+        raise QuotaExhaustedError(
+            f"Gemini quota still exhausted after queueing for {retry_state.seconds_since_start:.0f}s"
+        ) from exc
+    raise exc
+
+
+_llm_retry = retry(
+    retry=retry_if_exception_type(RETRYABLE_EXCEPTIONS),
+    wait=_wait_policy,
+    stop=_stop_policy,
+    retry_error_callback=_give_up,
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+
+
+# Gemini's batchEmbedContents accepts at most 100 texts per request
+BATCH_EMBED_LIMIT = 100
+
+
+def _estimate_tokens(text: str) -> int:
+    # Cheap local estimate used to reserve quota before the real count is known
+    return len(text) // 4 if text else 0
+
+
+class ContextCache:
+    """
+    A prompt prefix shared by several calls (e.g. one project's SRS and
+    patterns), created by LLMClient.create_context_cache. `name` is the
+    server-side cache, or None when the prefix is sent inline instead
+    (caching disabled, prefix too small, backend without support, or the
+    cache expired). Close it when the run or chat session ends.
+    """
+
+    def __init__(self, client, prefix: str, name: str = None):
+        self.client = client
+        self.prefix = prefix
+        self.name = name
+        self.hits = 0
+
+    @property
+    def is_cached(self) -> bool:
+        return self.name is not None
+
+    def inline(self, prompt: str) -> str:
+        return join_prefix(self.prefix, prompt)
+
+    def close(self):
+        self.client.delete_context_cache(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
 
 class LLMClient:
-    def __init__(self):
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set.")
-
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(GEMINI_MODEL)
-
-    @retry(
-        retry=retry_if_exception_type(RETRYABLE_EXCEPTIONS),
-        wait=wait_exponential(multiplier=2, min=2, max=30),  # prevent huge waits
-        stop=stop_after_attempt(3),  # Fail faster on rate limits
-        reraise=True,  # IMPORTANT: raise the last exception after retries
-        before_sleep=before_sleep_log(logger, logging.WARNING),
-    )
-    def generate_content(self, prompt: str) -> str:
+    def __init__(self, backend: LLMBackend = None, rate_limiter: RateLimiter = None,
+                 embed_rate_limiter: RateLimiter = None, embedding_cache: EmbeddingCache = None):
+        """
+        Args:
+            backend: Transport to use. Defaults to the one selected by
+                     SPECOPS_LLM_BACKEND (live Gemini unless overridden).
+            rate_limiter / embed_rate_limiter: Budgets for generation and
+                     embedding calls. Default to the process-wide limiters so
+                     every agent shares one quota.
+            embedding_cache: Cache consulted before every embedding call.
+                     Defaults to the process-wide memory + disk cache.
+        """
+        self.backend = backend or create_backend_from_env()
+        self.rate_limiter = rate_limiter or get_shared_limiter("generate")
+        self.embed_rate_limiter = embed_rate_limiter or get_shared_limiter("embed")
+        self.embedding_cache = embedding_cache or get_shared_embedding_cache()
+
+    def create_context_cache(self, prefix: str, ttl_seconds: int = None) -> ContextCache:
+        """
+        Stores `prefix` in the backend's context cache (llm.context_cache in
+        settings.yaml). Falls back to an inline handle when caching is off,
+        unsupported, the prefix is below the backend's minimum size, or the
+        create call fails, so callers never need to branch.
+        """
+        conf = (load_settings().get("llm") or {}).get("context_cache") or {}
+        if not conf.get("enabled", True) or not self.backend.supports_context_cache:
+            return ContextCache(self, prefix)
+        if _estimate_tokens(prefix) < conf.get("min_tokens", 1024):
+            return ContextCache(self, prefix)
+
+        ttl_seconds = ttl_seconds or conf.get("ttl_seconds", 3600)
+        try:
+            with self.rate_limiter.limit(_estimate_tokens(prefix)):
+                name = self._with_feedback(self.rate_limiter, self.backend.create_context_cache, prefix, ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Context caching unavailable, sending prefix inline: {e}")
+            return ContextCache(self, prefix)
+        return ContextCache(self, prefix, name)
+
+    def delete_context_cache(self, cache: ContextCache):
+        if not cache.is_cached:
+            return
+        name, cache.name = cache.name, None
+        try:
+            self.backend.delete_context_cache(name)
+        except Exception as e:
+            # The cache expires on its own at the end of its TTL
+            logger.warning(f"Failed to delete context cache {name}: {e}")
+
+    def _cache_unusable(self, cache: ContextCache, exc: Exception):
+        if isinstance(exc, RETRYABLE_EXCEPTIONS):
+            return False
+        logger.warning(f"Context cache {cache.name} unusable, sending prefix inline: {exc}")
+        cache.name = None
+        return True
+
+    @_llm_retry
+    def generate_content(self, prompt: str, context_cache: ContextCache = None) -> str:
         """
         Generates content from the LLM based on the prompt.
-        Retries automatically on transient Gemini errors (429/503/timeouts/500).
+        Retries automatically on transient Gemini errors (503/timeouts/500).
+        Quota errors (429) are queued: the shared limiter backs off and the
+        call is retried until MAX_QUEUE_SECONDS, then QuotaExhaustedError.
+        With `context_cache`, the prompt follows the cached prefix; only the
+        prompt itself is sent when the prefix is cached server-side.
         """
-        response = self.model.generate_content(prompt)
-        text = getattr(response, "text", None)
+        if context_cache is not None and context_cache.is_cached:
+            try:
+                with self.rate_limiter.limit(_estimate_tokens(prompt)):
+                    text = self._with_feedback(self.rate_limiter, self.backend.generate_cached,
+                                               context_cache.name, prompt)
+            except Exception as e:
+                if not self._cache_unusable(context_cache, e):
+                    raise
+            else:
+                context_cache.hits += 1
+                self.rate_limiter.record_tokens(_estimate_tokens(text))
+                self._track_tokens(prompt, text)
+                return self._check_text(text)
 
+        if context_cache is not None:
+            prompt = context_cache.inline(prompt)
+        with self.rate_limiter.limit(_estimate_tokens(prompt)):
+            text = self._with_feedback(self.rate_limiter, self.backend.generate, prompt)
+        self.rate_limiter.record_tokens(_estimate_tokens(text))
+
+        self._track_tokens(prompt, text)
+        return self._check_text(text)
+
+    @_llm_retry
+    async def agenerate_content(self, prompt: str, context_cache: ContextCache = None) -> str:
+        """
+        Async counterpart of generate_content using the SDK's async API.
+        Shares the same rate limiter, so coroutines and threads draw from one quota.
+        """
+        if context_cache is not None and context_cache.is_cached:
+            try:
+                async with self.rate_limiter.limit_async(_estimate_tokens(prompt)):
+                    text = await self._with_feedback_async(self.rate_limiter, self.backend.agenerate_cached,
+                                                           context_cache.name, prompt)
+            except Exception as e:
+                if not self._cache_unusable(context_cache, e):
+                    raise
+            else:
+                context_cache.hits += 1
+                self.rate_limiter.record_tokens(_estimate_tokens(text))
+                await asyncio.to_thread(self._track_tokens, prompt, text)
+                return self._check_text(text)
+
+        if context_cache is not None:
+            prompt = context_cache.inline(prompt)
+        async with self.rate_limiter.limit_async(_estimate_tokens(prompt)):
+            text = await self._with_feedback_async(self.rate_limiter, self.backend.agenerate, prompt)
+        self.rate_limiter.record_tokens(_estimate_tokens(text))
+
+        # Token counting may hit the network; keep it off the event loop
+        await asyncio.to_thread(self._track_tokens, prompt, text)
+        return self._check_text(text)
+
+    def generate_content_stream(self, prompt: str, context_cache: ContextCache = None):
+        """
+        Streaming counterpart of generate_content: yields text chunks as the
+        model produces them. Failures before the first chunk are retried like
+        generate_content; once text has been yielded, errors propagate.
+        """
+        chunks, first, sent_prompt = self._open_stream(prompt, context_cache)
+        parts = [first]
+        yield first
+        for chunk in chunks:
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+
+        text = "".join(parts)
+        self.rate_limiter.record_tokens(_estimate_tokens(text))
+        self._track_tokens(sent_prompt, text)
+
+    @_llm_retry
+    def _open_stream(self, prompt: str, context_cache: ContextCache = None):
+        """Starts a stream and waits for its first chunk; returns (chunks, first chunk, prompt sent)."""
+        if context_cache is not None and context_cache.is_cached:
+            try:
+                with self.rate_limiter.limit(_estimate_tokens(prompt)):
+                    chunks = iter(self.backend.generate_cached_stream(context_cache.name, prompt))
+                    first = self._with_feedback(self.rate_limiter, self._first_chunk, chunks)
+            except Exception as e:
+                if not self._cache_unusable(context_cache, e):
+                    raise
+            else:
+                context_cache.hits += 1
+                return chunks, first, prompt
+
+        if context_cache is not None:
+            prompt = context_cache.inline(prompt)
+        with self.rate_limiter.limit(_estimate_tokens(prompt)):
+            chunks = iter(self.backend.generate_stream(prompt))
+            first = self._with_feedback(self.rate_limiter, self._first_chunk, chunks)
+        return chunks, first, prompt
+
+    @staticmethod
+    def _first_chunk(chunks) -> str:
+        # Leading whitespace-only chunks are folded into the first real one
+        leading = ""
+        for chunk in chunks:
+            if chunk and chunk.strip():
+                return leading + chunk
+            leading += chunk or ""
+        raise RuntimeError("Gemini returned an empty response.")
+
+    def _track_tokens(self, prompt: str, text: str):
         # Track Tokens
         from src.backend.token_tracker import TokenTracker
         tracker = TokenTracker()
@@ -64,29 +304,100 @@ class LLMClient:
         # Output tokens
         tracker.add_output_tokens(self.count_tokens(text) if text else 0)
 
+    @staticmethod
+    def _with_feedback(limiter: RateLimiter, call, *args):
+        """Runs a backend call and reports its outcome to the adaptive limiter."""
+        try:
+            result = call(*args)
+        except google.api_core.exceptions.ResourceExhausted as e:
+            limiter.report_quota_error(parse_retry_after(e))
+            raise
+        limiter.report_success()
+        return result
+
+    @staticmethod
+    async def _with_feedback_async(limiter: RateLimiter, call, *args):
+        try:
+            result = await call(*args)
+        except google.api_core.exceptions.ResourceExhausted as e:
+            limiter.report_quota_error(parse_retry_after(e))
+            raise
+        limiter.report_success()
+        return result
+
+    @staticmethod
+    def _check_text(text: str) -> str:
         # Guard: sometimes SDK returns empty/None.
         if not text or not text.strip():
             raise RuntimeError("Gemini returned an empty response.")
         return text
 
-    def get_embedding(self, text: str, task_type: str = "retrieval_query") -> list[float]:
+    def get_embedding(self, text, task_type: str = "retrieval_query") -> np.ndarray:
         """
-        Generates an embedding for the given text.
+        Generates embeddings for a string or a list of strings.
 
         task_type:
           - "retrieval_document" for indexing your pattern library
           - "retrieval_query" for embedding user queries
+
+        Returns a float32 vector for a single string, or a contiguous
+        (len(texts), dim) matrix for a list. Texts already in the embedding
+        cache are not re-sent; the rest go out in batches of BATCH_EMBED_LIMIT.
         """
-        result = genai.embed_content(
-            model=GEMINI_EMBED_MODEL,
-            content=text,
-            task_type='retrieval_document',
-            title="Embedding",
-        )
-        emb = result.get("embedding")
-        if not emb:
+        texts = [text] if isinstance(text, str) else list(text)
+        vectors, pending = self._lookup_cached(texts, task_type)
+        for start in range(0, len(pending), BATCH_EMBED_LIMIT):
+            batch = pending[start:start + BATCH_EMBED_LIMIT]
+            self._store_batch(vectors, batch, task_type, self._embed_request(batch, task_type))
+        return self._as_result(text, texts, vectors)
+
+    async def aget_embedding(self, text, task_type: str = "retrieval_query") -> np.ndarray:
+        """Async counterpart of get_embedding."""
+        texts = [text] if isinstance(text, str) else list(text)
+        vectors, pending = self._lookup_cached(texts, task_type)
+        for start in range(0, len(pending), BATCH_EMBED_LIMIT):
+            batch = pending[start:start + BATCH_EMBED_LIMIT]
+            self._store_batch(vectors, batch, task_type, await self._aembed_request(batch, task_type))
+        return self._as_result(text, texts, vectors)
+
+    @_llm_retry
+    def _embed_request(self, batch: list, task_type: str) -> list:
+        with self.embed_rate_limiter.limit(sum(_estimate_tokens(t) for t in batch)):
+            return self._with_feedback(self.embed_rate_limiter, self.backend.embed, batch, task_type)
+
+    @_llm_retry
+    async def _aembed_request(self, batch: list, task_type: str) -> list:
+        async with self.embed_rate_limiter.limit_async(sum(_estimate_tokens(t) for t in batch)):
+            return await self._with_feedback_async(self.embed_rate_limiter, self.backend.aembed, batch, task_type)
+
+    def _lookup_cached(self, texts: list, task_type: str):
+        """Returns ({text: vector} for cache hits, unique texts still to embed)."""
+        model = self.backend.embed_model_name
+        vectors = {}
+        pending = []
+        for t in dict.fromkeys(texts):
+            cached = self.embedding_cache.get(model, task_type, t)
+            if cached is not None:
+                vectors[t] = cached
+            else:
+                pending.append(t)
+        return vectors, pending
+
+    def _store_batch(self, vectors: dict, batch: list, task_type: str, embeddings: list):
+        if not embeddings or len(embeddings) != len(batch) or any(e is None or len(e) == 0 for e in embeddings):
             raise RuntimeError("Embedding API returned empty embedding.")
-        return emb
+        model = self.backend.embed_model_name
+        for t, emb in zip(batch, embeddings):
+            self.embedding_cache.put(model, task_type, t, emb)
+            vectors[t] = emb
+
+    @staticmethod
+    def _as_result(text, texts: list, vectors: dict) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        matrix = np.ascontiguousarray(np.array([vectors[t] for t in texts], dtype=np.float32))
+        return matrix[0] if isinstance(text, str) else matrix
+
     def count_tokens(self, text: str) -> int:
         """
         Counts tokens in the provided text using the model's tokenizer.
@@ -94,9 +405,7 @@ class LLMClient:
         if not text:
             return 0
         try:
-             # Gemini API has count_tokens
-             res = self.model.count_tokens(text)
-             return res.total_tokens
+             return self.backend.count_tokens(text)
         except Exception as e:
             logger.warning(f"Token counting failed: {e}")
             # Fallback estimation (approx 4 chars per token)
@@ -4,12 +4,21 @@ Handles the execution flow from Prompt to SRS to Code Generation.
 """
 import os
 import shutil
+import time
 from src.agents.spec_parser import SpecParser
 from src.agents.pattern_selector import PatternSelector
 from src.agents.code_generator import CodeGenerator
 from src.agents.asset_generator import AssetGenerator
 from src.tools.quality_runner import QualityRunner
 from src.explainability.explainer import Explainer
+from src.backend.prompt_builder import PromptContext
+from src.backend.history_manager import build_file_manifest
+from src.backend.code_index import build_code_index
+from src.backend.llm_client import ContextCache
+from src.backend.run_fingerprint import compute_fingerprint
+from src.backend.run_checkpoint import RunCheckpoint, DEFAULT_RUNS_DIR
+from src.backend.retrieval_cache import read_collection_version
+from src.backend.config import load_settings
 
 class PipelineOrchestrator:
     def __init__(self):
@@ -20,147 +29,283 @@ class PipelineOrchestrator:
         self.quality_runner = QualityRunner()
         self.explainer = Explainer()
         self.generated_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../generated_projects'))
+        self.runs_root = DEFAULT_RUNS_DIR
 
-    def run_pipeline(self, prompt: str, step_callback=None):
+    def run_fingerprint(self, prompt: str) -> str:
+        """Fingerprint of prompt + model + knowledge-base version + pipeline version."""
+        kb_version = {
+            "collection": self.pattern_selector.embedder.collection_name,
+            "version": read_collection_version(self.pattern_selector.db_path,
+                                               self.pattern_selector.embedder.collection_name),
+        }
+        return compute_fingerprint(prompt, self.code_generator.llm_client.backend.model_name, kb_version)
+
+    def run_pipeline(self, prompt: str, step_callback=None, reuse_existing: bool = None):
         """
         Executes the full pipeline:
         Prompt -> SRS -> RAG -> Pattern Selection -> Code Gen -> Assets -> Git -> Quality Check -> Explain
+
+        With `reuse_existing` (default pipeline.reuse_identical_prompts), a prompt
+        whose fingerprint matches a stored run with the project still on disk
+        returns that run's result without calling the LLM.
+
+        Stage outputs are checkpointed under data/runs/<run_id>/; a failed run
+        can be continued with resume(run_id).
         """
         print(f"Received prompt: {prompt}")
-        
+
+        from src.backend.history_manager import HistoryManager
+        fingerprint = self.run_fingerprint(prompt)
+        if reuse_existing is None:
+            reuse_existing = (load_settings().get("pipeline") or {}).get("reuse_identical_prompts", True)
+        if reuse_existing:
+            previous = HistoryManager().find_result_by_fingerprint(fingerprint)
+            if previous is not None:
+                print(f"Identical prompt already generated; reusing history entry {previous['history_id']}.")
+                previous["reused_from"] = previous["history_id"]
+                return previous
+
+        checkpoint = RunCheckpoint.create(prompt, fingerprint, runs_dir=self.runs_root)
+        print(f"Run ID: {checkpoint.run_id}")
+        return self._execute_run(checkpoint, step_callback)
+
+    def resume(self, run_id: str, step_callback=None):
+        """
+        Continues a checkpointed run from its first incomplete stage, reusing
+        the stored outputs of every stage before it.
+        """
+        checkpoint = RunCheckpoint.load(run_id, runs_dir=self.runs_root)
+        if checkpoint.status == "completed" and checkpoint.manifest.get("history_id") is not None:
+            from src.backend.history_manager import HistoryManager
+            stored = HistoryManager().get_project_result(checkpoint.manifest["history_id"])
+            if stored is not None:
+                print(f"Run {run_id} already completed; returning its stored result.")
+                stored["run_id"] = run_id
+                return stored
+            # Stage outputs were removed on completion; only a fresh run is possible
+            print(f"Run {run_id} completed but its history entry is gone; running it again.")
+
+        done = checkpoint.manifest["completed_stages"]
+        print(f"Resuming run {run_id} (completed: {', '.join(done) or 'none'})")
+        return self._execute_run(checkpoint, step_callback)
+
+    def _execute_run(self, checkpoint: RunCheckpoint, step_callback=None):
+        try:
+            return self._run_stages(checkpoint, step_callback)
+        except Exception as e:
+            checkpoint.mark_failed("Unhandled Error", e)
+            raise
+
+    def _run_stages(self, checkpoint: RunCheckpoint, step_callback=None):
+        from src.backend.history_manager import HistoryManager
+        prompt = checkpoint.manifest["prompt"]
+
+        # Wall-clock seconds spent in each stage (consumed by the benchmark tool)
+        stage_timings = {}
+        stage_start = time.perf_counter()
+        resumed_stages = []
+
+        def mark_stage(name):
+            nonlocal stage_start
+            now = time.perf_counter()
+            stage_timings[name] = round(now - stage_start, 4)
+            stage_start = now
+
+        def restore(name):
+            """Checkpointed output of a stage, or None if the stage still has to run."""
+            nonlocal stage_start
+            if not checkpoint.is_complete(name):
+                return None
+            resumed_stages.append(name)
+            stage_start = time.perf_counter()
+            return checkpoint.load_stage(name)
+
+        # SRS/schema are serialized once and shared by every stage's prompt
+        prompt_context = PromptContext()
         
         # Step 1: SRS Parsing
-        print("Step 1: Parsing SRS...")
-        parse_result = self.spec_parser.parse_input(prompt)
-        if not parse_result.get("success"):
-            return self._error_response("SRS Parsing", parse_result)
-        srs = parse_result["srs"]
+        saved = restore("srs_parsing")
+        if saved:
+            srs = saved["srs"]
+        else:
+            print("Step 1: Parsing SRS...")
+            parse_result = self.spec_parser.parse_input(prompt, prompt_context=prompt_context)
+            mark_stage("srs_parsing")
+            if not parse_result.get("success"):
+                return self._failed_run(checkpoint, "SRS Parsing", parse_result, stage_timings=stage_timings)
+            srs = parse_result["srs"]
+            checkpoint.save_stage("srs_parsing", {"srs": srs})
         if step_callback: step_callback()
 
         # Step 2: Pattern Selection
-        print("Step 2: Selecting Patterns (RAG)...")
-        pattern_result = self.pattern_selector.select_patterns(srs)
-        if not pattern_result.get("success"):
-             return self._error_response("Pattern Selection", pattern_result, srs=srs)
-        selected_patterns = pattern_result["selected_patterns"]
-        candidates_count = pattern_result.get("retrieved_patterns_count", 0)
+        saved = restore("pattern_selection")
+        if saved:
+            selected_patterns = saved["selected_patterns"]
+            candidates_count = saved["retrieved_patterns_count"]
+        else:
+            print("Step 2: Selecting Patterns (RAG)...")
+            pattern_result = self.pattern_selector.select_patterns(srs, prompt_context=prompt_context)
+            mark_stage("pattern_selection")
+            if not pattern_result.get("success"):
+                 return self._failed_run(checkpoint, "Pattern Selection", pattern_result, srs=srs, stage_timings=stage_timings)
+            selected_patterns = pattern_result["selected_patterns"]
+            candidates_count = pattern_result.get("retrieved_patterns_count", 0)
+            checkpoint.save_stage("pattern_selection", {"selected_patterns": selected_patterns,
+                                                        "retrieved_patterns_count": candidates_count})
         if step_callback: step_callback()
 
-        # Step 3: Code Generation
-        print("Step 3: Generating Code...")
-        code_result = self.code_generator.generate_code(srs, selected_patterns)
-        if not code_result.get("success"):
-            return self._error_response("Code Generation", code_result, srs=srs, patterns=selected_patterns)
-        files = code_result["files"]
-        validation_errors = code_result["validation_errors"]
-        if step_callback: step_callback()
+        # SRS + patterns prefix shared by code generation, self-healing and explanation;
+        # cached with the LLM for the rest of the run when the backend supports it.
+        # Not worth creating when a resumed run has every LLM stage restored.
+        project_prefix = prompt_context.project_prefix(srs, selected_patterns)
+        llm_client = self.code_generator.llm_client
+        if all(checkpoint.is_complete(stage) for stage in ("code_generation", "quality_and_healing", "explanation")):
+            project_cache = ContextCache(llm_client, project_prefix)
+        else:
+            project_cache = llm_client.create_context_cache(project_prefix)
+
+        # Released on every exit path, including exceptions re-raised for resume()
+        with project_cache:
+            # Step 3: Code Generation
+            saved = restore("code_generation")
+            if saved:
+                files = saved["files"]
+                validation_errors = saved["validation_errors"]
+            else:
+                print("Step 3: Generating Code...")
+                code_result = self.code_generator.generate_code(srs, selected_patterns, prompt_context=prompt_context,
+                                                                context_cache=project_cache)
+                mark_stage("code_generation")
+                if not code_result.get("success"):
+                    return self._failed_run(checkpoint, "Code Generation", code_result, srs=srs, patterns=selected_patterns, stage_timings=stage_timings)
+                files = code_result["files"]
+                validation_errors = code_result["validation_errors"]
+                checkpoint.save_stage("code_generation", {"files": files, "validation_errors": validation_errors})
+            if step_callback: step_callback()
 
-        # Step 4: Asset Generation
-        print("Step 4: Generating Assets...")
-        assets = self.asset_generator.generate_assets(srs, srs.get("tech_stack", []))
-        files.update(assets)
+            # Step 4: Asset Generation
+            saved = restore("asset_generation")
+            if saved:
+                files = saved["files"]
+            else:
+                print("Step 4: Generating Assets...")
+                assets = self.asset_generator.generate_assets(srs, srs.get("tech_stack", []))
+                files.update(assets)
+                mark_stage("asset_generation")
+                checkpoint.save_stage("asset_generation", {"files": files})
 
-        # Write files (Side Effect)
-        project_name = srs.get("project_name", "SpecOpsProject").replace(" ", "_")
-        project_path = os.path.join(self.generated_root, project_name)
-        self._write_project_files(project_path, files)
+            # Write files (Side Effect) - repeated on resume, the file map is checkpointed
+            project_name = srs.get("project_name", "SpecOpsProject").replace(" ", "_")
+            project_path = os.path.join(self.generated_root, project_name)
+            saved = restore("quality_and_healing")
+            if saved:
+                files = saved["files"]
+            self._write_project_files(project_path, files)
+            mark_stage("file_write")
         
-        # Step 5: Git Initialization
-        print("Step 5: Initializing Git...")
-        git_success = self.asset_generator.initialize_git(project_path)
+            # Step 5: Git Initialization
+            print("Step 5: Initializing Git...")
+            git_success = self.asset_generator.initialize_git(project_path)
+            mark_stage("git_init")
 
-        # Step 6: Quality Checks & Self-Healing
-        print("Step 6: Running Quality Gates & Self-Healing...")
-        
-        from src.agents.code_fixer import CodeFixer
-        code_fixer = CodeFixer()
+            # Step 6: Quality Checks & Self-Healing
+            if saved:
+                quality_report = saved["quality_report"]
+                heal_attempts = saved["self_heal_attempts"]
+            else:
+                print("Step 6: Running Quality Gates & Self-Healing...")
+            
+                from src.agents.code_fixer import CodeFixer
+                code_fixer = CodeFixer()
         
-        max_retries = 2
-        for attempt in range(max_retries + 1):
-            quality_report = self.quality_runner.run_all_checks(project_path)
-            pylint_score = quality_report.get('pylint_score', 0)
+                max_retries = 2
+                heal_attempts = 0
+                for attempt in range(max_retries + 1):
+                    quality_report = self.quality_runner.run_all_checks(project_path)
+                    pylint_score = quality_report.get('pylint_score', 0)
             
-            # Simple heuristic: If score is low, try to fix
-            if pylint_score >= 6.0:
-                print(f"  Quality passed (Score: {pylint_score}).")
-                break
+                    # Simple heuristic: If score is low, try to fix
+                    if pylint_score >= 6.0:
+                        print(f"  Quality passed (Score: {pylint_score}).")
+                        break
             
-            if attempt < max_retries:
-                print(f"  Quality score low ({pylint_score}). Attempting Self-Healing ({attempt+1}/{max_retries})...")
+                    if attempt < max_retries:
+                        print(f"  Quality score low ({pylint_score}). Attempting Self-Healing ({attempt+1}/{max_retries})...")
+                        heal_attempts += 1
                 
-                # 1. Get detailed error log
-                pylint_log = self.quality_runner.get_pylint_report(project_path)
+                        # 1. Get detailed error log
+                        pylint_log = self.quality_runner.get_pylint_report(project_path)
                 
-                # 2. Parse log to find failing files
-                # Simple parsing: find lines starting with file path inside project
-                import re
-                # Regex to capture filename from pylint output: "src/main.py:10:4: E0602..."
-                # We look for paths relative to project root
-                errors_by_file = {}
-                for line in pylint_log.splitlines():
-                    if "E" in line or "F" in line: # Error or Fatal
-                         parts = line.split(':')
-                         if len(parts) >= 3:
-                             rel_path = parts[0].strip()
-                             # Check if it's a python file in our project
-                             full_file_path = os.path.join(project_path, rel_path)
-                             if os.path.exists(full_file_path) and rel_path.endswith('.py'):
-                                 if full_file_path not in errors_by_file:
-                                     errors_by_file[full_file_path] = []
-                                 errors_by_file[full_file_path].append(line)
+                        # 2. Parse log to find failing files
+                        errors_by_file = self._parse_pylint_errors(pylint_log, project_path)
                 
-                if not errors_by_file:
-                    print("  No parseable errors found to fix.")
-                    break
+                        if not errors_by_file:
+                            print("  No parseable errors found to fix.")
+                            break
                 
-                # 3. Fix each failing file
-                for file_path, errors in errors_by_file.items():
-                    print(f"    Fixing {os.path.basename(file_path)}...")
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
+                        # 3. Fix each failing file
+                        for file_path, errors in errors_by_file.items():
+                            print(f"    Fixing {os.path.basename(file_path)}...")
+                            try:
+                                with open(file_path, 'r', encoding='utf-8') as f:
+                                    content = f.read()
                         
-                        fix_result = code_fixer.fix_code(file_path, content, "\n".join(errors))
+                                # Only a server-side cache makes the project prefix free; inline it would
+                                # be prepended to every per-file fix prompt
+                                fix_cache = project_cache if project_cache.is_cached else None
+                                fix_result = code_fixer.fix_code(file_path, content, "\n".join(errors),
+                                                                 context_cache=fix_cache)
                         
-                        if fix_result["success"]:
-                            with open(file_path, 'w', encoding='utf-8') as f:
-                                f.write(fix_result["fixed_content"])
-                            print(f"    Fixed {os.path.basename(file_path)}.")
+                                if fix_result["success"]:
+                                    with open(file_path, 'w', encoding='utf-8') as f:
+                                        f.write(fix_result["fixed_content"])
+                                    print(f"    Fixed {os.path.basename(file_path)}.")
                             
-                            # Update our internal file map to reflect change (for explainability/history)
-                            rel_path = os.path.relpath(file_path, project_path)
-                            # Normalization usually needed but simple relative path works
-                            if rel_path in files: 
-                               files[rel_path] = fix_result["fixed_content"]
-                            else:
-                                # Try matching with os.sep differences or just basename matches?
-                                # For now simple update if key exists matches rel_path
-                                pass
-
-                        else:
-                            print(f"    Failed to fix {os.path.basename(file_path)}: {fix_result.get('error')}")
-                    except Exception as e:
-                        print(f"    Error processing {os.path.basename(file_path)}: {e}")
-            else:
-                print("  Max self-healing retries reached.")
+                                    # Update our internal file map to reflect change (for explainability/history)
+                                    rel_path = os.path.relpath(file_path, project_path)
+                                    # Normalization usually needed but simple relative path works
+                                    if rel_path in files: 
+                                       files[rel_path] = fix_result["fixed_content"]
+                                    else:
+                                        # Try matching with os.sep differences or just basename matches?
+                                        # For now simple update if key exists matches rel_path
+                                        pass
 
-        # Step 7: Explainability
-        print("Step 7: Generating Explanation...")
-        explanation = self.explainer.generate_explanation(srs, selected_patterns, quality_report)
+                                else:
+                                    print(f"    Failed to fix {os.path.basename(file_path)}: {fix_result.get('error')}")
+                            except Exception as e:
+                                print(f"    Error processing {os.path.basename(file_path)}: {e}")
+                    else:
+                        print("  Max self-healing retries reached.")
+                mark_stage("quality_and_healing")
+                checkpoint.save_stage("quality_and_healing", {"quality_report": quality_report,
+                                                              "self_heal_attempts": heal_attempts,
+                                                              "files": files})
 
-        # Save to History
-        from src.backend.history_manager import HistoryManager
-        history_mgr = HistoryManager()
-        history_mgr.save_project_entry({
-            "project_name": srs.get("project_name", "Unknown"),
-            "prompt": prompt,
-            "path": project_path,
-            "srs": srs
-        })
+            # BM25 index over the final project files for chat retrieval
+            try:
+                build_code_index(project_path)
+            except Exception as e:
+                print(f"Warning: Could not build code index: {e}")
+            mark_stage("code_index")
 
-        return {
+            # Step 7: Explainability
+            saved = restore("explanation")
+            if saved:
+                explanation = saved["explanation"]
+            else:
+                print("Step 7: Generating Explanation...")
+                explanation = self.explainer.generate_explanation(srs, selected_patterns, quality_report,
+                                                                  prompt_context=prompt_context,
+                                                                  context_cache=project_cache)
+                mark_stage("explanation")
+                checkpoint.save_stage("explanation", {"explanation": explanation})
+            context_cache_stats = {"cached": project_cache.is_cached, "hits": project_cache.hits}
+
+        result = {
             "status": "Completed", 
             "stage": "Pipeline Finished",
+            "run_id": checkpoint.run_id,
             "srs": srs,
             "patterns": selected_patterns,
             "project_path": project_path,
@@ -169,9 +314,51 @@ class PipelineOrchestrator:
             "git_initialized": git_success,
             "quality_report": quality_report,
             "explanation": explanation,
-            "retrieved_patterns_count": candidates_count
+            "retrieved_patterns_count": candidates_count,
+            "self_heal_attempts": heal_attempts,
+            "stage_timings": stage_timings,
+            "resumed_stages": resumed_stages,
+            "prompt_stats": prompt_context.stats(),
+            "context_cache": context_cache_stats,
+            "file_manifest": build_file_manifest(files)
         }
 
+        # Save to History (full result, so reopening it needs no LLM calls)
+        history_mgr = HistoryManager()
+        entry = {
+            "project_name": srs.get("project_name", "Unknown"),
+            "prompt": prompt,
+            "path": project_path,
+            "srs": srs,
+            "fingerprint": checkpoint.manifest.get("fingerprint")
+        }
+        history_mgr.save_project_entry(entry, result=result)
+        result["history_id"] = entry.get("id")
+        checkpoint.mark_completed(result["history_id"])
+
+        return result
+
+    def _parse_pylint_errors(self, pylint_log: str, project_path: str) -> dict:
+        """
+        Groups error/fatal lines of a pylint log by the project file they refer to.
+        Returns {absolute_file_path: [log lines]}.
+        """
+        # Simple parsing: find lines starting with file path inside project
+        # e.g. "src/main.py:10:4: E0602..." - paths are relative to project root
+        errors_by_file = {}
+        for line in pylint_log.splitlines():
+            if "E" in line or "F" in line: # Error or Fatal
+                 parts = line.split(':')
+                 if len(parts) >= 3:
+                     rel_path = parts[0].strip()
+                     # Check if it's a python file in our project
+                     full_file_path = os.path.join(project_path, rel_path)
+                     if os.path.exists(full_file_path) and rel_path.endswith('.py'):
+                         if full_file_path not in errors_by_file:
+                             errors_by_file[full_file_path] = []
+                         errors_by_file[full_file_path].append(line)
+        return errors_by_file
+
     def _write_project_files(self, base_path: str, files: dict):
         if os.path.exists(base_path):
             try:
@@ -187,6 +374,11 @@ class PipelineOrchestrator:
             with open(full_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
+    def _failed_run(self, checkpoint: RunCheckpoint, stage, result, **kwargs):
+        """Records the failure in the run manifest; the response carries the run_id for resume()."""
+        checkpoint.mark_failed(stage, result.get("error"))
+        return self._error_response(stage, result, run_id=checkpoint.run_id, **kwargs)
+
     def _error_response(self, stage, result, **kwargs):
         return {
             "status": "Failed",
@@ -0,0 +1,50 @@
+"""
+Prompt Builder Module.
+Shared prompt-building state for one pipeline run: large structured inputs
+(SRS, schema) are serialized compactly once and reused by every stage, and
+the estimated token size of each prompt component is recorded per stage.
+"""
+from src.backend.context_packer import compact_json, estimate_tokens
+
+
+class PromptContext:
+    def __init__(self):
+        # name -> (source object, rendered text)
+        self._rendered = {}
+        # stage -> {component: tokens}
+        self.stages = {}
+
+    def render(self, name: str, value) -> str:
+        """Compact JSON for `value`, rendered once per run and reused by later stages."""
+        cached = self._rendered.get(name)
+        if cached is not None and cached[0] is value:
+            return cached[1]
+        text = compact_json(value)
+        self._rendered[name] = (value, text)
+        return text
+
+    def project_prefix(self, srs: dict, selected_patterns: list) -> str:
+        """
+        Project description every post-selection prompt starts with; it is
+        also the prefix stored in the run's LLM context cache.
+        """
+        return (f"PROJECT SRS:\n{self.render('srs', srs)}\n\n"
+                f"SELECTED PATTERNS:\n{compact_json(list(selected_patterns))}")
+
+    def record(self, stage: str, prompt: str, **components):
+        """
+        Records the token size of each named component of `prompt`; the rest
+        of the prompt is counted as instructions.
+        """
+        sizes = {name: estimate_tokens(str(text)) for name, text in components.items()}
+        total = estimate_tokens(prompt)
+        sizes["instructions"] = max(0, total - sum(sizes.values()))
+        sizes["total"] = total
+        self.stages[stage] = sizes
+
+    def stats(self) -> dict:
+        """{"stages": {stage: {component: tokens}}, "total_tokens": int}"""
+        return {
+            "stages": {stage: dict(sizes) for stage, sizes in self.stages.items()},
+            "total_tokens": sum(sizes["total"] for sizes in self.stages.values()),
+        }
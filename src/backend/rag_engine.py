@@ -6,18 +6,22 @@ import json
 import os
 import numpy as np
 from src.backend.llm_client import LLMClient
+from src.backend.embeddings import get_embedding_provider
 
 class RAGEngine:
     def __init__(self):
         self.llm_client = LLMClient()
+        self.embedder = get_embedding_provider(self.llm_client)
         self.kb_path = os.path.abspath(
             os.path.join(os.path.dirname(__file__), '../../data/knowledge_base/patterns.json')
         )
+        # Vectors from different providers are not comparable, so each gets its own cache file
+        cache_name = "embeddings.json" if self.embedder.name == "gemini" else f"embeddings_{self.embedder.name}.json"
         self.cache_path = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), '../../data/cache/embeddings.json')
+            os.path.join(os.path.dirname(__file__), '../../data/cache', cache_name)
         )
         self.patterns = []
-        self.embeddings = []
+        self.embeddings = np.zeros((0, 0), dtype=np.float32)
         self._load_knowledge_base()
 
     def _load_knowledge_base(self):
@@ -33,27 +37,22 @@ class RAGEngine:
                 print("Loading cached embeddings...")
                 try:
                     with open(self.cache_path, 'r', encoding='utf-8') as f:
-                        self.embeddings = json.load(f)
+                        self.embeddings = np.asarray(json.load(f), dtype=np.float32)
                     print("Cached embeddings loaded.")
                     return
                 except Exception as e:
                     print(f"Cache load failed: {e}. Regenerating embeddings...")
             
-            # Generate and cache embeddings
+            # Generate and cache embeddings (one batched request per 100 patterns)
             print("Generating embeddings for Knowledge Base...")
-            for p in self.patterns:
-                text = f"{p['name']}: {p['description']} {p['use_case']}"
-                emb = self.llm_client.get_embedding(text)
-                if emb:
-                    self.embeddings.append(emb)
-                else:
-                    self.embeddings.append([0.0]*768) # Fallback placeholder
+            texts = [f"{p['name']}: {p['description']} {p['use_case']}" for p in self.patterns]
+            self.embeddings = self.embedder.embed(texts, task_type="retrieval_document")
             
             # Save to cache
             try:
                 os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
                 with open(self.cache_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.embeddings, f)
+                    json.dump(self.embeddings.tolist(), f)
                 print("Embeddings cached for future use.")
             except Exception as e:
                 print(f"Failed to cache embeddings: {e}")
@@ -62,24 +61,21 @@ class RAGEngine:
         """
         Retrieves top_k patterns matching the query.
         """
-        query_emb = self.llm_client.get_embedding(query)
-        if not query_emb:
+        query_vec = self.embedder.embed(query, task_type="retrieval_query")
+        if query_vec.size == 0 or len(self.embeddings) == 0:
             return []
 
-        # Cosine Similarity
-        query_vec = np.array(query_emb)
-        scores = []
-        for i, emb in enumerate(self.embeddings):
-            doc_vec = np.array(emb)
-            if np.linalg.norm(doc_vec) == 0:
-                scores.append( -1.0 )
-                continue
-            
-            score = np.dot(query_vec, doc_vec) / (np.linalg.norm(query_vec) * np.linalg.norm(doc_vec))
-            scores.append(score)
+        # Cosine Similarity (one matrix-vector product over the whole knowledge base)
+        doc_norms = np.linalg.norm(self.embeddings, axis=1)
+        query_norm = np.linalg.norm(query_vec)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = (self.embeddings @ query_vec) / (doc_norms * query_norm)
+        scores = np.where(doc_norms == 0, -1.0, scores)
 
         # Get indices of top k
-        top_indices = np.argsort(scores)[-top_k:][::-1]
+        top_k = min(top_k, len(scores))
+        top_indices = np.argpartition(scores, -top_k)[-top_k:]
+        top_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
         
         results = []
         for idx in top_indices:
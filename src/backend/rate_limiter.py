@@ -0,0 +1,236 @@
+"""
+Rate Limiter Module.
+Process-wide request/token budgets shared by every LLMClient so that
+concurrent agents overlap calls without tripping Gemini quota errors.
+"""
+import asyncio
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+from src.backend.config import load_settings
+
+# Granularity used by async waiters while polling for a free slot
+_ASYNC_POLL_SECONDS = 0.05
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate_per_minute`.
+    A rate of None disables the bucket. The level may go negative when
+    actual usage is reported after the fact; callers then wait it off.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute) if rate_per_minute else 0.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if not self.rate_per_minute:
+            return
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate_per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)."""
+        if not self.rate_per_minute:
+            return 0.0
+        self._refill(now)
+        # Requests larger than the whole bucket are admitted once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.rate_per_minute
+
+    def take(self, amount: float):
+        if self.rate_per_minute:
+            self.level -= amount
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the number of requests allowed in flight.
+    Each success grows the limit by `additive_increase / limit` (about +1 per
+    round of requests); each quota error multiplies it by `decrease_factor`.
+    Errors arriving within `cooldown` seconds of the last cut are treated as
+    the same congestion event, so a burst of 429s only halves once.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5,
+                 additive_increase: float = 1.0, cooldown: float = 1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.additive_increase = additive_increase
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self._last_decrease = float("-inf")
+
+    @property
+    def allowed(self) -> int:
+        return max(self.min_limit, math.floor(self.limit))
+
+    def on_success(self):
+        self.limit = min(float(self.max_limit), self.limit + self.additive_increase / max(self.limit, 1.0))
+
+    def on_quota_error(self, now: float, cooldown: float = None):
+        if now - self._last_decrease < (cooldown if cooldown is not None else self.cooldown):
+            return
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self._last_decrease = now
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-minute, tokens-per-minute and a concurrency cap.
+    Usable from threads (`limit`) and coroutines (`limit_async`); both share
+    the same budgets.
+
+    With `adaptive` settings the concurrency cap follows an AIMD controller
+    fed by report_success()/report_quota_error(), and a retry-after hint
+    pauses admission for every caller so requests queue instead of failing.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=None,
+                 adaptive: dict = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.controller = AdaptiveConcurrency(max_concurrency, **adaptive) if (adaptive is not None and max_concurrency) else None
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def concurrency_limit(self):
+        return self.controller.allowed if self.controller else self.max_concurrency
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Takes a slot and budget if possible. Returns 0 on success, else seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            limit = self.concurrency_limit
+            if limit and self.in_flight >= limit:
+                return _ASYNC_POLL_SECONDS
+            wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def release(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def record_tokens(self, tokens: int):
+        """Charges tokens only known after the call (e.g. output tokens)."""
+        with self._lock:
+            self.tokens.take(tokens)
+
+    def report_success(self):
+        if self.controller:
+            with self._lock:
+                self.controller.on_success()
+
+    def report_quota_error(self, retry_after: float = None):
+        """
+        Feedback from a 429: shrinks the concurrency cap and, when the server
+        sent a retry-after hint, holds every new request until it expires.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.controller:
+                self.controller.on_quota_error(now, cooldown=retry_after)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+    def acquire(self, tokens: int = 0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait == 0:
+                return
+            await asyncio.sleep(wait)
+
+    @contextmanager
+    def limit(self, tokens: int = 0):
+        self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def limit_async(self, tokens: int = 0):
+        await self.acquire_async(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def parse_retry_after(exc) -> float:
+    """
+    Extracts the server's retry hint (seconds) from a quota error, or None.
+    Looks at google.rpc.RetryInfo details, a Retry-After header and the
+    "Please retry in 12.3s" / "retry_delay { seconds: N }" message forms.
+    """
+    for detail in getattr(exc, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            seconds = getattr(delay, "seconds", 0) + getattr(delay, "nanos", 0) / 1e9
+            if seconds > 0:
+                return float(seconds)
+
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    header = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+
+    message = str(exc)
+    match = re.search(r"retry in ([0-9.]+)\s*s", message, re.IGNORECASE) or \
+        re.search(r"retry_delay\s*\{\s*seconds:\s*([0-9]+)", message)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+_shared_limiters = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter(kind: str = "generate") -> RateLimiter:
+    """
+    Returns the process-wide limiter for `kind` ("generate" or "embed"),
+    configured from llm.rate_limit in config/settings.yaml.
+    """
+    with _shared_lock:
+        if kind not in _shared_limiters:
+            llm_settings = load_settings().get("llm") or {}
+            rate_settings = llm_settings.get("rate_limit") or {}
+            conf = rate_settings.get(kind) or {}
+            _shared_limiters[kind] = RateLimiter(
+                requests_per_minute=conf.get("requests_per_minute"),
+                tokens_per_minute=conf.get("tokens_per_minute"),
+                max_concurrency=conf.get("max_concurrency"),
+                adaptive=rate_settings.get("adaptive"),
+            )
+        return _shared_limiters[kind]
@@ -0,0 +1,101 @@
+"""
+Retrieval Cache Module.
+Caches vector-DB query results keyed by (collection scope, query embedding
+hash, n_results, collection version). scripts/ingest_knowledge.py bumps the collection's
+version stamp on every ingestion, which invalidates all cached results.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+# Embeddings are rounded before hashing so float noise doesn't defeat the cache
+_HASH_DECIMALS = 5
+
+
+def version_path_for(db_path: str, collection_name: str) -> str:
+    return os.path.join(db_path, f"{collection_name}_version.json")
+
+
+def collection_scope(db_path: str, collection_name: str) -> str:
+    """Identifies one collection of one DB, so the shared cache never mixes them."""
+    return f"{os.path.abspath(db_path)}::{collection_name}"
+
+
+def read_collection_version(db_path: str, collection_name: str) -> int:
+    """Current version stamp of a collection (0 if it was never stamped)."""
+    path = version_path_for(db_path, collection_name)
+    if not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get("version", 0))
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_collection_version(db_path: str, collection_name: str) -> int:
+    """Increments and persists the collection's version stamp. Returns the new version."""
+    version = read_collection_version(db_path, collection_name) + 1
+    path = version_path_for(db_path, collection_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": version, "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, f)
+    os.replace(tmp_path, path)
+    return version
+
+
+class RetrievalCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(scope: str, query_embedding, n_results: int, version) -> str:
+        rounded = np.round(np.asarray(query_embedding, dtype=np.float32), _HASH_DECIMALS)
+        digest = hashlib.sha256(rounded.tobytes()).hexdigest()
+        return f"{scope}:{digest}:{n_results}:{version}"
+
+    def get(self, scope: str, query_embedding, n_results: int, version):
+        key = self.make_key(scope, query_embedding, n_results, version)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, scope: str, query_embedding, n_results: int, version, result):
+        key = self.make_key(scope, query_embedding, n_results, version)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_retrieval_cache(max_entries: int = 256) -> RetrievalCache:
+    """Process-wide cache so every PatternSelector instance benefits."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = RetrievalCache(max_entries=max_entries)
+        return _shared_cache
@@ -0,0 +1,108 @@
+"""
+Run Checkpoint Module.
+Persists each pipeline stage's output under data/runs/<run_id>/ as soon as the
+stage completes, so a failed or interrupted run can be resumed from its first
+incomplete stage without repeating the earlier LLM calls. Once a run completes
+and its result is in history, only the small run.json manifest is kept.
+"""
+import json
+import os
+import tempfile
+import uuid
+from datetime import datetime
+
+DEFAULT_RUNS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../data/runs')
+)
+MANIFEST_FILE = "run.json"
+
+
+def _write_json(path: str, data):
+    """Atomic write so a crash never leaves a half-written checkpoint."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RunCheckpoint:
+    def __init__(self, run_dir: str, manifest: dict):
+        self.run_dir = run_dir
+        self.manifest = manifest
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest["run_id"]
+
+    @property
+    def status(self) -> str:
+        return self.manifest["status"]
+
+    @classmethod
+    def create(cls, prompt: str, fingerprint: str = None, runs_dir: str = DEFAULT_RUNS_DIR):
+        run_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        run_dir = os.path.join(runs_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        checkpoint = cls(run_dir, {
+            "run_id": run_id,
+            "prompt": prompt,
+            "fingerprint": fingerprint,
+            "created_at": datetime.now().isoformat(),
+            "status": "running",
+            "completed_stages": [],
+            "failed_stage": None,
+            "error": None,
+            "history_id": None,
+        })
+        checkpoint._save_manifest()
+        return checkpoint
+
+    @classmethod
+    def load(cls, run_id: str, runs_dir: str = DEFAULT_RUNS_DIR):
+        if not run_id or os.path.basename(run_id) != run_id:
+            raise ValueError(f"Invalid run id: {run_id!r}")
+        run_dir = os.path.join(runs_dir, run_id)
+        manifest_path = os.path.join(run_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No checkpointed run '{run_id}' in {runs_dir}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return cls(run_dir, json.load(f))
+
+    def is_complete(self, stage: str) -> bool:
+        return stage in self.manifest["completed_stages"]
+
+    def load_stage(self, stage: str) -> dict:
+        with open(os.path.join(self.run_dir, f"{stage}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_stage(self, stage: str, data: dict):
+        """Stores a stage's output, then records the stage as complete."""
+        _write_json(os.path.join(self.run_dir, f"{stage}.json"), data)
+        if stage not in self.manifest["completed_stages"]:
+            self.manifest["completed_stages"].append(stage)
+        self.manifest.update(status="running", failed_stage=None, error=None)
+        self._save_manifest()
+
+    def mark_failed(self, stage: str, error):
+        self.manifest.update(status="failed", failed_stage=stage, error=str(error) if error else None)
+        self._save_manifest()
+
+    def mark_completed(self, history_id: int = None):
+        """Records completion and deletes the stage outputs (each holds a copy of the file map)."""
+        stages = self.manifest["completed_stages"]
+        self.manifest.update(status="completed", history_id=history_id, completed_stages=[])
+        self._save_manifest()
+        for stage in stages:
+            try:
+                os.remove(os.path.join(self.run_dir, f"{stage}.json"))
+            except OSError:
+                pass
+
+    def _save_manifest(self):
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        _write_json(os.path.join(self.run_dir, MANIFEST_FILE), self.manifest)
@@ -0,0 +1,30 @@
+"""
+Run Fingerprint Module.
+Identifies a generation by everything that determines its output: the
+normalized prompt, the model, the knowledge-base version and the pipeline
+version. Identical fingerprints can reuse a stored result.
+"""
+import hashlib
+import json
+import re
+import unicodedata
+
+# Bump when a pipeline change should stop old results from being reused
+PIPELINE_VERSION = "1"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Unicode NFC with whitespace collapsed; casing and wording are kept."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", prompt or "")).strip()
+
+
+def compute_fingerprint(prompt: str, model: str, kb_version, pipeline_version: str = PIPELINE_VERSION) -> str:
+    payload = {
+        "prompt": normalize_prompt(prompt),
+        "model": model,
+        "kb_version": kb_version,
+        "pipeline_version": pipeline_version,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
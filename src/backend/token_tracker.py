@@ -2,6 +2,7 @@
 Token Tracker Module.
 Singleton to track token usage across the application.
 """
+import threading
 
 class TokenTracker:
     _instance = None
@@ -11,13 +12,20 @@ class TokenTracker:
             cls._instance = super(TokenTracker, cls).__new__(cls)
             cls._instance.total_input_tokens = 0
             cls._instance.total_output_tokens = 0
+            cls._instance._lock = threading.Lock()
+            # Per-thread counters so concurrent pipeline runs can be attributed separately
+            cls._instance._local = threading.local()
         return cls._instance
 
     def add_input_tokens(self, count: int):
-        self.total_input_tokens += count
+        with self._lock:
+            self.total_input_tokens += count
+        self._local.input = getattr(self._local, "input", 0) + count
 
     def add_output_tokens(self, count: int):
-        self.total_output_tokens += count
+        with self._lock:
+            self.total_output_tokens += count
+        self._local.output = getattr(self._local, "output", 0) + count
     
     MAX_CONTEXT = 100_000
 
@@ -44,6 +52,21 @@ class TokenTracker:
             "is_exceeded": total > limit
         }
 
+    def get_thread_stats(self):
+        """Tokens used by the calling thread since its last reset_thread_stats()."""
+        input_tokens = getattr(self._local, "input", 0)
+        output_tokens = getattr(self._local, "output", 0)
+        return {
+            "input": input_tokens,
+            "output": output_tokens,
+            "total": input_tokens + output_tokens
+        }
+
+    def reset_thread_stats(self):
+        self._local.input = 0
+        self._local.output = 0
+
     def reset(self):
-        self.total_input_tokens = 0
-        self.total_output_tokens = 0
+        with self._lock:
+            self.total_input_tokens = 0
+            self.total_output_tokens = 0
@@ -0,0 +1,120 @@
+"""
+Vector Index Module.
+In-memory copy of a ChromaDB collection for read-mostly retrieval. All
+chunk embeddings are loaded once and searched with an exact normalized
+matmul, or with an HNSW graph (optional `hnswlib`) for large corpora.
+Loaded indexes stay warm per process and reload when ingestion bumps the
+collection version.
+"""
+import threading
+
+import numpy as np
+
+from src.backend.retrieval_cache import read_collection_version
+
+
+class InMemoryVectorIndex:
+    def __init__(self, ids: list, embeddings, documents: list, metadatas: list,
+                 ann_threshold: int = 20000, ef_search: int = 64):
+        """
+        Args:
+            ids, embeddings, documents, metadatas: Collection contents, row-aligned.
+            ann_threshold: Corpus size from which HNSW is used instead of exact search.
+            ef_search: HNSW query breadth (recall/latency trade-off).
+        """
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.ids]
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(self.ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Unit rows make cosine similarity a dot product; empty rows stay zero
+        self.matrix = np.ascontiguousarray(np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0))
+        self.ann = None
+        if len(self.ids) >= ann_threshold:
+            self.ann = self._build_hnsw(ef_search)
+
+    def _build_hnsw(self, ef_search: int):
+        try:
+            import hnswlib
+        except ImportError:
+            print("VectorIndex Warning: hnswlib not installed, using exact search.")
+            return None
+        ann = hnswlib.Index(space="ip", dim=self.matrix.shape[1])
+        ann.init_index(max_elements=len(self.ids), ef_construction=200, M=16)
+        ann.add_items(self.matrix, np.arange(len(self.ids)))
+        ann.set_ef(max(ef_search, 1))
+        return ann
+
+    @classmethod
+    def from_collection(cls, collection, **kwargs):
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = data.get("embeddings")
+        if embeddings is None:
+            embeddings = []
+        return cls(data["ids"], embeddings, data.get("documents") or [], data.get("metadatas"), **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, query_embeddings, n_results: int = 3) -> dict:
+        """
+        Same contract as chromadb's collection.query: one result list per
+        query row under ids/documents/metadatas/distances (cosine distance).
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        k = min(n_results, len(self.ids))
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = np.divide(queries, norms, out=np.zeros_like(queries), where=norms > 0)
+
+        if self.ann is not None:
+            # hnswlib's "ip" space already reports 1 - dot product
+            labels, distances = self.ann.knn_query(queries, k=k)
+            rows = [(labels[r], distances[r]) for r in range(len(queries))]
+        else:
+            scores = queries @ self.matrix.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            rows = []
+            for r in range(len(queries)):
+                order = top[r][np.argsort(-scores[r, top[r]])]
+                rows.append((order, 1.0 - scores[r, order]))
+
+        for order, distances in rows:
+            result["ids"].append([self.ids[i] for i in order])
+            result["documents"].append([self.documents[i] for i in order])
+            result["metadatas"].append([self.metadatas[i] for i in order])
+            result["distances"].append([float(d) for d in distances])
+        return result
+
+
+_warm_indexes = {}
+_warm_lock = threading.Lock()
+
+
+def get_vector_index(collection, db_path: str, collection_name: str, **kwargs) -> InMemoryVectorIndex:
+    """
+    Returns the process-wide in-memory index for a collection, (re)loading
+    it from ChromaDB when it is missing or the collection version changed.
+    """
+    version = read_collection_version(db_path, collection_name)
+    key = (db_path, collection_name)
+    with _warm_lock:
+        cached = _warm_indexes.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        index = InMemoryVectorIndex.from_collection(collection, **kwargs)
+        _warm_indexes[key] = (version, index)
+        print(f"VectorIndex: Loaded {len(index)} chunks from '{collection_name}' (version {version}).")
+        return index
+
+
+def clear_vector_indexes():
+    with _warm_lock:
+        _warm_indexes.clear()
@@ -6,17 +6,26 @@ import sys
 import os
 
 # Add src to pythonpath
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '.')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from backend.pipeline_orchestrator import PipelineOrchestrator
+from src.backend.pipeline_orchestrator import PipelineOrchestrator
 
 def main():
     parser = argparse.ArgumentParser(description="SpecOps CLI")
-    parser.add_argument("prompt", help="Input prompt for code generation")
+    parser.add_argument("prompt", nargs="?", help="Input prompt for code generation")
+    parser.add_argument("--no-reuse", action="store_true",
+                        help="Always generate, even if this exact prompt was generated before")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Continue a failed or interrupted run from its first incomplete stage")
     args = parser.parse_args()
+    if not args.prompt and not args.resume:
+        parser.error("a prompt is required unless --resume is given")
 
     orchestrator = PipelineOrchestrator()
-    result = orchestrator.run_pipeline(args.prompt)
+    if args.resume:
+        result = orchestrator.resume(args.resume)
+    else:
+        result = orchestrator.run_pipeline(args.prompt, reuse_existing=False if args.no_reuse else None)
     print(result)
 
 if __name__ == "__main__":
@@ -2,28 +2,27 @@
 Explainer Module.
 Provides justifications for patterns and traceability.
 """
-import json
-from src.backend.llm_client import LLMClient
+from src.backend.llm_client import LLMClient, ContextCache
+from src.backend.llm_backends import join_prefix
+from src.backend.prompt_builder import PromptContext
 
 class Explainer:
     def __init__(self):
         self.llm_client = LLMClient()
 
-    def generate_explanation(self, srs: dict, selected_patterns: list, quality_report: dict) -> str:
+    def generate_explanation(self, srs: dict, selected_patterns: list, quality_report: dict,
+                             prompt_context: PromptContext = None, context_cache: ContextCache = None) -> str:
         """
         Generates a natural language explanation of the design decisions.
         """
+        prompt_context = prompt_context or PromptContext()
+        project_prefix = prompt_context.project_prefix(srs, selected_patterns)
+        quality_text = prompt_context.render("quality_report", quality_report)
         prompt = f"""
-        You are the SpecOps System Explainer. Review the following project details and provide a concise, professional explanation of the architectural choices.
-
-        PROJECT SRS:
-        {json.dumps(srs, indent=2)}
-
-        SELECTED PATTERNS:
-        {selected_patterns}
+        You are the SpecOps System Explainer. Review the project above and provide a concise, professional explanation of the architectural choices.
 
         QUALITY METRICS:
-        {json.dumps(quality_report, indent=2)}
+        {quality_text}
 
         INSTRUCTIONS:
         1. Explain WHY the selected patterns were chosen based on specific SRS requirements (Traceability).
@@ -32,9 +31,13 @@ class Explainer:
         
         Output formatted in Markdown.
         """
+        prompt_context.record("explanation", join_prefix(project_prefix, prompt),
+                              project_prefix=project_prefix, quality_report=quality_text)
 
         try:
-            explanation = self.llm_client.generate_content(prompt)
+            if context_cache is None:
+                prompt = join_prefix(project_prefix, prompt)
+            explanation = self.llm_client.generate_content(prompt, context_cache=context_cache)
             return explanation
         except Exception as e:
             return f"Failed to generate explanation: {str(e)}"
@@ -10,7 +10,12 @@ GEMINI_MODEL = "Gemini 3 Flash"
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from src.backend.pipeline_orchestrator import PipelineOrchestrator
-from src.agents.chat_agent import ChatAgent
+from src.backend.chat_session_manager import ChatSessionManager
+
+@st.cache_resource
+def get_chat_sessions():
+    """Chat agents pooled per project across reruns and browser sessions."""
+    return ChatSessionManager()
 
 def main():
     st.set_page_config(page_title="SpecOps Dashboard", layout="wide", page_icon="🏗️")
@@ -18,8 +23,6 @@ def main():
     # Initialize session state for chat
     if 'chat_agent' not in st.session_state:
         st.session_state.chat_agent = None
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
     if 'project_result' not in st.session_state:
         st.session_state.project_result = None
     if 'total_input_tokens' not in st.session_state:
@@ -35,8 +38,11 @@ def main():
         st.header("💬 Ask Questions")
         
         if st.session_state.chat_agent:
-            # Display chat history
-            for msg in st.session_state.chat_history:
+            # Re-fetch from the pool: keeps the session from idling out and
+            # replaces an evicted agent with one restored from its transcript
+            st.session_state.chat_agent = get_chat_sessions().get_agent(st.session_state.chat_agent.project_context)
+            # Display chat history (the pooled agent's transcript, restored from disk)
+            for msg in st.session_state.chat_agent.conversation_history:
                 with st.chat_message("user"):
                     st.write(msg["user"])
                 with st.chat_message("assistant"):
@@ -45,17 +51,11 @@ def main():
             # Chat input
             user_input = st.chat_input("Ask about your project...")
             if user_input:
-                with st.spinner("Thinking..."):
-                    response = st.session_state.chat_agent.chat(user_input)
-                    
-                    # Update token counts (Handled by LLMClient -> TokenTracker now)
-                    # if st.session_state.chat_agent and hasattr(st.session_state.chat_agent, 'llm_client'):
-                    #      st.session_state.total_input_tokens += ...
-
-                st.session_state.chat_history.append({
-                    "user": user_input,
-                    "assistant": response
-                })
+                with st.chat_message("user"):
+                    st.write(user_input)
+                # Render chunks as they arrive; token counts are handled by LLMClient -> TokenTracker
+                with st.chat_message("assistant"):
+                    st.write_stream(st.session_state.chat_agent.chat_stream(user_input))
                 st.rerun()
         else:
             st.info("Generate a project first to start chatting!")
@@ -66,39 +66,48 @@ def main():
         st.header("📜 Project History")
         from src.backend.history_manager import HistoryManager
         history_mgr = HistoryManager()
-        history = history_mgr.get_all_projects()
+        # Drops entries whose project folder was deleted; no-op if already running
+        history_mgr.start_background_pruning()
+        if 'history_limit' not in st.session_state:
+            st.session_state.history_limit = 20
+        # Cached summary page; full entries are only loaded when clicked
+        history = history_mgr.list_summaries(limit=st.session_state.history_limit)
         
         if not history:
             st.text("No history found.")
         else:
-            for proj in history:
-                label = f"{proj.get('project_name', 'Untitled')} ({proj.get('timestamp', '00:00')})"
-                if st.button(label, key=f"hist_{proj.get('path')}", use_container_width=True):
+            for summary in history:
+                label = f"{summary.get('project_name', 'Untitled')} ({summary.get('timestamp', '00:00')})"
+                if st.button(label, key=f"hist_{summary['id']}", use_container_width=True):
+                    # Full stored result (loaded only now); older entries only have the SRS
+                    stored_result = history_mgr.get_project_result(summary['id'])
+                    proj = history_mgr.get_project(summary['id']) or summary
                     # Load this project into view
-                    st.session_state.project_result = {
+                    st.session_state.project_result = stored_result or {
                         "srs": proj.get("srs"),
-                        "patterns": [], # History might not have everything, verify what we saved
+                        "patterns": [], # Entries saved before results were stored
                         "project_path": proj.get("path"),
                         "status": "Completed",
                         "validation_errors": [],
-                        "file_count": 0, # Should verify existence
+                        "file_count": 0,
                         "git_initialized": True,
-                        "quality_report": {}, # Check if we can save/load this too or regenerate
+                        "quality_report": {},
                         "explanation": "Loaded from History."
                     }
-                    if 'srs' in proj:
-                        # Try to reconstruct missing bits if possible or just show what we have
-                        st.session_state.project_result["patterns"] = proj.get("srs", {}).get("patterns", []) # SRS usually doesn't have patterns?
                         
-                    # Re-initialize chat agent for this context
-                    st.session_state.chat_agent = ChatAgent(project_context={
+                    # Switch to this project's pooled chat session
+                    st.session_state.chat_agent = get_chat_sessions().get_agent({
                         "srs": proj.get("srs"),
                         "files": {},
-                        "patterns": [],
-                        "project_path": proj.get("path")
+                        "patterns": st.session_state.project_result.get("patterns") or [],
+                        "project_path": proj.get("path"),
+                        "history_id": summary['id']
                     })
                     st.session_state.conversation_stage = 'generating'
                     st.rerun()
+            if history_mgr.has_more_summaries(limit=st.session_state.history_limit) and st.button("Show more", use_container_width=True):
+                st.session_state.history_limit += 20
+                st.rerun()
 
         st.markdown("---")
         st.header("Configuration")
@@ -155,6 +164,7 @@ def main():
                     st.session_state.initial_prompt = prompt
                     # Generate questions
                     from src.agents.requirements_gatherer import RequirementsGatherer
+                    from src.backend.llm_client import QuotaExhaustedError
                     gatherer = RequirementsGatherer()
                     
                     try:
@@ -165,11 +175,10 @@ def main():
 
                         st.session_state.conversation_stage = 'qa'
                         st.rerun()
+                    except QuotaExhaustedError:
+                        st.error("⏳ API quota exhausted. Please wait a few minutes and try again.")
                     except Exception as e:
-                        if "429" in str(e) or "ResourceExhausted" in str(e):
-                            st.error("⏳ API Rate Limit Reached. Please wait a minute and try again.")
-                        else:
-                             st.error(f"Error generating questions: {e}")
+                        st.error(f"Error generating questions: {e}")
                 else:
                     st.error("Please describe your project first!")
     
@@ -193,6 +202,9 @@ def main():
                     value=st.session_state.answers.get(question, "")
                 )
                 st.session_state.answers[question] = answer
+
+            # Opt out of pipeline.reuse_identical_prompts for this generation
+            st.checkbox("Regenerate even if this exact request was generated before", key="force_regenerate")
             
             if st.form_submit_button("🚀 Generate Project", type="primary", use_container_width=True):
                 # Check if all questions answered
@@ -235,11 +247,15 @@ def main():
                     # For now, let's just let the TokenTracker accumulate.
                     pass
 
-                result = orchestrator.run_pipeline(enhanced_prompt, step_callback=None) # Callback omitted for now as explicit UI redraw is complex without placeholders
+                reuse_existing = False if st.session_state.get("force_regenerate") else None
+                result = orchestrator.run_pipeline(enhanced_prompt, step_callback=None, # Callback omitted for now as explicit UI redraw is complex without placeholders
+                                                   reuse_existing=reuse_existing)
                 
                 if result["status"] == "Failed":
                     status.update(label="Pipeline Failed", state="error", expanded=True)
                     st.error(f"Error in stage {result['stage']}: {result['error']}")
+                    if result.get("run_id"):
+                        st.info(f"Completed stages were saved. Resume with: `python src/cli.py --resume {result['run_id']}`")
                     if "details" in result:
                         st.json(result["details"])
                     # Don't save failed results to session state to allow retry
@@ -264,16 +280,20 @@ def main():
         # Use existing result
         result = st.session_state.project_result
         
+        if result.get("reused_from"):
+             st.info("This exact request was generated before; showing the stored result. "
+                     "Tick \"Regenerate even if this exact request was generated before\" to generate it again.")
         if result.get("duration_seconds"):
              st.success(f"✨ Generation completed in **{result['duration_seconds']:.2f} seconds**!")
 
         # Initialize Chat Agent if needed
         if not st.session_state.chat_agent:
-             st.session_state.chat_agent = ChatAgent(project_context={
+             st.session_state.chat_agent = get_chat_sessions().get_agent({
                 "srs": result.get("srs"),
                 "files": {},  # Don't include full files to save memory
                 "patterns": result.get("patterns"),
-                "project_path": result.get("project_path")
+                "project_path": result.get("project_path"),
+                "history_id": result.get("history_id")
             })
 
         # Structure Results using Tabs
@@ -346,7 +366,6 @@ def main():
             st.session_state["initial_prompt_input"] = "" # Clear widget state
             st.session_state.questions = []
             st.session_state.answers = {}
-            st.session_state.chat_history = []
             st.session_state.project_result = None # Clear result
             st.session_state.chat_agent = None 
             st.rerun()
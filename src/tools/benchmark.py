@@ -1,87 +1,358 @@
 """
 Benchmark Tool for SpecOps.
-Runs multiple scenarios to validate system performance and metrics.
+Runs scenario sets with repetitions and concurrency, collects per-stage latency
+percentiles, token usage, retries and quality scores, and compares the report
+against a stored baseline to catch performance regressions.
+
+Usage:
+    python -m src.tools.benchmark --scenarios data/benchmarks/scenarios.json \
+        --repetitions 3 --concurrency 2 --output bench_results \
+        --baseline data/benchmarks/baseline.json
+
+    # Network-free: replay responses captured earlier with --llm-backend record
+    python -m src.tools.benchmark --llm-backend replay --replay-latency 0
 """
 import sys
 import os
+import csv
 import json
 import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import yaml
 
 # Add src to pythonpath
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from src.backend.pipeline_orchestrator import PipelineOrchestrator
+from src.backend.token_tracker import TokenTracker
 
-SCENARIOS = [
-    {
-        "name": "E-commerce Backend",
-        "prompt": "Build a scalable e-commerce backend with product search, shopping cart, and user authentication using the Repository pattern and Service layer."
-    },
-    {
-        "name": "Personal Blog Engine",
-        "prompt": "Create a simple blog engine where users can post articles and comment. Use MVC pattern."
-    },
-    {
-        "name": "Todo List API",
-        "prompt": "A lightweight REST API for a Todo list application. Use Singleton for database connection."
-    }
+# The default scenario set; --scenarios selects another file
+DEFAULT_SCENARIOS_FILE = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../../data/benchmarks/scenarios.json')
+)
+
+PERCENTILES = (50, 95, 99)
+
+# Allowed relative slowdown of a stage's p95 (or token usage) before it is flagged
+DEFAULT_TOLERANCE = 0.2
+
+BENCH_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../generated_projects/_benchmark'))
+
+CSV_FIELDS = [
+    "scenario", "repetition", "success", "overall_pass", "duration_sec",
+    "files_generated", "pylint_score", "tests_passed", "input_tokens",
+    "output_tokens", "llm_retries", "self_heal_attempts", "error"
 ]
 
-def run_benchmark():
-    orchestrator = PipelineOrchestrator()
-    results = []
-    
-    print(f"Starting Benchmark on {len(SCENARIOS)} scenarios...")
+
+def load_scenarios(path: str) -> list:
+    """
+    Loads a scenario set from a JSON or YAML file.
+    The file may hold a plain list or a mapping with a 'scenarios' key;
+    every scenario needs a 'name' and a 'prompt'.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get("scenarios", [])
+
+    scenarios = []
+    for entry in data:
+        if not entry.get("name") or not entry.get("prompt"):
+            raise ValueError(f"Scenario entries need 'name' and 'prompt': {entry}")
+        scenarios.append({"name": entry["name"], "prompt": entry["prompt"]})
+    return scenarios
+
+
+class _RetryCounter(logging.Handler):
+    """Counts tenacity 'Retrying' warnings emitted by the LLM client, per thread."""
+
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        if record.getMessage().startswith("Retrying"):
+            with self._lock:
+                self.counts[record.thread] = self.counts.get(record.thread, 0) + 1
+
+    def pop(self, thread_id) -> int:
+        with self._lock:
+            return self.counts.pop(thread_id, 0)
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    arr = np.asarray(values, dtype=float)
+    return {f"p{p}": round(float(np.percentile(arr, p)), 4) for p in PERCENTILES}
+
+
+def _numeric(value):
+    """Quality metrics can be strings ("N/A ...", "Error: ..."); keep only numbers."""
+    return value if isinstance(value, (int, float)) else None
+
+
+def _run_single(scenario: dict, repetition: int, orchestrator_factory, retry_counter) -> dict:
+    tracker = TokenTracker()
+    tracker.reset_thread_stats()
+    retry_counter.pop(threading.get_ident())
+    start_time = time.perf_counter()
+
+    try:
+        orchestrator = orchestrator_factory()
+        # Every repetition is a real run: a result reused from history would carry
+        # the original run's timings and no token usage
+        output = orchestrator.run_pipeline(scenario['prompt'], reuse_existing=False)
+        duration = time.perf_counter() - start_time
+
+        success = output.get("status") == "Completed"
+        quality = output.get("quality_report", {}) or {}
+        file_count = output.get("file_count", 0)
+
+        # Metrics
+        pylint_score = quality.get("pylint_score", 0)
+        tests_passed = quality.get("tests_passed", 0)
+
+        # Validation Logic
+        score = _numeric(pylint_score)
+        passed = success and score is not None and score >= 5.0 and file_count > 0
+
+        result = {
+            "scenario": scenario['name'],
+            "repetition": repetition,
+            "success": success,
+            "duration_sec": round(duration, 2),
+            "stage_timings": output.get("stage_timings", {}),
+            "files_generated": file_count,
+            "pylint_score": pylint_score,
+            "tests_passed": tests_passed,
+            "self_heal_attempts": output.get("self_heal_attempts", 0),
+            "overall_pass": passed
+        }
+        if not success:
+            result["error"] = output.get("error")
+    except Exception as e:
+        print(f"  -> CRITICAL ERROR in {scenario['name']}: {e}")
+        result = {
+            "scenario": scenario['name'],
+            "repetition": repetition,
+            "success": False,
+            "duration_sec": round(time.perf_counter() - start_time, 2),
+            "stage_timings": {},
+            "error": str(e),
+            "overall_pass": False
+        }
+
+    tokens = tracker.get_thread_stats()
+    result["input_tokens"] = tokens["input"]
+    result["output_tokens"] = tokens["output"]
+    result["llm_retries"] = retry_counter.pop(threading.get_ident())
+
+    print(f"  -> {scenario['name']} #{repetition}: {'PASS' if result['overall_pass'] else 'FAIL'} ({result['duration_sec']}s)")
+    return result
+
+
+def summarize(results: list) -> dict:
+    """Aggregates per-run results into latency percentiles, token and quality statistics."""
+    stage_samples = {}
+    for r in results:
+        for stage, seconds in r.get("stage_timings", {}).items():
+            stage_samples.setdefault(stage, []).append(seconds)
+
+    durations = [r["duration_sec"] for r in results if r.get("success")]
+    scores = [s for s in (_numeric(r.get("pylint_score")) for r in results) if s is not None]
+    passed_count = sum(1 for r in results if r["overall_pass"])
+
+    return {
+        "runs": len(results),
+        "passed": passed_count,
+        "pass_rate": round(passed_count / len(results), 4) if results else 0.0,
+        "duration_sec": _percentiles(durations),
+        "stages": {stage: _percentiles(samples) for stage, samples in stage_samples.items()},
+        "tokens": {
+            "input_mean": round(float(np.mean([r.get("input_tokens", 0) for r in results])), 1) if results else 0.0,
+            "output_mean": round(float(np.mean([r.get("output_tokens", 0) for r in results])), 1) if results else 0.0,
+            "total": sum(r.get("input_tokens", 0) + r.get("output_tokens", 0) for r in results)
+        },
+        "llm_retries": sum(r.get("llm_retries", 0) for r in results),
+        "self_heal_attempts": sum(r.get("self_heal_attempts", 0) for r in results),
+        "pylint_score_mean": round(float(np.mean(scores)), 2) if scores else None
+    }
+
+
+def compare_to_baseline(summary: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compares a summary with a baseline summary.
+    Returns a list of human-readable regressions (empty if none).
+    """
+    regressions = []
+
+    def check(label, current, previous):
+        if current is None or not previous:
+            return
+        if current > previous * (1 + tolerance):
+            regressions.append(f"{label}: {current} vs baseline {previous} (+{(current / previous - 1) * 100:.1f}%)")
+
+    check("duration p95", summary["duration_sec"].get("p95"), baseline.get("duration_sec", {}).get("p95"))
+    for stage, stats in summary["stages"].items():
+        check(f"{stage} p95", stats.get("p95"), baseline.get("stages", {}).get(stage, {}).get("p95"))
+    check("input tokens (mean)", summary["tokens"]["input_mean"], baseline.get("tokens", {}).get("input_mean"))
+    check("output tokens (mean)", summary["tokens"]["output_mean"], baseline.get("tokens", {}).get("output_mean"))
+
+    if summary["pass_rate"] < baseline.get("pass_rate", 0):
+        regressions.append(f"pass rate: {summary['pass_rate']} vs baseline {baseline['pass_rate']}")
+    return regressions
+
+
+def write_report(report: dict, output_dir: str) -> dict:
+    """Writes the full JSON report and a per-run CSV. Returns the written paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, "benchmark_report.json")
+    csv_path = os.path.join(output_dir, "benchmark_runs.csv")
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        stage_names = sorted(report["summary"]["stages"].keys())
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS + [f"stage_{s}" for s in stage_names], extrasaction='ignore')
+        writer.writeheader()
+        for r in report["results"]:
+            row = dict(r)
+            for stage in stage_names:
+                row[f"stage_{stage}"] = r.get("stage_timings", {}).get(stage)
+            writer.writerow(row)
+
+    return {"json": json_path, "csv": csv_path}
+
+
+def run_benchmark(scenarios: list = None, repetitions: int = 1, concurrency: int = 1,
+                  output_dir: str = None, baseline_path: str = None,
+                  tolerance: float = DEFAULT_TOLERANCE) -> dict:
+    if scenarios is None:
+        scenarios = load_scenarios(DEFAULT_SCENARIOS_FILE)
+    if not scenarios:
+        raise ValueError("No benchmark scenarios selected.")
+    jobs = [(scenario, rep) for rep in range(1, repetitions + 1) for scenario in scenarios]
+
+    # One orchestrator per worker thread, each writing into its own directory so
+    # concurrent runs of the same scenario never clobber each other's project files.
+    local = threading.local()
+    worker_ids = iter(range(1, len(jobs) + 1))
+    worker_lock = threading.Lock()
+
+    def orchestrator_factory():
+        if not hasattr(local, "orchestrator"):
+            local.orchestrator = PipelineOrchestrator()
+            if concurrency > 1:
+                with worker_lock:
+                    worker_id = next(worker_ids)
+                local.orchestrator.generated_root = os.path.join(BENCH_ROOT, f"worker_{worker_id}")
+        return local.orchestrator
+
+    retry_counter = _RetryCounter()
+    llm_logger = logging.getLogger("src.backend.llm_client")
+    llm_logger.addHandler(retry_counter)
+
+    print(f"Starting Benchmark on {len(scenarios)} scenarios x {repetitions} repetitions (concurrency={concurrency})...")
     print("-" * 60)
 
-    for scenario in SCENARIOS:
-        print(f"Running Scenario: {scenario['name']}...")
-        start_time = time.time()
-        
-        try:
-            output = orchestrator.run_pipeline(scenario['prompt'])
-            duration = time.time() - start_time
-            
-            success = output.get("status") == "Completed"
-            quality = output.get("quality_report", {})
-            file_count = output.get("file_count", 0)
-            
-            # Metrics
-            pylint_score = quality.get("pylint_score", 0)
-            tests_passed = quality.get("tests_passed", 0)
-            
-            # Validation Logic
-            passed = success and pylint_score >= 5.0 and file_count > 0
-            
-            results.append({
-                "scenario": scenario['name'],
-                "success": success,
-                "duration_sec": round(duration, 2),
-                "files_generated": file_count,
-                "pylint_score": pylint_score,
-                "tests_passed": tests_passed,
-                "overall_pass": passed
-            })
-            
-            print(f"  -> Result: {'PASS' if passed else 'FAIL'}")
-            
-        except Exception as e:
-            print(f"  -> CRITICAL ERROR: {e}")
-            results.append({
-                "scenario": scenario['name'],
-                "success": False,
-                "error": str(e),
-                "overall_pass": False
-            })
+    started = time.perf_counter()
+    try:
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(lambda job: _run_single(job[0], job[1], orchestrator_factory, retry_counter), jobs))
+        else:
+            results = [_run_single(s, rep, orchestrator_factory, retry_counter) for s, rep in jobs]
+    finally:
+        llm_logger.removeHandler(retry_counter)
+    wall_time = time.perf_counter() - started
+
+    summary = summarize(results)
+    summary["wall_time_sec"] = round(wall_time, 2)
+    report = {
+        "config": {
+            "scenarios": [s["name"] for s in scenarios],
+            "repetitions": repetitions,
+            "concurrency": concurrency
+        },
+        "summary": summary,
+        "results": results
+    }
 
     print("-" * 60)
     print("Benchmark Complete. Summary:")
-    print(json.dumps(results, indent=2))
-    
+    print(json.dumps(summary, indent=2))
+
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_to_baseline(summary, baseline.get("summary", baseline), tolerance)
+        if report["regressions"]:
+            print("\nRegressions against baseline:")
+            for line in report["regressions"]:
+                print(f"  - {line}")
+        else:
+            print("\nNo regressions against baseline.")
+
+    if output_dir:
+        paths = write_report(report, output_dir)
+        print(f"\nReport written to {paths['json']} and {paths['csv']}")
+
     # Calculate Overall Success Rate
     total = len(results)
-    passed_count = sum(1 for r in results if r["overall_pass"])
+    passed_count = summary["passed"]
     print(f"\nSuccess Rate: {passed_count}/{total} ({passed_count/total*100:.1f}%)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SpecOps Benchmark")
+    parser.add_argument("--scenarios", help="JSON/YAML scenario file (defaults to data/benchmarks/scenarios.json)")
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--output", help="Directory for benchmark_report.json / benchmark_runs.csv")
+    parser.add_argument("--baseline", help="Baseline report to diff against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric is flagged")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Overwrite --baseline with this run's report")
+    parser.add_argument("--llm-backend", choices=["gemini", "replay", "record"],
+                        help="LLM transport; 'replay' serves recorded responses offline")
+    parser.add_argument("--replay-file", help="Cassette used by the replay/record backends")
+    parser.add_argument("--replay-latency", type=float,
+                        help="Synthetic seconds added to every replayed LLM call")
+    args = parser.parse_args()
+
+    if args.llm_backend:
+        os.environ["SPECOPS_LLM_BACKEND"] = args.llm_backend
+    if args.replay_file:
+        os.environ["SPECOPS_REPLAY_FILE"] = args.replay_file
+    if args.replay_latency is not None:
+        os.environ["SPECOPS_REPLAY_LATENCY"] = str(args.replay_latency)
+
+    scenarios = load_scenarios(args.scenarios or DEFAULT_SCENARIOS_FILE)
+    report = run_benchmark(scenarios, args.repetitions, args.concurrency,
+                           args.output, None if args.save_baseline else args.baseline, args.tolerance)
+
+    if args.save_baseline and args.baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"summary": report["summary"]}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif report.get("regressions"):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    run_benchmark()
+    main()
@@ -0,0 +1,38 @@
+"""
+Tests for ChatAgent.
+"""
+import pytest
+from unittest.mock import patch
+from src.agents.chat_agent import ChatAgent
+
+@pytest.fixture
+def mock_llm():
+    with patch('src.agents.chat_agent.LLMClient') as MockLLM:
+        yield MockLLM
+
+def test_chat_stream_updates_history_when_complete(mock_llm):
+    mock_llm.return_value.generate_content_stream.return_value = iter(["Run ", "python ", "main.py"])
+    agent = ChatAgent(project_context={"srs": {"project_name": "Todo"}, "patterns": ["MVC"]})
+
+    stream = agent.chat_stream("How do I run it?")
+    assert next(stream) == "Run "
+    assert agent.conversation_history == []
+
+    assert "".join(stream) == "python main.py"
+    assert agent.conversation_history == [{"user": "How do I run it?", "assistant": "Run python main.py"}]
+    prompt = mock_llm.return_value.generate_content_stream.call_args.args[0]
+    assert prompt.endswith("User: How do I run it?\nAssistant:")
+
+def test_chat_includes_relevant_project_code(mock_llm, tmp_path):
+    (tmp_path / "auth.py").write_text("def login(user, password):\n    return check_hash(password)\n", encoding="utf-8")
+    (tmp_path / "report.py").write_text("def export_csv(rows):\n    pass\n", encoding="utf-8")
+    mock_llm.return_value.generate_content.return_value = "It hashes the password."
+    agent = ChatAgent(project_context={"srs": {}, "files": {}, "patterns": [], "project_path": str(tmp_path)})
+
+    agent.chat("How does login check the password?")
+
+    prefix = mock_llm.return_value.create_context_cache.call_args.args[0]
+    assert "  - auth.py" in prefix and "  - report.py" in prefix
+    prompt = mock_llm.return_value.generate_content.call_args.args[0]
+    assert "return check_hash(password)" in prompt
+    assert "export_csv" not in prompt
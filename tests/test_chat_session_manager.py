@@ -0,0 +1,85 @@
+"""
+Tests for ChatSessionManager.
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from src.backend.chat_session_manager import ChatSessionManager
+
+def _context(tmp_path, name):
+    return {"srs": {"project_name": name}, "files": {}, "patterns": [], "project_path": str(tmp_path / name)}
+
+def _manager(tmp_path, **kwargs):
+    llm = MagicMock()
+    llm.generate_content.return_value = "Sure."
+    return ChatSessionManager(transcript_dir=str(tmp_path / "sessions"), llm_client=llm, **kwargs), llm
+
+def test_agents_are_pooled_per_project_with_one_client(tmp_path):
+    manager, llm = _manager(tmp_path)
+
+    first = manager.get_agent(_context(tmp_path, "Todo"))
+    assert manager.get_agent(_context(tmp_path, "Todo")) is first
+    other = manager.get_agent(_context(tmp_path, "Shop"))
+
+    assert other is not first and len(manager) == 2
+    assert first.llm_client is llm and other.llm_client is llm
+
+def test_lru_and_idle_eviction_close_agents(tmp_path):
+    manager, _ = _manager(tmp_path, max_sessions=2, idle_ttl_seconds=60)
+    with patch('src.backend.chat_session_manager.time.monotonic', return_value=0.0):
+        todo = manager.get_agent(_context(tmp_path, "Todo"))
+        shop = manager.get_agent(_context(tmp_path, "Shop"))
+        manager.get_agent(_context(tmp_path, "Todo"))
+    todo.close = MagicMock()
+    shop.close = MagicMock()
+
+    with patch('src.backend.chat_session_manager.time.monotonic', return_value=1.0):
+        manager.get_agent(_context(tmp_path, "Blog"))
+    shop.close.assert_called_once()
+    todo.close.assert_not_called()
+
+    with patch('src.backend.chat_session_manager.time.monotonic', return_value=120.0):
+        manager.get_agent(_context(tmp_path, "Wiki"))
+    todo.close.assert_called_once()
+    assert len(manager) == 1
+
+def test_transcript_survives_eviction_and_restart(tmp_path):
+    manager, _ = _manager(tmp_path)
+    agent = manager.get_agent(_context(tmp_path, "Todo"))
+    agent.chat("How do I run it?")
+    manager.close_all()
+
+    restarted, _ = _manager(tmp_path)
+    restored = restarted.get_agent(_context(tmp_path, "Todo"))
+    assert restored is not agent
+    assert restored.conversation_history == [{"user": "How do I run it?", "assistant": "Sure."}]
+    assert restarted.get_agent(_context(tmp_path, "Shop")).conversation_history == []
+
+def test_regenerated_project_gets_a_fresh_session(tmp_path):
+    manager, _ = _manager(tmp_path)
+    first_run = {**_context(tmp_path, "Todo"), "history_id": 1}
+    manager.get_agent(first_run).chat("What does main.py do?")
+
+    # Same project folder, new generation
+    regenerated = manager.get_agent({**_context(tmp_path, "Todo"), "history_id": 2})
+
+    assert regenerated is not manager.get_agent(first_run)
+    assert regenerated.conversation_history == []
+
+def test_concurrent_first_turns_create_one_context_cache(tmp_path):
+    manager, llm = _manager(tmp_path)
+
+    def slow_cache(*args, **kwargs):
+        time.sleep(0.05)
+        return MagicMock()
+    llm.create_context_cache.side_effect = slow_cache
+    agent = manager.get_agent(_context(tmp_path, "Todo"))
+
+    threads = [threading.Thread(target=agent.chat, args=(f"Question {i}",)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    llm.create_context_cache.assert_called_once()
+    assert len(agent.conversation_history) == 2
@@ -43,3 +43,12 @@ def test_code_generator_validation(mock_llm):
     }
     errors = generator._validate_structure(files_missing_suffix, ["Repository Pattern"])
     assert any("requires files ending in '_repository.py'" in e for e in errors)
+
+def test_unparseable_response_reports_decode_error(mock_llm):
+    mock_llm.return_value.generate_content.return_value = '{"src/main.py": "print("hi")"'
+    generator = CodeGenerator()
+
+    result = generator.generate_code({"project_name": "Test"}, [])
+
+    assert result["success"] is False
+    assert result["error"].startswith("JSON parsing failed: Expecting")
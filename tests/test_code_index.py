@@ -0,0 +1,50 @@
+"""
+Tests for the generated-project code index.
+"""
+import os
+from src.backend.code_index import (
+    build_code_index,
+    chunk_file,
+    code_index_path,
+    indexed_files,
+    load_code_index,
+    retrieve_code_context,
+)
+
+def _project(tmp_path):
+    project = tmp_path / "TodoApp"
+    (project / "models").mkdir(parents=True)
+    (project / "models" / "user.py").write_text(
+        "class User:\n    def __init__(self, email):\n        self.email = email\n", encoding="utf-8")
+    (project / "main.py").write_text(
+        "from models.user import User\n\ndef run_server(port):\n    print('listening', port)\n", encoding="utf-8")
+    (project / ".git").mkdir()
+    (project / ".git" / "config").write_text("[core]\n", encoding="utf-8")
+    return str(project)
+
+def test_chunk_file_splits_at_top_level_definitions():
+    content = "\n".join(["import os"] + ["x = 1"] * 9 + ["def a():", "    pass"] + ["y = 2"] * 50)
+    chunks = chunk_file(content, max_lines=40)
+    assert [(start, end) for start, end, _ in chunks] == [(1, 10), (11, 50), (51, 62)]
+    assert chunks[1][2].startswith("def a():")
+
+def test_build_and_retrieve_snippets(tmp_path):
+    project = _project(tmp_path)
+    build_code_index(project)
+
+    assert os.path.exists(code_index_path(project))
+    index = load_code_index(project)
+    assert indexed_files(index) == ["main.py", "models/user.py"]
+
+    packed = retrieve_code_context(index, "Where is the user email stored?", budget_tokens=200)
+    assert packed["entries"][0].startswith("- Source: models/user.py (lines 1-3)")
+    assert "self.email = email" in packed["text"]
+
+def test_index_is_built_on_demand_and_ignored_by_project_git(tmp_path):
+    project = _project(tmp_path)
+    assert load_code_index(str(tmp_path / "missing")) is None
+
+    index = load_code_index(project)
+    assert "models/user.py" in indexed_files(index)
+    gitignore = os.path.join(os.path.dirname(code_index_path(project)), ".gitignore")
+    assert open(gitignore, encoding="utf-8").read() == "*\n"
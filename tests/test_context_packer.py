@@ -0,0 +1,36 @@
+"""
+Tests for Context Packer.
+"""
+from src.backend.context_packer import compact_json, estimate_tokens, pack_context
+
+def _chunk(text, source="Observer.pdf"):
+    return {"document": text, "metadata": {"source": source}}
+
+def test_compact_json_has_no_padding():
+    assert compact_json({"a": [1, 2], "b": "é"}) == '{"a":[1,2],"b":"é"}'
+
+def test_neighbouring_chunk_overlap_is_trimmed():
+    full_text = "".join(f"w{i:04d} " for i in range(400))
+    first, second = full_text[:1000], full_text[900:1900]
+
+    result = pack_context([_chunk(first), _chunk(second)], budget_tokens=10000)
+
+    assert len(result["entries"]) == 2
+    assert result["entries"][1].endswith(second[100:])
+    assert first[900:] not in result["entries"][1]
+
+def test_duplicates_are_dropped():
+    result = pack_context([_chunk("Observer notifies subscribers."), _chunk("Observer  notifies subscribers.")],
+                          budget_tokens=1000)
+    assert len(result["entries"]) == 1
+    assert result["dropped"] == 1
+
+def test_budget_is_filled_greedily_in_rank_order():
+    chunks = [_chunk(f"chunk {i} " + "x" * 800, source=f"{i}.pdf") for i in range(5)]
+
+    result = pack_context(chunks, budget_tokens=500)
+
+    assert result["tokens"] <= 500
+    assert [e.split("\n")[0] for e in result["entries"]] == ["- Source: 0.pdf", "- Source: 1.pdf", "- Source: 2.pdf"]
+    assert result["entries"][-1].endswith("...")
+    assert sum(estimate_tokens(e) for e in result["entries"]) == result["tokens"]
@@ -0,0 +1,82 @@
+"""
+Tests for ConversationMemory.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+from src.backend.conversation_memory import ConversationMemory
+
+def _answer(n):
+    return f"Answer {n}: " + "details " * 40
+
+def test_old_turns_fold_into_summary():
+    llm = MagicMock()
+    llm.generate_content.return_value = "User asked about q0 and q1."
+    # Each turn is ~85 tokens, so two fit the budget
+    memory = ConversationMemory(llm, recent_budget_tokens=200, background=False)
+
+    for n in range(4):
+        memory.add(f"q{n}", _answer(n))
+
+    rendered = memory.render()
+    assert rendered.startswith("Summary of earlier conversation:\nUser asked about q0 and q1.")
+    assert "User: q2\nAssistant: Answer 2" in rendered and "User: q3" in rendered
+    assert "User: q0" not in rendered and "\\n" not in rendered
+    summary_prompt = llm.generate_content.call_args.args[0]
+    assert "User: q1" in summary_prompt and "User: q0" not in summary_prompt
+    assert len(memory.turns) == 4
+
+def test_summary_runs_off_the_critical_path():
+    release = threading.Event()
+    llm = MagicMock()
+    llm.generate_content.side_effect = lambda prompt: release.wait(5) and "Earlier: q0."
+    memory = ConversationMemory(llm, recent_budget_tokens=100)
+
+    memory.add("q0", _answer(0))
+    memory.add("q1", _answer(1))
+    # The summarizer is blocked; the response path is not, and q0 is kept until summarized
+    assert memory.render() == (f"Earlier exchanges (not yet summarized):\nUser: q0\nAssistant: {_answer(0)}"
+                               f"\n\nPrevious conversation:\nUser: q1\nAssistant: {_answer(1)}")
+
+    release.set()
+    memory.wait(5)
+    assert memory.render().startswith("Summary of earlier conversation:\nEarlier: q0.")
+    assert "not yet summarized" not in memory.render()
+
+def test_clear_discards_in_flight_summary():
+    release = threading.Event()
+    llm = MagicMock()
+    llm.generate_content.side_effect = lambda prompt: release.wait(5) and "stale"
+    memory = ConversationMemory(llm, recent_budget_tokens=100)
+    memory.add("q0", _answer(0))
+    memory.add("q1", _answer(1))
+
+    memory.clear()
+    release.set()
+    memory.wait(5)
+    assert memory.summary == "" and memory.render() == ""
+
+def test_failed_summary_keeps_turns_and_retries():
+    llm = MagicMock()
+    llm.generate_content.side_effect = [RuntimeError("quota"), "Earlier: q0."]
+    memory = ConversationMemory(llm, recent_budget_tokens=100, summary_budget_tokens=20)
+
+    with patch('src.backend.conversation_memory.time.sleep') as sleep:
+        memory.add("q0", _answer(0))
+        memory.add("q1", _answer(1))
+        memory.wait(5)
+
+    sleep.assert_called_once_with(2.0)
+    assert memory.summary == "Earlier: q0."
+    assert memory._worker is None
+
+def test_failed_inline_summary_shortens_turns_into_prompt():
+    llm = MagicMock()
+    llm.generate_content.side_effect = RuntimeError("quota")
+    memory = ConversationMemory(llm, recent_budget_tokens=100, summary_budget_tokens=20, background=False)
+
+    memory.add("q0", _answer(0))
+    memory.add("q1", _answer(1))
+
+    pending = memory.render().split("\n\nPrevious conversation:")[0]
+    assert pending.startswith("Earlier exchanges (not yet summarized):\nUser: q0")
+    assert pending.endswith("...") and len(pending) < 20 * 4 + 60
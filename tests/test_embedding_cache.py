@@ -0,0 +1,45 @@
+"""
+Tests for Embedding Cache.
+"""
+import numpy as np
+from unittest.mock import MagicMock
+from src.backend.embedding_cache import EmbeddingCache
+from src.backend.llm_client import LLMClient
+from src.backend.rate_limiter import RateLimiter
+
+def test_memory_tier_is_lru(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_memory_entries=2, persist=False)
+    cache.put("m", "retrieval_query", "a", [1.0])
+    cache.put("m", "retrieval_query", "b", [2.0])
+    cache.get("m", "retrieval_query", "a")
+    cache.put("m", "retrieval_query", "c", [3.0])
+
+    assert cache.get("m", "retrieval_query", "b") is None
+    assert cache.get("m", "retrieval_query", "a").tolist() == [1.0]
+
+def test_disk_tier_stores_packed_float32(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("m", "retrieval_query", "text", [0.5, -0.25, 1.0])
+
+    key = EmbeddingCache.make_key("m", "retrieval_query", "text")
+    stored = np.fromfile(tmp_path / key[:2] / f"{key}.f32", dtype=np.float32)
+    assert stored.tolist() == [0.5, -0.25, 1.0]
+
+    # A fresh cache (new process) reads it back from disk
+    assert EmbeddingCache(str(tmp_path)).get("m", "retrieval_query", "text").tolist() == [0.5, -0.25, 1.0]
+    # Task type and model are part of the key
+    assert cache.get("m", "retrieval_document", "text") is None
+    assert cache.get("other", "retrieval_query", "text") is None
+
+def test_llm_client_skips_backend_on_cache_hit(tmp_path):
+    backend = MagicMock()
+    backend.embed_model_name = "models/test-embed"
+    backend.embed.return_value = [[0.1, 0.2]]
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter(), embed_rate_limiter=RateLimiter(),
+                       embedding_cache=EmbeddingCache(str(tmp_path)))
+
+    first = client.get_embedding("same query")
+    second = client.get_embedding("same query")
+
+    assert np.allclose(first, second)
+    backend.embed.assert_called_once()
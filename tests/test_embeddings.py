@@ -0,0 +1,51 @@
+"""
+Tests for Embedding Providers.
+"""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from src.backend.embeddings import (
+    HashingEmbeddingProvider,
+    GeminiEmbeddingProvider,
+    get_embedding_provider,
+)
+
+@pytest.fixture
+def provider(tmp_path):
+    return HashingEmbeddingProvider(dimension=256, idf_path=str(tmp_path / "idf.npy"))
+
+def test_hashing_provider_shapes_and_norm(provider):
+    vec = provider.embed("Observer pattern notifies subscribers")
+    assert vec.shape == (256,) and vec.dtype == np.float32
+    assert abs(np.linalg.norm(vec) - 1.0) < 1e-5
+
+    matrix = provider.embed(["a b", "c d", ""])
+    assert matrix.shape == (3, 256)
+    assert not matrix[2].any()
+
+def test_hashing_provider_ranks_lexical_overlap(provider):
+    corpus = [
+        "The Singleton pattern ensures a class has only one instance.",
+        "The Observer pattern notifies subscribers when state changes.",
+        "The Repository pattern separates data access from business logic.",
+    ]
+    provider.fit(corpus)
+    docs = provider.embed(corpus, task_type="retrieval_document")
+    query = provider.embed("notify subscribers about state changes")
+    assert int(np.argmax(docs @ query)) == 1
+
+    # IDF persisted for query-time use by a new instance
+    reloaded = HashingEmbeddingProvider(dimension=256, idf_path=provider.idf_path)
+    assert np.allclose(reloaded.embed("notify subscribers"), provider.embed("notify subscribers"))
+
+def test_provider_factory_and_collections():
+    llm_client = MagicMock()
+    gemini = get_embedding_provider(llm_client, name="gemini")
+    assert isinstance(gemini, GeminiEmbeddingProvider)
+    assert gemini.collection_name == "design_patterns"
+    gemini.embed("query")
+    llm_client.get_embedding.assert_called_once_with("query", task_type="retrieval_query")
+
+    assert get_embedding_provider(name="hashing").collection_name == "design_patterns_hashing"
+    with pytest.raises(ValueError):
+        get_embedding_provider(name="unknown")
@@ -0,0 +1,183 @@
+"""
+Tests for HistoryManager.
+"""
+import json
+import threading
+import time
+from src.backend.history_manager import HistoryManager, build_file_manifest
+
+def _manager(tmp_path):
+    return HistoryManager(history_file=str(tmp_path / "history.json"), db_file=str(tmp_path / "history.db"))
+
+def test_save_and_list_newest_first(tmp_path):
+    manager = _manager(tmp_path)
+    for i in range(5):
+        manager.save_project_entry({
+            "project_name": f"App{i}",
+            "prompt": "Build it",
+            "path": str(tmp_path),
+            "srs": {"project_name": f"App{i}"},
+            "timestamp": f"2026-01-0{i + 1} 10:00:00",
+        })
+
+    page = manager.list_projects(limit=2, offset=1)
+
+    assert [p["project_name"] for p in page] == ["App3", "App2"]
+    assert page[0]["srs"] == {"project_name": "App3"}
+    assert manager.count_projects() == 5
+    assert [p["project_name"] for p in manager.list_projects(project_name="App1")] == ["App1"]
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    (tmp_path / "history.json").write_text(json.dumps([
+        {"project_name": "Newer", "path": str(tmp_path), "timestamp": "2026-02-01 00:00:00", "srs": {}},
+        {"project_name": "Older", "path": str(tmp_path), "timestamp": "2026-01-01 00:00:00", "srs": {}},
+    ]), encoding="utf-8")
+
+    manager = _manager(tmp_path)
+    assert [p["project_name"] for p in manager.get_all_projects()] == ["Newer", "Older"]
+
+    # Reopening does not import the file again
+    assert _manager(tmp_path).count_projects() == 2
+
+def test_missing_paths_are_hidden_then_pruned(tmp_path):
+    manager = _manager(tmp_path)
+    manager.save_project_entry({"project_name": "Kept", "path": str(tmp_path)})
+    manager.save_project_entry({"project_name": "Gone", "path": str(tmp_path / "deleted")})
+
+    assert [p["project_name"] for p in manager.get_all_projects()] == ["Kept"]
+    # Reads never write
+    assert manager.count_projects() == 2
+
+    assert manager.prune_missing_projects() == 1
+    assert manager.count_projects() == 1
+
+def test_background_pruning_job(tmp_path):
+    manager = _manager(tmp_path)
+    manager.save_project_entry({"project_name": "Gone", "path": str(tmp_path / "deleted")})
+
+    assert manager.start_background_pruning(interval_seconds=0.05) is True
+    assert manager.start_background_pruning(interval_seconds=0.05) is False
+    for _ in range(100):
+        if manager.count_projects() == 0:
+            break
+        time.sleep(0.02)
+    manager.stop_background_pruning()
+    assert manager.count_projects() == 0
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    _manager(tmp_path)
+
+    def worker(n):
+        manager = _manager(tmp_path)
+        for i in range(10):
+            assert manager.save_project_entry({"project_name": f"W{n}-{i}", "path": str(tmp_path)})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _manager(tmp_path).count_projects() == 80
+
+def test_racing_first_use_migrates_once(tmp_path, monkeypatch):
+    (tmp_path / "history.json").write_text(json.dumps([
+        {"project_name": f"P{i}", "path": str(tmp_path), "srs": {}} for i in range(20)
+    ]), encoding="utf-8")
+    monkeypatch.setattr('src.backend.history_manager._initialized', set())
+
+    threads = [threading.Thread(target=_manager, args=(tmp_path,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _manager(tmp_path).count_projects() == 20
+
+def test_summaries_are_cached_until_history_changes(tmp_path):
+    manager = _manager(tmp_path)
+    manager.save_project_entry({"project_name": "First", "path": str(tmp_path), "srs": {"big": "x" * 1000}})
+
+    first = manager.list_summaries()
+    assert first == [{"id": first[0]["id"], "project_name": "First", "timestamp": first[0]["timestamp"],
+                      "path": str(tmp_path)}]
+
+    counter = manager.change_counter()
+    assert manager.list_summaries() == first
+    assert manager.change_counter() == counter
+
+    # A write from another instance invalidates the cached page
+    _manager(tmp_path).save_project_entry({"project_name": "Second", "path": str(tmp_path),
+                                           "timestamp": "2999-01-01 00:00:00"})
+    assert manager.change_counter() == counter + 1
+    assert [s["project_name"] for s in manager.list_summaries()] == ["Second", "First"]
+
+def test_short_page_still_reports_more_entries(tmp_path):
+    manager = _manager(tmp_path)
+    for i in range(3):
+        manager.save_project_entry({"project_name": f"P{i}", "path": str(tmp_path),
+                                    "timestamp": f"2024-01-0{i + 1} 00:00:00"})
+    # Newest entry's folder is gone but not pruned yet
+    manager.save_project_entry({"project_name": "Deleted", "path": str(tmp_path / "missing"),
+                                "timestamp": "2024-02-01 00:00:00"})
+
+    assert [s["project_name"] for s in manager.list_summaries(limit=2)] == ["P2"]
+    assert manager.has_more_summaries(limit=2)
+    assert not manager.has_more_summaries(limit=4)
+
+def test_full_result_is_stored_compressed_and_loaded_on_demand(tmp_path):
+    manager = _manager(tmp_path)
+    files = {"src/main.py": "print('hi')\n", "README.md": "# App\n" * 200}
+    result = {
+        "status": "Completed",
+        "srs": {"project_name": "App"},
+        "patterns": ["MVC"],
+        "quality_report": {"pylint_score": 9.1},
+        "explanation": "Because " * 500,
+        "stage_timings": {"code_generation": 1.5},
+        "file_count": 2,
+        "file_manifest": build_file_manifest(files),
+    }
+    entry = {"project_name": "App", "path": str(tmp_path), "srs": {"project_name": "App"}}
+    manager.save_project_entry(entry, result=result)
+    plain = {"project_name": "Legacy", "path": str(tmp_path)}
+    manager.save_project_entry(plain)
+
+    loaded = manager.get_project_result(entry["id"])
+
+    assert loaded["patterns"] == ["MVC"]
+    assert loaded["explanation"] == result["explanation"]
+    assert loaded["project_path"] == str(tmp_path)
+    assert [f["path"] for f in loaded["file_manifest"]] == ["README.md", "src/main.py"]
+    assert loaded["file_manifest"][1]["size"] == len("print('hi')\n")
+    assert manager.get_project_result(plain["id"]) is None
+    # Listing never touches the result blobs
+    assert set(manager.list_summaries()[0]) == {"id", "project_name", "timestamp", "path"}
+
+    manager.clear_history()
+    assert manager.get_project_result(entry["id"]) is None
+
+def test_find_result_by_fingerprint(tmp_path):
+    manager = _manager(tmp_path)
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "main.py").write_text("print('hi')\n", encoding="utf-8")
+    manifest = build_file_manifest({"main.py": "print('hi')\n"})
+    manager.save_project_entry({"project_name": "Old", "path": str(tmp_path / "deleted"), "fingerprint": "fp"},
+                               result={"patterns": ["Old"], "file_manifest": manifest})
+    manager.save_project_entry({"project_name": "App", "path": str(project_dir), "fingerprint": "fp",
+                                "timestamp": "2000-01-01 00:00:00"},
+                               result={"patterns": ["MVC"], "file_manifest": manifest})
+    manager.save_project_entry({"project_name": "NoResult", "path": str(project_dir), "fingerprint": "fp"})
+
+    found = manager.find_result_by_fingerprint("fp")
+
+    assert found["patterns"] == ["MVC"]
+    assert manager.get_project(found["history_id"])["fingerprint"] == "fp"
+    assert manager.find_result_by_fingerprint("other") is None
+
+    # Another run regenerated the same folder: the stored result no longer describes it
+    (project_dir / "main.py").write_text("print('other project')\n", encoding="utf-8")
+    assert manager.find_result_by_fingerprint("fp") is None
+    (project_dir / "main.py").unlink()
+    assert manager.find_result_by_fingerprint("fp") is None
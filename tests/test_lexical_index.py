@@ -0,0 +1,35 @@
+"""
+Tests for Lexical Index (BM25 + rank fusion).
+"""
+from src.backend.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCS = {
+    "singleton_0": "The Singleton pattern ensures a class has only one instance.",
+    "repository_0": "The Repository pattern mediates between the domain and data mapping layers.",
+    "observer_0": "The Observer pattern notifies dependents when the subject changes state.",
+}
+
+def build():
+    return BM25Index().build(list(DOCS), list(DOCS.values()), [{"source": k} for k in DOCS])
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("Use the Repository pattern!") == ["use", "repository", "pattern"]
+
+def test_bm25_matches_explicit_pattern_names():
+    index = build()
+    results = index.search("Please use the Repository pattern", top_k=3)
+    assert results[0][0] == "repository_0"
+    # Documents without any query term are not returned
+    assert index.search("kubernetes", top_k=3) == []
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "index.json")
+    build().save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("observer notifies", 1)[0][0] == "observer_0"
+    assert loaded.get("singleton_0")["metadata"] == {"source": "singleton_0"}
+    assert loaded.get("missing") is None
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["a", "c", "b"]
@@ -0,0 +1,134 @@
+"""
+Tests for LLM Backends.
+"""
+import json
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from src.backend.llm_backends import ReplayBackend, join_prefix, prompt_hash
+from src.backend.llm_client import LLMClient
+from src.backend.embedding_cache import EmbeddingCache
+from src.backend.rate_limiter import RateLimiter
+
+@pytest.fixture
+def cassette(tmp_path):
+    path = tmp_path / "cassette.json"
+    path.write_text(json.dumps({
+        "responses": {prompt_hash("Hello"): "World"},
+        "embeddings": {}
+    }), encoding="utf-8")
+    return str(path)
+
+def test_replay_serves_recorded_response(cassette):
+    backend = ReplayBackend(cassette)
+    assert backend.generate("Hello") == "World"
+
+    with pytest.raises(RuntimeError):
+        backend.generate("Never recorded")
+
+def test_replay_fake_embeddings_are_deterministic(cassette):
+    backend = ReplayBackend(cassette, embedding_dim=16)
+    first, other = backend.embed(["query", "other query"], "retrieval_query")
+    assert len(first) == 16
+    assert first == backend.embed(["query"], "retrieval_query")[0]
+    assert first != other
+
+def test_record_mode_persists_misses(tmp_path):
+    live = MagicMock()
+    live.model_name = "live-model"
+    live.embed_model_name = "live-embed"
+    live.generate.return_value = "Recorded answer"
+    path = str(tmp_path / "new_cassette.json")
+
+    recorder = ReplayBackend(path, record_from=live)
+    assert recorder.generate("Prompt") == "Recorded answer"
+
+    replay = ReplayBackend(path)
+    assert replay.generate("Prompt") == "Recorded answer"
+    live.generate.assert_called_once()
+
+def test_llm_client_uses_backend(cassette):
+    client = LLMClient(backend=ReplayBackend(cassette))
+    assert client.generate_content("Hello") == "World"
+    assert client.count_tokens("12345678") == 2
+
+def test_get_embedding_batches_with_task_type(monkeypatch):
+    monkeypatch.setattr('src.backend.llm_client.BATCH_EMBED_LIMIT', 2)
+    backend = MagicMock()
+    backend.embed_model_name = "models/test-embed"
+    backend.embed.side_effect = lambda texts, task_type: [[float(len(t)), 1.0] for t in texts]
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter(), embed_rate_limiter=RateLimiter(),
+                       embedding_cache=EmbeddingCache(persist=False))
+
+    matrix = client.get_embedding(["a", "bb", "ccc", "a"], task_type="retrieval_document")
+
+    assert matrix.shape == (4, 2) and matrix.dtype == np.float32
+    assert matrix.flags['C_CONTIGUOUS']
+    assert matrix[:, 0].tolist() == [1.0, 2.0, 3.0, 1.0]
+    # Three unique texts in batches of two, all with the document task type
+    assert backend.embed.call_count == 2
+    assert all(c.args[1] == "retrieval_document" for c in backend.embed.call_args_list)
+
+    single = client.get_embedding("dddd")
+    assert single.shape == (2,)
+    assert backend.embed.call_args.args == (["dddd"], "retrieval_query")
+
+def test_context_cache_sends_only_the_suffix(tmp_path):
+    prefix = "PROJECT SRS:\n" + "x" * 5000
+    path = tmp_path / "cassette.json"
+    path.write_text(json.dumps({
+        "responses": {prompt_hash(join_prefix(prefix, "Explain")): "Cached answer"},
+        "embeddings": {}
+    }), encoding="utf-8")
+    backend = ReplayBackend(str(path))
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter())
+
+    with client.create_context_cache(prefix) as cache:
+        assert cache.is_cached
+        assert client.generate_content("Explain", context_cache=cache) == "Cached answer"
+        assert cache.hits == 1
+        # The server-side copy expires; the prefix is sent inline instead
+        backend.delete_context_cache(cache.name)
+        assert client.generate_content("Explain", context_cache=cache) == "Cached answer"
+        assert not cache.is_cached and cache.hits == 1
+
+def test_small_prefixes_are_sent_inline():
+    backend = MagicMock()
+    backend.supports_context_cache = True
+    backend.generate.return_value = "ok"
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter())
+
+    cache = client.create_context_cache("PROJECT SRS: {}")
+    client.generate_content("Question", context_cache=cache)
+
+    assert not cache.is_cached
+    backend.create_context_cache.assert_not_called()
+    backend.generate.assert_called_once_with(join_prefix("PROJECT SRS: {}", "Question"))
+
+def test_stream_yields_chunks_through_context_cache(tmp_path):
+    prefix = "PROJECT SRS:\n" + "x" * 5000
+    answer = "The project uses MVC. " * 10
+    path = tmp_path / "cassette.json"
+    path.write_text(json.dumps({
+        "responses": {prompt_hash(join_prefix(prefix, "Explain")): answer},
+        "embeddings": {}
+    }), encoding="utf-8")
+    backend = ReplayBackend(str(path), stream_chunk_chars=16)
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter())
+
+    with client.create_context_cache(prefix) as cache:
+        chunks = list(client.generate_content_stream("Explain", context_cache=cache))
+        assert cache.hits == 1
+        backend.delete_context_cache(cache.name)
+        inline = list(client.generate_content_stream("Explain", context_cache=cache))
+
+    assert len(chunks) > 1 and all(len(c) <= 16 for c in chunks)
+    assert "".join(chunks) == answer == "".join(inline)
+
+def test_stream_rejects_empty_response():
+    backend = MagicMock()
+    backend.generate_stream.return_value = iter(["", "  "])
+    client = LLMClient(backend=backend, rate_limiter=RateLimiter())
+
+    with pytest.raises(RuntimeError):
+        list(client.generate_content_stream("Question"))
@@ -0,0 +1,144 @@
+"""
+Microbenchmarks for the pure-Python hot paths (pytest-benchmark).
+
+Scales:
+    default           small inputs, fast enough for every test run
+    SPECOPS_BENCH_SCALE=full   adds the large scales (100k embeddings, 500 files, MB responses)
+
+Regression checks:
+    Each benchmark asserts its mean stays under an absolute budget (BUDGETS_MS).
+    For relative regressions against a previous run:
+        pytest tests/test_microbenchmarks.py --benchmark-autosave
+        pytest tests/test_microbenchmarks.py --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+import json
+import os
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+
+pytest.importorskip("pytest_benchmark")
+
+from src.backend.rag_engine import RAGEngine
+from src.backend.pipeline_orchestrator import PipelineOrchestrator
+from src.agents.code_generator import CodeGenerator
+from src.tools.quality_runner import QualityRunner
+
+FULL_SCALE = os.environ.get("SPECOPS_BENCH_SCALE", "").lower() == "full"
+EMBED_DIM = 768
+
+# Generous per-call ceilings (milliseconds); they catch order-of-magnitude regressions
+BUDGETS_MS = {
+    ("retrieve", 10): 5,
+    ("retrieve", 1_000): 100,
+    ("retrieve", 100_000): 10_000,
+    ("json_repair", 10_000): 50,
+    ("json_repair", 1_000_000): 2_000,
+    ("detect_project_type", 10): 20,
+    ("detect_project_type", 500): 200,
+    ("pylint_parse", 10): 20,
+    ("pylint_parse", 500): 500,
+}
+
+
+def scales(small, large):
+    return small + (large if FULL_SCALE else [])
+
+
+def check_budget(benchmark, key):
+    # stats is None when run with --benchmark-disable
+    if benchmark.stats is None:
+        return
+    mean_ms = benchmark.stats.stats.mean * 1000
+    assert mean_ms < BUDGETS_MS[key], f"{key} took {mean_ms:.2f}ms (budget {BUDGETS_MS[key]}ms)"
+
+
+@pytest.mark.parametrize("n_embeddings", scales([10, 1_000], [100_000]))
+def test_bench_rag_retrieve(benchmark, n_embeddings):
+    rng = np.random.default_rng(0)
+    engine = RAGEngine.__new__(RAGEngine)
+    engine.embedder = MagicMock()
+    engine.embedder.embed.return_value = rng.standard_normal(EMBED_DIM).astype(np.float32)
+    engine.patterns = [{"name": f"Pattern {i}"} for i in range(n_embeddings)]
+    engine.embeddings = rng.standard_normal((n_embeddings, EMBED_DIM)).astype(np.float32)
+
+    results = benchmark(engine.retrieve, "query", 3)
+
+    assert len(results) == 3
+    check_budget(benchmark, ("retrieve", n_embeddings))
+
+
+def _broken_json_response(target_bytes: int) -> str:
+    # Unescaped backslashes (regex literals) are invalid JSON escapes even with
+    # strict=False, so the first parse fails and the repair fallback runs
+    body = "def handler(path):\n\treturn re.match(r'\\d+\\.py', path)\n" * 4
+    entries = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        entry = f'"src/module_{i}.py": "{body}"'
+        entries.append(entry)
+        size += len(entry)
+        i += 1
+    return "{" + ",\n".join(entries) + "}"
+
+
+@pytest.mark.parametrize("response_bytes", scales([10_000], [1_000_000]))
+def test_bench_json_repair(benchmark, response_bytes):
+    with patch('src.agents.code_generator.LLMClient'):
+        generator = CodeGenerator()
+    response = _broken_json_response(response_bytes)
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(response, strict=False)
+
+    with patch.object(CodeGenerator, '_escape_string_contents',
+                      wraps=CodeGenerator._escape_string_contents) as repair:
+        files, error = benchmark(generator._parse_project_files, response)
+
+    assert repair.called
+    assert error is None and "src/module_0.py" in files
+    assert "re.match(r'\\d+\\.py', path)" in files["src/module_0.py"]
+    check_budget(benchmark, ("json_repair", response_bytes))
+
+
+@pytest.fixture
+def project_tree(tmp_path, request):
+    n_files = request.param
+    for i in range(n_files):
+        sub = tmp_path / "src" / f"pkg_{i % 10}"
+        sub.mkdir(parents=True, exist_ok=True)
+        suffix = ".py" if i % 3 else ".md"
+        (sub / f"file_{i}{suffix}").write_text("x = 1\n", encoding="utf-8")
+    return tmp_path, n_files
+
+
+@pytest.mark.parametrize("project_tree", scales([10], [500]), indirect=True)
+def test_bench_detect_project_type(benchmark, project_tree):
+    path, n_files = project_tree
+    runner = QualityRunner()
+
+    project_type = benchmark(runner._detect_project_type, str(path))
+
+    assert project_type == "python"
+    check_budget(benchmark, ("detect_project_type", n_files))
+
+
+@pytest.mark.parametrize("project_tree", scales([10], [500]), indirect=True)
+def test_bench_pylint_log_parsing(benchmark, project_tree):
+    path, n_files = project_tree
+    rel_paths = [
+        os.path.relpath(os.path.join(root, f), path)
+        for root, _, files in os.walk(path) for f in files
+    ]
+    lines = ["************* Module pkg"]
+    for rel in rel_paths:
+        lines.append(f"{rel}:10:4: E0602: Undefined variable 'foo' (undefined-variable)")
+        lines.append(f"{rel}:12:0: C0114: Missing module docstring (missing-module-docstring)")
+    lines.append("Your code has been rated at 3.50/10")
+    log = "\n".join(lines)
+    orchestrator = PipelineOrchestrator.__new__(PipelineOrchestrator)
+
+    errors_by_file = benchmark(orchestrator._parse_pylint_errors, log, str(path))
+
+    assert len(errors_by_file) == sum(1 for rel in rel_paths if rel.endswith(".py"))
+    check_budget(benchmark, ("pylint_parse", n_files))
@@ -37,3 +37,98 @@ def test_pattern_selector(mock_dependencies):
     assert result["success"] is True
     assert "MVC" in result["selected_patterns"]
     assert result["candidates_considered"] == ["MVC"]
+
+@patch('src.agents.pattern_selector.LLMClient')
+@patch('src.agents.pattern_selector.get_embedding_provider')
+@patch('src.agents.pattern_selector.chromadb')
+def test_hybrid_retrieval_fuses_lexical_hits(mock_chromadb, mock_provider, MockLLM, tmp_path):
+    """A chunk found only by BM25 still reaches the prompt via rank fusion."""
+    from src.backend.lexical_index import BM25Index, index_path_for
+
+    mock_provider.return_value.collection_name = "design_patterns"
+    mock_provider.return_value.embed.return_value = [[0.1, 0.9]]
+    BM25Index().build(
+        ["repo_1", "mvc_1"],
+        ["Repository pattern mediates data access", "Model View Controller separates views"],
+        [{"source": "Repository-Pattern.pdf"}, {"source": "MVC.pdf"}],
+    ).save(index_path_for(str(tmp_path), "design_patterns"))
+
+    collection = mock_chromadb.PersistentClient.return_value.get_collection.return_value
+    collection.query.return_value = {
+        "ids": [["mvc_1"]],
+        "documents": [["Model View Controller separates views"]],
+        "metadatas": [[{"source": "MVC.pdf"}]],
+    }
+    MockLLM.return_value.generate_content.return_value = '{"selected_patterns": ["Repository"], "justification": "x"}'
+
+    selector = PatternSelector(db_path=str(tmp_path))
+    selector.top_k = 2
+    result = selector.select_patterns({"project_name": "Store", "description": "Use the Repository pattern"})
+
+    assert result["success"] is True
+    assert result["retrieved_patterns_count"] == 2
+    prompt = MockLLM.return_value.generate_content.call_args.args[0]
+    assert "Repository-Pattern.pdf" in prompt
+    # SRS is embedded compactly and the context is within budget
+    assert '{"project_name":"Store","description":"Use the Repository pattern"}' in prompt
+    assert 0 < result["context_tokens"] <= selector.context_budget
+
+@patch('src.agents.pattern_selector.LLMClient')
+@patch('src.agents.pattern_selector.get_embedding_provider')
+@patch('src.agents.pattern_selector.chromadb')
+def test_repeat_queries_skip_vector_db_until_reingestion(mock_chromadb, mock_provider, MockLLM, tmp_path):
+    from src.backend.retrieval_cache import RetrievalCache, bump_collection_version
+
+    mock_provider.return_value.collection_name = "design_patterns"
+    mock_provider.return_value.embed.return_value = [[0.5, 0.5]]
+    collection = mock_chromadb.PersistentClient.return_value.get_collection.return_value
+    collection.query.return_value = {
+        "ids": [["mvc_1"]],
+        "documents": [["Model View Controller"]],
+        "metadatas": [[{"source": "MVC.pdf"}]],
+    }
+
+    selector = PatternSelector(db_path=str(tmp_path))
+    selector.retrieval_cache = RetrievalCache()
+    selector._retrieve_chunks("same query")
+    selector._retrieve_chunks("same query")
+    assert collection.query.call_count == 1
+
+    bump_collection_version(str(tmp_path), "design_patterns")
+    selector._retrieve_chunks("same query")
+    assert collection.query.call_count == 2
+
+@patch('src.agents.pattern_selector.LLMClient')
+@patch('src.agents.pattern_selector.get_embedding_provider')
+@patch('src.agents.pattern_selector.chromadb')
+def test_requirements_are_retrieved_in_one_batch(mock_chromadb, mock_provider, MockLLM, tmp_path):
+    """Each requirement becomes a query; one embed call, one vector search, chunks deduplicated."""
+    mock_provider.return_value.collection_name = "design_patterns"
+    mock_provider.return_value.embed.return_value = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    collection = mock_chromadb.PersistentClient.return_value.get_collection.return_value
+    collection.query.return_value = {
+        "ids": [["mvc_1", "obs_1"], ["obs_1", "repo_1"], ["repo_1", "mvc_1"]],
+        "documents": [["MVC", "Observer"], ["Observer", "Repository"], ["Repository", "MVC"]],
+        "metadatas": [[{"source": "MVC.pdf"}, {"source": "Observer.pdf"}],
+                      [{"source": "Observer.pdf"}, {"source": "Repository.pdf"}],
+                      [{"source": "Repository.pdf"}, {"source": "MVC.pdf"}]],
+        "distances": [[0.4, 0.9], [0.1, 0.5], [0.3, 0.6]],
+    }
+
+    selector = PatternSelector(db_path=str(tmp_path))
+    selector.lexical_index = None
+    selector.retrieval_cache = None
+    queries = selector._build_queries({
+        "project_name": "Shop",
+        "description": "Online shop",
+        "functional_requirements": ["Notify users on order updates", "notify users on order updates "],
+        "non_functional_requirements": ["Persist orders reliably"],
+    })
+    assert len(queries) == 3
+
+    chunks = selector._retrieve_chunks(queries)
+
+    mock_provider.return_value.embed.assert_called_once()
+    assert collection.query.call_count == 1
+    assert len(collection.query.call_args.kwargs["query_embeddings"]) == 3
+    assert [c["id"] for c in chunks] == ["obs_1", "repo_1", "mvc_1"]
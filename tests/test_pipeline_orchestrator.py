@@ -0,0 +1,127 @@
+"""
+Tests for PipelineOrchestrator.
+"""
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from src.backend.pipeline_orchestrator import PipelineOrchestrator
+from src.backend.run_fingerprint import compute_fingerprint, normalize_prompt
+
+def _orchestrator(tmp_path):
+    orchestrator = PipelineOrchestrator.__new__(PipelineOrchestrator)
+    orchestrator.spec_parser = MagicMock()
+    orchestrator.pattern_selector = MagicMock()
+    orchestrator.pattern_selector.db_path = str(tmp_path)
+    orchestrator.pattern_selector.embedder.collection_name = "design_patterns"
+    orchestrator.code_generator = MagicMock()
+    orchestrator.code_generator.llm_client.backend.model_name = "gemini-test"
+    orchestrator.generated_root = str(tmp_path / "generated")
+    orchestrator.runs_root = str(tmp_path / "runs")
+    return orchestrator
+
+def test_fingerprint_normalizes_whitespace_only():
+    base = compute_fingerprint("Build a  todo\napp ", "m", 1)
+    assert base == compute_fingerprint("Build a todo app", "m", 1)
+    assert base != compute_fingerprint("Build a Todo app", "m", 1)
+    assert base != compute_fingerprint("Build a todo app", "other-model", 1)
+    assert base != compute_fingerprint("Build a todo app", "m", 2)
+    assert normalize_prompt("  a\t b ") == "a b"
+
+def test_identical_prompt_reuses_stored_result(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    stored = {"status": "Completed", "patterns": ["MVC"], "history_id": 7}
+
+    with patch('src.backend.history_manager.HistoryManager') as MockHistory:
+        MockHistory.return_value.find_result_by_fingerprint.return_value = stored
+        result = orchestrator.run_pipeline("Build a todo app")
+
+    assert result["patterns"] == ["MVC"]
+    assert result["reused_from"] == 7
+    orchestrator.spec_parser.parse_input.assert_not_called()
+    fingerprint = MockHistory.return_value.find_result_by_fingerprint.call_args.args[0]
+    assert fingerprint == orchestrator.run_fingerprint("Build  a todo app")
+
+def test_reuse_can_be_disabled(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    orchestrator.spec_parser.parse_input.return_value = {"success": False, "error": "boom"}
+
+    with patch('src.backend.history_manager.HistoryManager') as MockHistory:
+        result = orchestrator.run_pipeline("Build a todo app", reuse_existing=False)
+
+    assert result["status"] == "Failed"
+    MockHistory.return_value.find_result_by_fingerprint.assert_not_called()
+
+def test_failed_run_resumes_from_first_incomplete_stage(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    orchestrator.asset_generator = MagicMock()
+    orchestrator.quality_runner = MagicMock()
+    orchestrator.explainer = MagicMock()
+    srs = {"project_name": "Todo App", "tech_stack": ["Python"]}
+    orchestrator.spec_parser.parse_input.return_value = {"success": True, "srs": srs}
+    orchestrator.pattern_selector.select_patterns.return_value = {
+        "success": True, "selected_patterns": ["MVC"], "retrieved_patterns_count": 3}
+    orchestrator.code_generator.generate_code.return_value = {"success": False, "error": "429 rate limited"}
+    orchestrator.asset_generator.generate_assets.return_value = {"README.md": "# Todo"}
+    orchestrator.quality_runner.run_all_checks.return_value = {"pylint_score": 9.0}
+    orchestrator.explainer.generate_explanation.return_value = "Uses MVC."
+
+    with patch('src.backend.history_manager.HistoryManager') as MockHistory, \
+         patch('src.agents.code_fixer.CodeFixer'):
+        failed = orchestrator.run_pipeline("Build a todo app", reuse_existing=False)
+
+        assert failed["status"] == "Failed"
+        run_id = failed["run_id"]
+        manifest = json.loads((tmp_path / "runs" / run_id / "run.json").read_text())
+        assert manifest["status"] == "failed"
+        assert manifest["failed_stage"] == "Code Generation"
+        assert manifest["completed_stages"] == ["srs_parsing", "pattern_selection"]
+
+        orchestrator.code_generator.generate_code.return_value = {
+            "success": True, "files": {"main.py": "print('hi')\n"}, "validation_errors": []}
+        result = orchestrator.resume(run_id)
+
+    assert result["status"] == "Completed"
+    assert result["run_id"] == run_id
+    assert result["resumed_stages"] == ["srs_parsing", "pattern_selection"]
+    assert result["patterns"] == ["MVC"]
+    assert orchestrator.spec_parser.parse_input.call_count == 1
+    assert orchestrator.pattern_selector.select_patterns.call_count == 1
+    assert (tmp_path / "generated" / "Todo_App" / "main.py").exists()
+    saved_entry = MockHistory.return_value.save_project_entry.call_args.args[0]
+    assert saved_entry["prompt"] == "Build a todo app"
+    manifest = json.loads((tmp_path / "runs" / run_id / "run.json").read_text())
+    assert manifest["status"] == "completed"
+    # Stage outputs are dropped once the result is in history
+    assert [p.name for p in (tmp_path / "runs" / run_id).iterdir()] == ["run.json"]
+
+def test_resume_unknown_run(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        orchestrator.resume("20250101-000000-deadbeef")
+    with pytest.raises(ValueError):
+        orchestrator.resume("../escape")
+
+def test_inline_cache_is_not_sent_to_fixer_and_is_released_on_error(tmp_path):
+    orchestrator = _orchestrator(tmp_path)
+    orchestrator.asset_generator = MagicMock()
+    orchestrator.quality_runner = MagicMock()
+    orchestrator.explainer = MagicMock()
+    orchestrator.spec_parser.parse_input.return_value = {"success": True, "srs": {"project_name": "Todo"}}
+    orchestrator.pattern_selector.select_patterns.return_value = {"success": True, "selected_patterns": ["MVC"]}
+    orchestrator.code_generator.generate_code.return_value = {
+        "success": True, "files": {"main.py": "print(x)\n"}, "validation_errors": []}
+    orchestrator.asset_generator.generate_assets.return_value = {}
+    orchestrator.quality_runner.run_all_checks.side_effect = [{"pylint_score": 2.0}, {"pylint_score": 9.0}]
+    orchestrator.quality_runner.get_pylint_report.return_value = "main.py:1:6: E0602: Undefined variable 'x'"
+    orchestrator.explainer.generate_explanation.side_effect = RuntimeError("connection reset")
+    project_cache = orchestrator.code_generator.llm_client.create_context_cache.return_value
+    project_cache.is_cached = False
+
+    with patch('src.backend.history_manager.HistoryManager'), \
+         patch('src.agents.code_fixer.CodeFixer') as MockFixer:
+        MockFixer.return_value.fix_code.return_value = {"success": True, "fixed_content": "x = 1\nprint(x)\n"}
+        with pytest.raises(RuntimeError):
+            orchestrator.run_pipeline("Build a todo app", reuse_existing=False)
+
+    assert MockFixer.return_value.fix_code.call_args.kwargs["context_cache"] is None
+    project_cache.__exit__.assert_called_once()
@@ -0,0 +1,46 @@
+"""
+Tests for the shared Prompt Builder.
+"""
+from unittest.mock import patch
+from src.backend.prompt_builder import PromptContext
+from src.explainability.explainer import Explainer
+
+def test_render_is_compact_and_reused():
+    srs = {"project_name": "Shop", "tech_stack": ["Python", "Flask"]}
+    context = PromptContext()
+
+    text = context.render("srs", srs)
+
+    assert text == '{"project_name":"Shop","tech_stack":["Python","Flask"]}'
+    with patch('src.backend.prompt_builder.compact_json') as mock_dumps:
+        assert context.render("srs", srs) is text
+        mock_dumps.assert_not_called()
+    # A different object under the same name is re-rendered
+    assert context.render("srs", {"project_name": "Other"}) == '{"project_name":"Other"}'
+
+def test_record_reports_component_sizes():
+    context = PromptContext()
+    srs_text = context.render("srs", {"description": "x" * 400})
+    prompt = f"Instructions {'y' * 200}\n{srs_text}"
+
+    context.record("code_generation", prompt, srs=srs_text)
+    stats = context.stats()
+
+    sizes = stats["stages"]["code_generation"]
+    assert sizes["srs"] == len(srs_text) // 4
+    assert sizes["srs"] + sizes["instructions"] == sizes["total"]
+    assert stats["total_tokens"] == sizes["total"]
+
+def test_stages_share_one_serialization():
+    srs = {"project_name": "Test", "description": "A" * 100}
+    context = PromptContext()
+    with patch('src.explainability.explainer.LLMClient') as MockLLM:
+        MockLLM.return_value.generate_content.return_value = "ok"
+        explainer = Explainer()
+        explainer.generate_explanation(srs, ["MVC"], {"pylint_score": 9.0}, prompt_context=context)
+        explainer.generate_explanation(srs, ["MVC"], {"pylint_score": 9.0}, prompt_context=context)
+
+    prompt = MockLLM.return_value.generate_content.call_args.args[0]
+    assert context.render("srs", srs) in prompt
+    assert '{\n' not in prompt
+    assert set(context.stats()["stages"]["explanation"]) == {"project_prefix", "quality_report", "instructions", "total"}
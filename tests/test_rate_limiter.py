@@ -0,0 +1,114 @@
+"""
+Tests for Rate Limiter.
+"""
+import asyncio
+import time
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from google.api_core.exceptions import ResourceExhausted
+from src.backend.rate_limiter import RateLimiter, TokenBucket, parse_retry_after
+from src.backend.llm_backends import ReplayBackend, prompt_hash
+from src.backend.llm_client import LLMClient, QuotaExhaustedError
+from src.backend.embedding_cache import EmbeddingCache
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(60)  # one per second
+    now = bucket.updated
+    assert bucket.wait_time(60, now) == 0.0
+    bucket.take(60)
+    assert abs(bucket.wait_time(1, now) - 1.0) < 1e-6
+    # Disabled bucket never waits
+    assert TokenBucket(None).wait_time(10_000, now) == 0.0
+
+def test_concurrency_cap_shared_by_threads_and_coroutines():
+    limiter = RateLimiter(max_concurrency=1)
+    limiter.acquire()
+    assert limiter._try_acquire(0) > 0
+
+    async def waiter():
+        async with limiter.limit_async():
+            return limiter.in_flight
+
+    async def scenario():
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        limiter.release()
+        return await task
+
+    assert asyncio.run(scenario()) == 1
+    assert limiter.in_flight == 0
+
+def test_requests_per_minute_enforced():
+    limiter = RateLimiter(requests_per_minute=1200)  # 20/sec, burst of 1200
+    limiter.requests.level = 0
+    start = time.monotonic()
+    with limiter.limit():
+        pass
+    assert time.monotonic() - start >= 0.04
+
+def test_async_llm_client(tmp_path):
+    path = tmp_path / "cassette.json"
+    path.write_text(json.dumps({"responses": {prompt_hash("Hi"): "There"}}), encoding="utf-8")
+    client = LLMClient(backend=ReplayBackend(str(path), embedding_dim=8),
+                       rate_limiter=RateLimiter(max_concurrency=2),
+                       embed_rate_limiter=RateLimiter(),
+                       embedding_cache=EmbeddingCache(persist=False))
+
+    async def run():
+        return await asyncio.gather(
+            client.agenerate_content("Hi"),
+            client.agenerate_content("Hi"),
+            client.aget_embedding("query"),
+        )
+
+    text_a, text_b, emb = asyncio.run(run())
+    assert text_a == text_b == "There"
+    assert len(emb) == 8
+
+def test_aimd_controller_cuts_and_recovers():
+    limiter = RateLimiter(max_concurrency=8, adaptive={"decrease_factor": 0.5, "cooldown": 0})
+    limiter.report_quota_error()
+    assert limiter.concurrency_limit == 4
+    for _ in range(40):
+        limiter.report_success()
+    assert limiter.concurrency_limit == 8
+
+def test_retry_after_pauses_admission():
+    limiter = RateLimiter(max_concurrency=4, adaptive={})
+    limiter.report_quota_error(retry_after=5)
+    assert limiter._try_acquire(0) > 4
+    assert limiter.concurrency_limit == 2
+
+def test_parse_retry_after():
+    assert parse_retry_after(Exception("429 Quota exceeded. Please retry in 12.5s.")) == 12.5
+    assert parse_retry_after(Exception("retry_delay {\n  seconds: 7\n}")) == 7.0
+    assert parse_retry_after(Exception("boom")) is None
+
+def test_quota_errors_queue_instead_of_failing():
+    backend = MagicMock()
+    backend.generate.side_effect = [
+        ResourceExhausted("Please retry in 0.01s"),
+        ResourceExhausted("Please retry in 0.01s"),
+        ResourceExhausted("Please retry in 0.01s"),
+        "Finally",
+    ]
+    backend.count_tokens.return_value = 1
+    limiter = RateLimiter(max_concurrency=4, adaptive={"cooldown": 0})
+    client = LLMClient(backend=backend, rate_limiter=limiter, embed_rate_limiter=RateLimiter())
+
+    # More quota errors than the transient-error attempt budget, still succeeds
+    assert client.generate_content("Hello") == "Finally"
+    assert limiter.concurrency_limit < 4
+
+@patch('src.agents.requirements_gatherer.LLMClient')
+def test_question_generation_surfaces_exhausted_quota(MockClient):
+    from src.agents.requirements_gatherer import RequirementsGatherer
+    MockClient.return_value.generate_content.side_effect = QuotaExhaustedError("still limited")
+    with pytest.raises(QuotaExhaustedError):
+        RequirementsGatherer().generate_questions("Build a todo app")
+
+    # Other failures still fall back to the default questions
+    MockClient.return_value.generate_content.side_effect = ValueError("bad response")
+    assert len(RequirementsGatherer().generate_questions("Build a todo app")) == 5
@@ -0,0 +1,41 @@
+"""
+Tests for Retrieval Cache.
+"""
+import numpy as np
+from src.backend.retrieval_cache import (
+    RetrievalCache,
+    bump_collection_version,
+    collection_scope,
+    read_collection_version,
+)
+
+def test_collection_version_stamp(tmp_path):
+    assert read_collection_version(str(tmp_path), "design_patterns") == 0
+    assert bump_collection_version(str(tmp_path), "design_patterns") == 1
+    assert bump_collection_version(str(tmp_path), "design_patterns") == 2
+    assert read_collection_version(str(tmp_path), "design_patterns") == 2
+    assert read_collection_version(str(tmp_path), "design_patterns_hashing") == 0
+
+def test_cache_key_includes_n_results_and_version():
+    cache = RetrievalCache()
+    emb = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+    cache.put("db::c", emb, 3, 1, {"ids": [["a"]]})
+
+    assert cache.get("db::c", emb, 3, 1) == {"ids": [["a"]]}
+    # Float noise below the hashing precision still hits
+    assert cache.get("db::c", emb + 1e-7, 3, 1) is not None
+    assert cache.get("db::c", emb, 5, 1) is None
+    assert cache.get("db::c", emb, 3, 2) is None
+    # Another DB or collection with the same version never shares results
+    assert cache.get(collection_scope("/other/db", "c"), emb, 3, 1) is None
+    assert collection_scope("db", "c") != collection_scope("db", "c_hashing")
+
+def test_cache_evicts_least_recently_used():
+    cache = RetrievalCache(max_entries=2)
+    a, b, c = (np.full(3, v, dtype=np.float32) for v in (1.0, 2.0, 3.0))
+    cache.put("db::c", a, 3, 0, "A")
+    cache.put("db::c", b, 3, 0, "B")
+    cache.get("db::c", a, 3, 0)
+    cache.put("db::c", c, 3, 0, "C")
+    assert cache.get("db::c", b, 3, 0) is None
+    assert cache.get("db::c", a, 3, 0) == "A"
@@ -0,0 +1,47 @@
+"""
+Tests for the in-memory Vector Index.
+"""
+import numpy as np
+from unittest.mock import MagicMock
+from src.backend.retrieval_cache import bump_collection_version
+from src.backend.vector_index import InMemoryVectorIndex, get_vector_index, clear_vector_indexes
+
+def _collection(rng):
+    collection = MagicMock()
+    collection.get.return_value = {
+        "ids": [f"doc_{i}" for i in range(20)],
+        "embeddings": rng.standard_normal((20, 8)).astype(np.float32),
+        "documents": [f"document {i}" for i in range(20)],
+        "metadatas": [{"source": f"{i}.pdf"} for i in range(20)],
+    }
+    return collection
+
+def test_exact_search_ranks_by_cosine():
+    rng = np.random.default_rng(0)
+    data = _collection(rng).get.return_value
+    index = InMemoryVectorIndex(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+
+    queries = np.stack([data["embeddings"][3] * 2.0, data["embeddings"][11]])
+    result = index.query(queries, n_results=4)
+
+    assert result["ids"][0][0] == "doc_3"
+    assert result["ids"][1][0] == "doc_11"
+    assert result["metadatas"][0][0] == {"source": "3.pdf"}
+    assert abs(result["distances"][0][0]) < 1e-5
+    assert result["distances"][0] == sorted(result["distances"][0])
+
+    expected = np.argsort(-(index.matrix @ (queries[1] / np.linalg.norm(queries[1]))))[:4]
+    assert result["ids"][1] == [f"doc_{i}" for i in expected]
+
+def test_warm_index_reloads_on_version_change(tmp_path):
+    clear_vector_indexes()
+    collection = _collection(np.random.default_rng(1))
+
+    first = get_vector_index(collection, str(tmp_path), "design_patterns")
+    assert get_vector_index(collection, str(tmp_path), "design_patterns") is first
+    assert collection.get.call_count == 1
+
+    bump_collection_version(str(tmp_path), "design_patterns")
+    assert get_vector_index(collection, str(tmp_path), "design_patterns") is not first
+    assert collection.get.call_count == 2
+    clear_vector_indexes()